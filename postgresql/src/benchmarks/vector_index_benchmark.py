@@ -0,0 +1,120 @@
+"""
+Recall / QPS benchmark of the in-process vector stores.
+
+Builds the same collection with the exact NumPy flat provider and the IVF-PQ provider, then
+reports recall@k of IVF-PQ against the exact results and the queries per second of both,
+for several nprobe values. Vectors are synthetic (clustered Gaussians) unless a ``.npy``
+matrix is given.
+
+    python -m benchmarks.vector_index_benchmark --count 200000 --dim 1536 --nprobe 4 8 16 32
+"""
+from stores.vectordb.providers import NumpyFlatProvider, NumpyIVFPQProvider
+import numpy as np
+import argparse
+import asyncio
+import tempfile
+import shutil
+import time
+
+
+def make_vectors(count: int, dim: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=count)
+    return centers[labels] + 0.5 * rng.standard_normal((count, dim)).astype(np.float32)
+
+
+async def build(provider, vectors: np.ndarray, insert_size: int):
+    await provider.connect()
+    await provider.create_collection(collection_name="benchmark", embedding_size=vectors.shape[1], do_reset=True)
+
+    for start in range(0, len(vectors), insert_size):
+        batch = vectors[start:start + insert_size]
+        await provider.insert_many(
+            collection_name="benchmark",
+            texts=[ "" ] * len(batch),
+            vectors=batch,
+            record_ids=list(range(start, start + len(batch))),
+        )
+
+    # Wait for the background compaction (and training / encoding)
+    provider.wait_for_maintenance("benchmark")
+
+
+async def run_queries(provider, queries: np.ndarray, limit: int):
+    results = []
+
+    started_at = time.perf_counter()
+    for query in queries:
+        documents = await provider.search_by_vector(collection_name="benchmark", vector=query, limit=limit)
+        results.append({ document.chunk_id for document in documents or [] })
+    elapsed = time.perf_counter() - started_at
+
+    return results, len(queries) / elapsed
+
+
+async def main(args):
+    rng = np.random.default_rng(args.seed)
+
+    if args.vectors:
+        vectors = np.load(args.vectors, mmap_mode="r")
+        vectors = np.asarray(vectors[:args.count] if args.count else vectors, dtype=np.float32)
+    else:
+        vectors = make_vectors(args.count, args.dim, args.clusters, rng)
+
+    queries = vectors[rng.choice(len(vectors), size=args.queries, replace=False)]
+    queries = queries + 0.1 * rng.standard_normal(queries.shape).astype(np.float32)
+
+    db_dir = tempfile.mkdtemp(prefix="vector_index_benchmark_")
+    try:
+        flat = NumpyFlatProvider(db_client=f"{db_dir}/flat", distance_method=args.distance)
+        ivfpq = NumpyIVFPQProvider(
+            db_client=f"{db_dir}/ivfpq",
+            distance_method=args.distance,
+            nlist=args.nlist,
+            pq_m=args.pq_m,
+            min_train_size=min(args.min_train_size, len(vectors)),
+            train_sample_size=args.train_sample_size,
+            rerank_factor=args.rerank_factor,
+        )
+
+        for name, provider in (("flat", flat), ("ivfpq", ivfpq)):
+            started_at = time.perf_counter()
+            await build(provider, vectors, args.insert_size)
+            print(f"{name}: built {len(vectors)} x {vectors.shape[1]} in {time.perf_counter() - started_at:.1f}s")
+
+        collection = ivfpq.get_collection("benchmark")
+        codes_bytes = sum(segment.codes.nbytes for segment in collection.segments if getattr(segment, "codes", None) is not None)
+        print(f"in-RAM PQ codes: {codes_bytes / 2**20:.1f} MiB, float32 vectors: {vectors.nbytes / 2**20:.1f} MiB")
+
+        exact, flat_qps = await run_queries(flat, queries, args.limit)
+        print(f"\n{'index':>8} {'nprobe':>7} {'recall@' + str(args.limit):>10} {'QPS':>9}")
+        print(f"{'flat':>8} {'-':>7} {1.0:>10.3f} {flat_qps:>9.1f}")
+
+        for nprobe in args.nprobe:
+            ivfpq.nprobe = nprobe
+            approximate, qps = await run_queries(ivfpq, queries, args.limit)
+            recall = np.mean([ len(a & e) / max(len(e), 1) for a, e in zip(approximate, exact) ])
+            print(f"{'ivfpq':>8} {nprobe:>7} {recall:>10.3f} {qps:>9.1f}")
+    finally:
+        shutil.rmtree(db_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recall / QPS benchmark of the NumPy flat and IVF-PQ vector stores.")
+    parser.add_argument("--vectors", help="Optional .npy float matrix to index instead of synthetic vectors.")
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--distance", default="cosine", choices=["cosine", "dot_product", "euclidean"])
+    parser.add_argument("--nlist", type=int, default=256)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[ 4, 8, 16, 32 ])
+    parser.add_argument("--pq-m", type=int, default=64)
+    parser.add_argument("--min-train-size", type=int, default=20000)
+    parser.add_argument("--train-sample-size", type=int, default=50000)
+    parser.add_argument("--rerank-factor", type=int, default=10)
+    parser.add_argument("--insert-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=0)
+
+    asyncio.run(main(parser.parse_args()))
@@ -11,6 +11,35 @@ from helpers.config import get_settings
 settings = get_settings()
 
 
+# LLM clients hold pooled HTTP connections, they outlive the per-task engines and event loops
+llm_clients = {}
+
+
+def get_llm_clients(settings, llm_provider_factory):
+    if not llm_clients:
+        # Generation Client ??
+        if settings.GENERATION_BACKENDS:
+            generation_client = llm_provider_factory.create_hedged(backends=settings.GENERATION_BACKENDS)
+        else:
+            generation_client = llm_provider_factory.create(provider=settings.GENERATION_BACKEND)
+        generation_client.set_generation_model(model_id=settings.GENERATION_MODEL_ID)
+        
+        # Embedding Client ??
+        if settings.EMBEDDING_BACKENDS:
+            embedding_client = llm_provider_factory.create_hedged(backends=settings.EMBEDDING_BACKENDS)
+        else:
+            embedding_client = llm_provider_factory.create(provider=settings.EMBEDDING_BACKEND)
+        embedding_client.set_embedding_model(
+            model_id=settings.EMBEDDING_MODEL_ID,
+            embedding_size=settings.EMBEDDING_MODEL_SIZE,
+        )
+        
+        llm_clients["generation"] = generation_client
+        llm_clients["embedding"] = embedding_client
+    
+    return llm_clients["generation"], llm_clients["embedding"]
+
+
 async def get_setup_utils():
     settings = get_settings()
     
@@ -26,16 +55,8 @@ async def get_setup_utils():
     llm_provider_factory = LLMProviderFactory(settings)
     vectordb_provider_factory = VectorDBProviderFactory(config=settings, db_client=db_client)
     
-    # Generation Client ??
-    generation_client = llm_provider_factory.create(provider=settings.GENERATION_BACKEND)
-    generation_client.set_generation_model(model_id=settings.GENERATION_MODEL_ID)
-    
-    # Embedding Client ??
-    embedding_client = llm_provider_factory.create(provider=settings.EMBEDDING_BACKEND)
-    embedding_client.set_embedding_model(
-        model_id=settings.EMBEDDING_MODEL_ID,
-        embedding_size=settings.EMBEDDING_MODEL_SIZE,
-    )
+    # Generation & Embedding Clients (long-lived, shared by the tasks of this worker process)
+    generation_client, embedding_client = get_llm_clients(settings, llm_provider_factory)
     
     # Vector DB Client ??
     vector_db_client = vectordb_provider_factory.create(
@@ -1,37 +1,117 @@
 from .BaseController import BaseController
-from models.db_schemes import Project, DataChunk
+from models.db_schemes import Project, DataChunk, RetrievedDocument
 from stores.llm.LLMEnums import DocumentTypeEnum
+from stores.vectordb.VectorDBEnums import SearchModeEnums, DiversifyEnums
+from stores.llm.tokenizer import get_token_counter
+from stores.llm.compressor import ContextCompressor
+from stores.llm.embedding_batcher import DocumentEmbeddingBatcher
+from stores.llm.dimension_reducer import EmbeddingReducer
+from stores.llm.embedding_matrix import to_embedding_matrix, normalize_rows
 from typing import List
+import numpy as np
 import json
 import logging
 
 logger = logging.getLogger('uvicorn.error')
 
 class NLPController(BaseController):
-    def __init__(self, vector_db_client, generation_client, embedding_client, template_parser):
+    def __init__(self, vector_db_client, generation_client, embedding_client, template_parser, single_flight=None, embedding_batcher=None, vector_cache=None):
         super().__init__()
         
         self.vector_db_client = vector_db_client
         self.generation_client = generation_client
         self.embedding_client = embedding_client
         self.template_parser = template_parser
+        self.single_flight = single_flight
+        self.embedding_batcher = embedding_batcher
+        self.vector_cache = vector_cache
+        
+        # Index-time dimension reduction (None keeps the full EMBEDDING_MODEL_SIZE vectors)
+        self.embedding_reducer = EmbeddingReducer.from_settings(
+            self.app_settings,
+            embedding_client=embedding_client,
+            projections_dir=self.get_database_path(db_name=self.app_settings.EMBEDDING_PROJECTIONS_PATH)
+        )
     
     def create_collection_name(self, project_id: str):
+        if self.embedding_reducer is not None:
+            # Vectors of another size or transform version never land in the same collection
+            transform_tag = self.embedding_reducer.get_collection_tag(project_id=project_id)
+            return f"collection_{self.embedding_reducer.reduced_size}_{transform_tag}_{project_id}".strip()
+        
         return f"collection_{self.vector_db_client.default_vector_size}_{project_id}".strip()
     
+    def get_embedding_size(self) -> int:
+        if self.embedding_reducer is not None:
+            return self.embedding_reducer.reduced_size
+        
+        return self.embedding_client.embedding_size
+    
+    def prepare_vectors(self, project: Project, vectors, fit: bool = False):
+        """The (n, size) float32 matrix that is stored / searched: reduced when configured, then L2-normalized once."""
+        matrix = to_embedding_matrix(vectors)
+        
+        if self.embedding_reducer is not None:
+            matrix = self.embedding_reducer.transform(project_id=project.project_id, matrix=matrix, fit=fit)
+            if matrix is None:
+                return None
+        
+        return normalize_rows(matrix)
+    
+    def needs_projection_fit(self, project: Project) -> bool:
+        return self.embedding_reducer is not None and self.embedding_reducer.needs_fit(project_id=project.project_id)
+    
+    async def fit_embedding_projection(self, project: Project, chunks: List[DataChunk]):
+        """Fit the project's projection (pca) on a sample of its chunks, before its first page is indexed."""
+        if not chunks or not self.needs_projection_fit(project=project):
+            return True
+        
+        texts = [ c.chunk_text for c in chunks ]
+        
+        embedding_batcher = DocumentEmbeddingBatcher.from_settings(self.app_settings, embedding_client=self.embedding_client)
+        vectors = await embedding_batcher.embed(texts=texts, document_type=DocumentTypeEnum.DOCUMENT.value)
+        
+        if vectors is None:
+            logger.error(f"Failed to embed the {len(texts)} projection sample chunks for project {project.project_id}.")
+            return False
+        
+        self.embedding_reducer.fit(project_id=project.project_id, vectors=to_embedding_matrix(vectors))
+        return True
+    
     async def reset_vector_db_collection(self, project: Project):
         collection_name = self.create_collection_name(project_id=project.project_id)
-        return await self.vector_db_client.delete_collection(collection_name=collection_name)
+        is_deleted = await self.vector_db_client.delete_collection(collection_name=collection_name)
+        
+        # The next indexing run refits the projection into a new collection
+        if self.embedding_reducer is not None:
+            self.embedding_reducer.reset(project_id=project.project_id)
+        
+        return is_deleted
+    
+    async def delete_assets_from_vector_db(self, project: Project, asset_ids: List[int], record_ids: List[int] = None, before_commit = None):
+        collection_name = self.create_collection_name(project_id=project.project_id)
+        
+        return await self.vector_db_client.delete_by_asset_ids(
+            collection_name=collection_name,
+            asset_ids=asset_ids,
+            record_ids=record_ids,
+            before_commit=before_commit
+        )
     
     async def get_vector_db_collection_info(self, project: Project):
         collection_name = self.create_collection_name(project_id=project.project_id)
         collection_info = await self.vector_db_client.get_collection_info(collection_name=collection_name)
         
-        return json.loads(
+        collection_info = json.loads(
             json.dumps(collection_info, default=lambda o: o.__dict__)
         )
+        
+        if self.embedding_reducer is not None and isinstance(collection_info, dict):
+            collection_info["embedding_reduction"] = self.embedding_reducer.get_metadata(project_id=project.project_id)
+        
+        return collection_info
     
-    async def index_into_vector_db (self, project: Project, chunks: List[DataChunk], chunks_ids: List[int], do_reset: bool = False):
+    async def index_into_vector_db (self, project: Project, chunks: List[DataChunk], chunks_ids: List[int], do_reset: bool = False, before_commit = None):
         
         # Step 1: Get Collection Name
         collection_name = self.create_collection_name(project_id=project.project_id)
@@ -39,106 +119,484 @@ class NLPController(BaseController):
         # Step 2: Manage Items
         texts = [ c.chunk_text for c in chunks ]
         metadata = [ c.chunk_metadata for c in  chunks]
+        asset_ids = [ c.chunk_asset_id for c in chunks ]
+        
+        # Packed into provider-sized batches, rate limited, failed batches retried alone
+        embedding_batcher = DocumentEmbeddingBatcher.from_settings(self.app_settings, embedding_client=self.embedding_client)
+        vectors = await embedding_batcher.embed(texts=texts, document_type=DocumentTypeEnum.DOCUMENT.value)
         
-        vectors = self.embedding_client.embed_text(text=texts, document_type=DocumentTypeEnum.DOCUMENT.value)
+        if vectors is None:
+            logger.error(f"Failed to embed {len(texts)} chunks for project {project.project_id}.")
+            return False
+        
+        # Fitted on a project sample beforehand, the first batch only fits it when that failed
+        vectors = self.prepare_vectors(project=project, vectors=vectors, fit=True)
+        if vectors is None:
+            logger.error(f"Failed to reduce the vectors of {len(texts)} chunks for project {project.project_id}.")
+            return False
         
         # Step 3: Create Collection if Not Exists
         _ = await self.vector_db_client.create_collection(
             collection_name=collection_name,
-            embedding_size=self.embedding_client.embedding_size,
+            embedding_size=self.get_embedding_size(),
             do_reset=do_reset
         )
         
         # Step 4: Insert Into Vector DB
-        _ = await self.vector_db_client.insert_many(
+        is_inserted = await self.vector_db_client.insert_many(
             collection_name=collection_name,
             texts=texts,
             metadata=metadata,
             vectors=vectors,
-            record_ids=chunks_ids
+            record_ids=chunks_ids,
+            asset_ids=asset_ids,
+            before_commit=before_commit
         )
         
+        # A failed page must not be skipped by the next checkpoint
+        if not is_inserted:
+            return False
+        
         return True
     
-    async def search_vector_db_collection(self, project: Project, text: str, limit: int = 10):
-        
-        # Step 1: Get Collection Name
-        
-        query_vector = None
+    async def embed_query(self, text: str):
+        if self.embedding_batcher is not None:
+            # Batched with the queries of concurrent requests
+            query_vector = await self.embedding_batcher.embed(text=text, document_type=DocumentTypeEnum.QUERY.value)
+            
+            if query_vector is None or len(query_vector) == 0:
+                logger.error("Failed to embed the search text.")
+                return None
+            
+            return query_vector
         
-        collection_name = self.create_collection_name(project_id=project.project_id)
-        
-        # Step 2: Embed Text or Get Text Embedding Vector
         vectors = self.embedding_client.embed_text(
             text=text, 
             document_type=DocumentTypeEnum.QUERY.value
         )
         
-        if not vectors or len(vectors) == 0:
+        if vectors is None or len(vectors) == 0:
             logger.error("Failed to embed the search text.")
+            return None
+        
+        return vectors[0]
+    
+    async def search_vector_db_collection(
+        self, 
+        project: Project, 
+        text: str, 
+        limit: int = 10, 
+        mode: str = SearchModeEnums.VECTOR.value, 
+        diversify: str = None, 
+        group_size: int = 1,
+        query_vector: list = None
+    ):
+        search_kwargs = dict(
+            project=project,
+            text=text,
+            limit=limit,
+            mode=mode,
+            diversify=diversify,
+            group_size=group_size,
+            query_vector=query_vector,
+        )
+        
+        if self.single_flight is None:
+            return await self.run_vector_db_search(**search_kwargs)
+        
+        # Identical concurrent searches share one embedding call and one vector DB query
+        return await self.single_flight.do(
+            key=self.single_flight.create_key("search", project.project_id, text, limit, mode, diversify, group_size),
+            compute=lambda: self.run_vector_db_search(**search_kwargs),
+            serialize=lambda results: [ doc.model_dump() for doc in results ] if results else None,
+            deserialize=lambda data: [ RetrievedDocument(**doc) for doc in data ] if data else False,
+        )
+    
+    async def run_vector_db_search(
+        self, 
+        project: Project, 
+        text: str, 
+        limit: int = 10, 
+        mode: str = SearchModeEnums.VECTOR.value, 
+        diversify: str = None, 
+        group_size: int = 1,
+        query_vector: list = None
+    ):
+        
+        if mode not in [ m.value for m in SearchModeEnums ]:
+            logger.error(f"Unsupported search mode: {mode}")
             return False
         
-        if isinstance(vectors, list) and len(vectors) > 0:
-            query_vector = vectors[0]
+        if diversify and diversify not in [ d.value for d in DiversifyEnums ]:
+            logger.error(f"Unsupported diversify stage: {diversify}")
+            return False
+        
+        # Step 1: Get Collection Name
+        collection_name = self.create_collection_name(project_id=project.project_id)
+        
+        # Step 2: Embed Text or Use The Precomputed Query Vector
+        if query_vector is None:
+            query_vector = await self.embed_query(text=text)
+        
+        if query_vector is not None and len(query_vector) > 0:
+            # The same transform as the indexed vectors
+            query_vectors = self.prepare_vectors(project=project, vectors=[ query_vector ])
+            query_vector = query_vectors[0] if query_vectors is not None else None
         
-        if not query_vector:
+        if query_vector is None or len(query_vector) == 0:
             logger.error("No valid vector found for the search text.")
             return False
         
-        # Step 3: Do Semantic Search
-        results = await self.vector_db_client.search_by_vector(
+        # Over-fetch candidates when a post-retrieval stage will drop some of them
+        candidates_limit = limit
+        if diversify:
+            candidates_limit = limit * self.app_settings.RETRIEVAL_CANDIDATES_MULTIPLIER
+        
+        # Step 3: Do Semantic (or Hybrid Lexical + Semantic) Search, Hot Projects From The Worker's RAM
+        search_kwargs = dict(
+            project=project,
             collection_name=collection_name,
-            vector=query_vector,
-            limit=limit
+            text=text,
+            query_vector=query_vector,
+            limit=limit,
+            candidates_limit=candidates_limit,
+            mode=mode,
+            diversify=diversify,
+            group_size=group_size,
         )
         
+        results = self.query_vector_cache(**search_kwargs)
+        if results is None:
+            results = await self.query_vector_db(**search_kwargs)
+        
         if not results or len(results) == 0:
             logger.error("No results found in the vector database.")
             return False
         
+        # Step 4: Optional Post-Retrieval Diversification
+        if diversify == DiversifyEnums.MMR.value:
+            results = self.select_mmr_documents(
+                query_vector=query_vector,
+                documents=results,
+                limit=limit,
+                lambda_mult=self.app_settings.RETRIEVAL_MMR_LAMBDA
+            )
+        
+        return results[:limit]
+    
+    def query_vector_cache(self, project: Project, collection_name: str, text: str, query_vector: list, limit: int, candidates_limit: int, mode: str, diversify: str, group_size: int):
+        """Search the worker's vector cache, None when the project is not cached (or the mode needs the vector DB)."""
+        if self.vector_cache is None or mode != SearchModeEnums.VECTOR.value:
+            return None
+        
+        if diversify == DiversifyEnums.GROUP_BY_ASSET.value:
+            return self.vector_cache.search_grouped(
+                project_id=project.project_id,
+                collection_name=collection_name,
+                vector=query_vector,
+                limit=limit,
+                group_size=group_size,
+                candidates_limit=candidates_limit
+            )
+        
+        return self.vector_cache.search(
+            project_id=project.project_id,
+            collection_name=collection_name,
+            vector=query_vector,
+            limit=candidates_limit,
+            with_vectors=diversify == DiversifyEnums.MMR.value
+        )
+    
+    async def query_vector_db(self, project: Project, collection_name: str, text: str, query_vector: list, limit: int, candidates_limit: int, mode: str, diversify: str, group_size: int):
+        if mode == SearchModeEnums.HYBRID.value:
+            return await self.vector_db_client.hybrid_search(
+                collection_name=collection_name,
+                text=text,
+                vector=query_vector,
+                limit=candidates_limit
+            )
+        
+        if diversify == DiversifyEnums.GROUP_BY_ASSET.value:
+            return await self.vector_db_client.search_grouped_by_vector(
+                collection_name=collection_name,
+                vector=query_vector,
+                limit=limit,
+                group_size=group_size,
+                candidates_limit=candidates_limit
+            )
+        
+        return await self.vector_db_client.search_by_vector(
+            collection_name=collection_name,
+            vector=query_vector,
+            limit=candidates_limit,
+            with_vectors=diversify == DiversifyEnums.MMR.value
+        )
+    
+    def select_mmr_documents(self, query_vector: list, documents: list, limit: int, lambda_mult: float = 0.5):
+        """
+        Greedy Max Marginal Relevance over the candidate vectors returned by the vector DB.
+        
+        Each step picks the candidate maximizing
+        lambda * sim(query, doc) - (1 - lambda) * max(sim(doc, already_selected)).
+        """
+        if len(documents) <= limit or any(doc.vector is None for doc in documents):
+            # Nothing to diversify (or the store did not return vectors, e.g. hybrid search)
+            return documents[:limit]
+        
+        candidates = np.asarray([ doc.vector for doc in documents ], dtype=np.float32)
+        candidates /= np.linalg.norm(candidates, axis=1, keepdims=True) + 1e-12
+        
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) + 1e-12)
+        
+        relevance = candidates @ query
+        similarity = candidates @ candidates.T
+        
+        selected = [ int(np.argmax(relevance)) ]
+        max_similarity = similarity[selected[0]].copy()
+        
+        while len(selected) < limit:
+            mmr_scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarity
+            mmr_scores[selected] = -np.inf
+            
+            next_idx = int(np.argmax(mmr_scores))
+            selected.append(next_idx)
+            max_similarity = np.maximum(max_similarity, similarity[next_idx])
+        
+        return [ documents[idx] for idx in selected ]
+    
+    async def search_vector_db_collection_batch(self, project: Project, texts: List[str] = None, vectors: List[list] = None, limit: int = 10):
+        
+        # Step 1: Get Collection Name
+        collection_name = self.create_collection_name(project_id=project.project_id)
+        
+        # Step 2: Use Precomputed Query Vectors, or Embed All Texts In One Provider Call
+        if not vectors:
+            if not texts:
+                logger.error("Batch search needs either texts or vectors.")
+                return False
+            
+            vectors = self.embedding_client.embed_text(
+                text=texts,
+                document_type=DocumentTypeEnum.QUERY.value
+            )
+            
+            if vectors is None or len(vectors) != len(texts):
+                logger.error("Failed to embed the batch search texts.")
+                return False
+        
+        if len({ len(v) for v in vectors }) != 1:
+            logger.error("Query vectors must all have the same size.")
+            return False
+        
+        vectors = self.prepare_vectors(project=project, vectors=vectors)
+        if vectors is None or vectors.shape[1] != self.get_embedding_size():
+            logger.error(f"Query vectors must have size {self.get_embedding_size()}.")
+            return False
+        
+        # Step 3: Do Semantic Search For All Queries In One Round Trip (Or From The Worker's RAM)
+        results = None
+        if self.vector_cache is not None:
+            results = self.vector_cache.search_many(
+                project_id=project.project_id,
+                collection_name=collection_name,
+                vectors=vectors,
+                limit=limit
+            )
+        
+        if results is None:
+            results = await self.vector_db_client.search_by_vectors(
+                collection_name=collection_name,
+                vectors=vectors,
+                limit=limit
+            )
+        
+        if not results:
+            logger.error("No results found in the vector database.")
+            return False
+        
         return results
     
-    async def answer_rag_question(self, project: Project, query: str, limit: int = 10):
-        answer, full_prompt, chat_history = None, None, None
-
-        # Step 1: Retrieve related documents
-        retrieved_documents = await self.search_vector_db_collection(
-            project=project,
-            text=query,
-            limit=limit,
+    async def search_similar_chunks(self, project: Project, chunk_id: int, limit: int = 10):
+        
+        # Step 1: Get Collection Name
+        collection_name = self.create_collection_name(project_id=project.project_id)
+        
+        # Step 2: Search By The Stored Chunk Vector, No Embedding Provider Call Needed
+        results = await self.vector_db_client.search_by_record_id(
+            collection_name=collection_name,
+            record_id=chunk_id,
+            limit=limit
         )
+        
+        if not results or len(results) == 0:
+            logger.error(f"No similar chunks found for chunk {chunk_id}.")
+            return False
+        
+        return results
+    
+    def build_rag_prompt(self, query: str, documents: List, min_document_tokens: int = 32):
+        """
+        Assemble the RAG prompt and count its tokens.
 
-        if not retrieved_documents:
-            return answer, full_prompt, chat_history
+        With GENERATION_CONTEXT_TOKEN_BUDGET set, documents are added best score first until
+        the budget is spent, after reserving room for the system prompt, the footer (query)
+        and the generation output; the last document that does not fit is cut to the remaining
+        room. Without a budget every document is kept, truncated by characters as before.
+        """
+        counter = get_token_counter(self.generation_client.generation_model_id)
 
-        # Step 2: Construct LLM prompt components
         system_prompt = self.template_parser.get_template("rag", "system_prompt")
-
-        documents_prompts = "\n".join([
-            self.template_parser.get_template(
-                "rag",
-                "document_prompt",
-                {
-                    "doc_num": idx + 1,
-                    "chunk_text": self.generation_client.process_text(doc.text),
-                }
-            )
-            for idx, doc in enumerate(retrieved_documents)
-        ])
-
         footer_prompt = self.template_parser.get_template(
             "rag",
             "footer_prompt",
             {"query": query}
         )
 
-        # Step 3: Merge all prompt parts into a single user message (Gemini-compatible)
+        context_budget = self.app_settings.GENERATION_CONTEXT_TOKEN_BUDGET
+
+        if not context_budget:
+            documents_prompts = [
+                self.template_parser.get_template(
+                    "rag",
+                    "document_prompt",
+                    {
+                        "doc_num": idx + 1,
+                        "chunk_text": self.generation_client.process_text(doc.text),
+                    }
+                )
+                for idx, doc in enumerate(documents)
+            ]
+        else:
+            max_output_tokens = self.generation_client.default_generation_max_output_tokens or 0
+
+            # "\n\n" joins the three prompt parts, "\n" joins the documents
+            available_tokens = (
+                context_budget
+                - counter.count(system_prompt)
+                - counter.count(footer_prompt)
+                - max_output_tokens
+                - 2 * counter.count("\n\n")
+            )
+
+            documents_prompts = []
+            for doc in sorted(documents, key=lambda d: d.score, reverse=True):
+                doc_num = len(documents_prompts) + 1
+                document_prompt = self.template_parser.get_template(
+                    "rag",
+                    "document_prompt",
+                    {"doc_num": doc_num, "chunk_text": doc.text}
+                )
+                document_tokens = counter.count(document_prompt) + 1
+
+                if document_tokens <= available_tokens:
+                    documents_prompts.append(document_prompt)
+                    available_tokens -= document_tokens
+                    continue
+
+                header_tokens = counter.count(self.template_parser.get_template(
+                    "rag",
+                    "document_prompt",
+                    {"doc_num": doc_num, "chunk_text": ""}
+                )) + 1
+                chunk_tokens = available_tokens - header_tokens
+
+                if chunk_tokens >= min_document_tokens:
+                    documents_prompts.append(self.template_parser.get_template(
+                        "rag",
+                        "document_prompt",
+                        {"doc_num": doc_num, "chunk_text": counter.truncate(doc.text, chunk_tokens)}
+                    ))
+
+                break
+
+            if len(documents_prompts) < len(documents):
+                logger.info(f"Context budget of {context_budget} tokens kept {len(documents_prompts)}/{len(documents)} documents.")
+
+        # Merge all prompt parts into a single user message (Gemini-compatible)
         full_prompt = "\n\n".join([
             system_prompt,        # Embed system-level instructions directly
-            documents_prompts,
+            "\n".join(documents_prompts),
             footer_prompt
         ])
 
+        return full_prompt, counter.count(full_prompt)
+
+    async def answer_rag_question(
+        self, 
+        project: Project, 
+        query: str, 
+        limit: int = 10, 
+        mode: str = SearchModeEnums.VECTOR.value, 
+        diversify: str = None, 
+        group_size: int = 1,
+        compress: bool = False,
+        query_vector: list = None
+    ):
+        answer_kwargs = dict(
+            project=project,
+            query=query,
+            limit=limit,
+            mode=mode,
+            diversify=diversify,
+            group_size=group_size,
+            compress=compress,
+            query_vector=query_vector,
+        )
+        
+        if self.single_flight is None:
+            return await self.run_rag_answer(**answer_kwargs)
+        
+        # Identical concurrent questions share one retrieval and one LLM generation
+        return await self.single_flight.do(
+            key=self.single_flight.create_key("answer", project.project_id, query, limit, mode, diversify, group_size, compress),
+            compute=lambda: self.run_rag_answer(**answer_kwargs),
+            serialize=lambda result: [ *result[:4], [ doc.model_dump() for doc in result[4] or [] ] ],
+            deserialize=lambda data: ( *data[:4], [ RetrievedDocument(**doc) for doc in data[4] ] ),
+        )
+
+    async def run_rag_answer(
+        self, 
+        project: Project, 
+        query: str, 
+        limit: int = 10, 
+        mode: str = SearchModeEnums.VECTOR.value, 
+        diversify: str = None, 
+        group_size: int = 1,
+        compress: bool = False,
+        query_vector: list = None
+    ):
+        answer, full_prompt, chat_history, prompt_tokens = None, None, None, None
+
+        # Step 1: Retrieve related documents
+        retrieved_documents = await self.search_vector_db_collection(
+            project=project,
+            text=query,
+            limit=limit,
+            mode=mode,
+            diversify=diversify,
+            group_size=group_size,
+            query_vector=query_vector,
+        )
+
+        if not retrieved_documents:
+            return answer, full_prompt, chat_history, prompt_tokens, retrieved_documents
+
+        # Optional: keep only the sentences relevant to the query
+        if compress:
+            compressor = ContextCompressor(
+                token_counter=get_token_counter(self.generation_client.generation_model_id),
+                lexical_weight=self.app_settings.GENERATION_COMPRESSION_LEXICAL_WEIGHT
+            )
+            retrieved_documents = compressor.compress(
+                query=query,
+                documents=retrieved_documents,
+                token_budget=self.app_settings.GENERATION_COMPRESSION_TOKEN_BUDGET
+            )
+
+        # Step 2: Construct the LLM prompt within the context token budget
+        full_prompt, prompt_tokens = self.build_rag_prompt(query=query, documents=retrieved_documents)
+
         chat_history = []  # No 'system' role allowed in Gemini — start clean
 
         # Step 4: Get response from LLM
@@ -149,6 +607,6 @@ class NLPController(BaseController):
 
         if not answer:
             logger.error("Failed to generate an answer from the LLM.")
-            return None, full_prompt, chat_history
+            return None, full_prompt, chat_history, prompt_tokens, retrieved_documents
 
-        return answer, full_prompt, chat_history
+        return answer, full_prompt, chat_history, prompt_tokens, retrieved_documents
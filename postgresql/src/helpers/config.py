@@ -20,25 +20,118 @@ class Settings (BaseSettings):
     
     GENERATION_BACKEND: str
     EMBEDDING_BACKEND: str
+    
+    # Hedged & failover backends, "PROVIDER" or "PROVIDER:model_id" (override the single backends above)
+    GENERATION_BACKENDS: List[str] = None
+    EMBEDDING_BACKENDS: List[str] = None
+    LLM_HEDGE_PERCENTILE: float = 0.95
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 2.0
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    LLM_CIRCUIT_RESET_SECONDS: float = 30
+    LLM_EWMA_ALPHA: float = 0.2
 
     OPENAI_API_KEY: str = None
     OPENAI_API_URL: str = None
     COHERE_API_KEY: str = None
     GEMINI_API_KEY: str = None
+    
+    LLM_HTTP2_ENABLED: bool = True
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 30
+    LLM_HTTP_CONNECT_TIMEOUT: float = 5
+    LLM_HTTP_READ_TIMEOUT: float = 60
+
+    # LOCAL backend (no network): hashed embeddings and a latency-modelled generation stub
+    LOCAL_SEED: int = 42
+    LOCAL_EMBEDDING_HASH_DIM: int = 4096
+    LOCAL_GENERATION_LATENCY_MEDIAN_MS: float = 300
+    LOCAL_GENERATION_LATENCY_SIGMA: float = 0.5
+    LOCAL_GENERATION_TOKENS_PER_SECOND: float = 50
+    LOCAL_GENERATION_TOKENS_PER_SECOND_STD: float = 10
+    LOCAL_GENERATION_MEAN_OUTPUT_TOKENS: int = 150
+
+    # LOCAL_ONNX embedding backend, EMBEDDING_MODEL_ID is a model directory (relative to LOCAL_ONNX_MODELS_DIR)
+    LOCAL_ONNX_MODELS_DIR: str = None
+    LOCAL_ONNX_MAX_LENGTH: int = 512
+    LOCAL_ONNX_BATCH_SIZE: int = 32
+    LOCAL_ONNX_INFERENCE_THREADS: int = 2
+    LOCAL_ONNX_INTRA_OP_THREADS: int = 4
+    LOCAL_ONNX_QUERY_PREFIX: str = ""
+    LOCAL_ONNX_DOCUMENT_PREFIX: str = ""
 
     GENERATION_MODEL_ID_LITERAL: List[str] = None
     GENERATION_MODEL_ID: str = None
     EMBEDDING_MODEL_ID: str = None
     EMBEDDING_MODEL_SIZE: int = None
+    EMBEDDING_REDUCED_SIZE: int = None
+    EMBEDDING_REDUCTION_METHOD: str = "native"
+    EMBEDDING_PROJECTIONS_PATH: str = "embedding_projections"
+    EMBEDDING_PCA_SAMPLE_SIZE: int = 10000
+    EMBEDDING_BATCH_ENABLED: bool = False
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5
+    EMBEDDING_BATCH_MAX_SIZE: int = 32
+    DOCUMENT_EMBEDDING_MAX_CONCURRENCY: int = 4
+    DOCUMENT_EMBEDDING_TOKENS_PER_MINUTE: int = None
+    DOCUMENT_EMBEDDING_MAX_RETRIES: int = 5
+    DOCUMENT_EMBEDDING_RETRY_BASE_DELAY: float = 1.0
+    INDEXING_PAGE_SIZE: int = 500
     DEFAULT_INPUT_MAX_CHARACTERS: int = None
     DEFAULT_GENERATION_MAX_OUTPUT_TOKENS: int = None
     DEFAULT_GENERATION_TEMPERATURE: float = None
+    GENERATION_CONTEXT_TOKEN_BUDGET: int = None
+    GENERATION_COMPRESSION_TOKEN_BUDGET: int = 1000
+    GENERATION_COMPRESSION_LEXICAL_WEIGHT: float = 0.7
     
     VECTOR_DB_BACKEND_LITERAL: List[str] = None
     VECTOR_DB_BACKEND: str
     VECTOR_DB_PATH: str
     VECTOR_DB_DISTANCE_METHOD: str = None
     VECTOR_DB_PGEVCTOR_INDEX_THRESHOLD: int = 100
+    VECTOR_DB_PGVECTOR_STORAGE: str = "vector"
+    VECTOR_DB_PGVECTOR_BINARY_INDEX: bool = False
+    VECTOR_DB_PGVECTOR_RERANK_MULTIPLIER: int = 4
+    VECTOR_DB_PGVECTOR_TABLE_LAYOUT: str = "full"
+    VECTOR_DB_HYBRID_RRF_K: int = 60
+    VECTOR_DB_HYBRID_CANDIDATES_MULTIPLIER: int = 2
+    VECTOR_DB_QDRANT_SPARSE_VECTORS: bool = False
+    VECTOR_DB_MAX_BATCH_QUERIES: int = 64
+    VECTOR_DB_NUMPY_PATH: str = "numpy_db"
+    VECTOR_DB_NUMPY_MAX_SEGMENTS: int = 8
+    VECTOR_DB_NUMPY_MAX_DELETED_RATIO: float = 0.2
+    VECTOR_DB_IVFPQ_NLIST: int = 256
+    VECTOR_DB_IVFPQ_NPROBE: int = 16
+    VECTOR_DB_IVFPQ_PQ_M: int = 64
+    VECTOR_DB_IVFPQ_MIN_TRAIN_SIZE: int = 20000
+    VECTOR_DB_IVFPQ_TRAIN_SAMPLE_SIZE: int = 50000
+    VECTOR_DB_IVFPQ_KMEANS_ITERATIONS: int = 20
+    VECTOR_DB_IVFPQ_RERANK_FACTOR: int = 10
+
+    # Per-worker in-memory copy of hot projects' vectors (invalidated through CACHE_REDIS_URL)
+    VECTOR_CACHE_ENABLED: bool = False
+    VECTOR_CACHE_MEMORY_BUDGET_MB: int = 512
+    VECTOR_CACHE_LOAD_AFTER_SEARCHES: int = 100
+    VECTOR_CACHE_DTYPE: str = "float32"
+    VECTOR_CACHE_TTL_SECONDS: int = 3600
+    
+    RETRIEVAL_CANDIDATES_MULTIPLIER: int = 4
+    RETRIEVAL_MMR_LAMBDA: float = 0.5
+    
+    CACHE_REDIS_URL: str = None
+    CACHE_KEY_PREFIX: str = "minirag"
+    ANSWER_CACHE_ENABLED: bool = False
+    ANSWER_CACHE_TTL_SECONDS: int = 3600
+    ANSWER_CACHE_STALE_TTL_SECONDS: int = 0
+    ANSWER_CACHE_MAX_ENTRIES_PER_PROJECT: int = 1000
+    ANSWER_CACHE_MAX_ENTRY_BYTES: int = 65536
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_SIMILARITY_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_MAX_ENTRIES_PER_PROJECT: int = 256
+    SEMANTIC_CACHE_TTL_SECONDS: int = 3600
+    SEMANTIC_CACHE_MEMORY_BUDGET_MB: int = 64
+    SINGLE_FLIGHT_ENABLED: bool = False
+    SINGLE_FLIGHT_CROSS_WORKER: bool = False
+    SINGLE_FLIGHT_LOCK_SECONDS: int = 30
     
     PRIMARY_LANGUAGE: str = "en"
     DEFAULT_LANGUAGE: str = "en"
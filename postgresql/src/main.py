@@ -4,11 +4,20 @@ from helpers.config import get_settings
 from stores.llm.LLMProviderFactory import LLMProviderFactory
 from stores.vectordb.VectorDBProviderFactory import VectorDBProviderFactory
 from stores.llm.templates.template_parser import TemplateParser
+from stores.llm.micro_batcher import EmbeddingMicroBatcher
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
+from utils.index_version_manager import IndexVersionManager
+from utils.answer_cache import AnswerCache
+from utils.semantic_cache import SemanticCache
+from utils.vector_cache import VectorCache
+from utils.single_flight import SingleFlight
 
 # Import Metrics Set-up
 from utils.metrics import setup_metrics
+import logging
+
+logger = logging.getLogger('uvicorn.error')
 
 app = FastAPI()
 
@@ -32,16 +41,25 @@ async def startup_span():
     vectordb_provider_factory = VectorDBProviderFactory(config=settings, db_client=app.db_client)
     
     # Generation Client ??
-    app.generation_client = llm_provider_factory.create(provider=settings.GENERATION_BACKEND)
+    if settings.GENERATION_BACKENDS:
+        app.generation_client = llm_provider_factory.create_hedged(backends=settings.GENERATION_BACKENDS)
+    else:
+        app.generation_client = llm_provider_factory.create(provider=settings.GENERATION_BACKEND)
     app.generation_client.set_generation_model(model_id=settings.GENERATION_MODEL_ID)
     
     # Embedding Client ??
-    app.embedding_client = llm_provider_factory.create(provider=settings.EMBEDDING_BACKEND)
+    if settings.EMBEDDING_BACKENDS:
+        app.embedding_client = llm_provider_factory.create_hedged(backends=settings.EMBEDDING_BACKENDS)
+    else:
+        app.embedding_client = llm_provider_factory.create(provider=settings.EMBEDDING_BACKEND)
     app.embedding_client.set_embedding_model(
         model_id=settings.EMBEDDING_MODEL_ID,
         embedding_size=settings.EMBEDDING_MODEL_SIZE,
     )
     
+    # Query Embedding Micro-Batching (disabled unless EMBEDDING_BATCH_ENABLED)
+    app.embedding_batcher = EmbeddingMicroBatcher.from_settings(settings, embedding_client=app.embedding_client)
+    
     # Vector DB Client ??
     app.vector_db_client = vectordb_provider_factory.create(
         provider=settings.VECTOR_DB_BACKEND
@@ -54,12 +72,50 @@ async def startup_span():
         language=settings.PRIMARY_LANGUAGE,
         default_language=settings.DEFAULT_LANGUAGE
     )
+    
+    # Index Versions & Answer Cache (disabled without CACHE_REDIS_URL)
+    app.index_version_manager = IndexVersionManager.from_settings(settings)
+    app.answer_cache = AnswerCache.from_settings(
+        settings,
+        redis_client=app.index_version_manager.redis_client if app.index_version_manager else None
+    )
+    
+    # Request Coalescing (per worker, optionally across workers through Redis)
+    app.single_flight = SingleFlight.from_settings(
+        settings,
+        redis_client=app.index_version_manager.redis_client if app.index_version_manager else None
+    )
+    
+    # Semantic Answer Cache (per worker, needs the index version broadcasts)
+    app.semantic_cache = SemanticCache.from_settings(settings)
+    if app.semantic_cache and not app.index_version_manager:
+        logger.warning("SEMANTIC_CACHE_ENABLED needs CACHE_REDIS_URL for invalidation, semantic cache disabled.")
+        app.semantic_cache = None
+    if app.semantic_cache:
+        app.semantic_cache.start_invalidation_listener(app.index_version_manager)
+    
+    # Vector Cache Of Hot Projects (per worker, needs the index version broadcasts)
+    app.vector_cache = VectorCache.from_settings(settings, vector_db_client=app.vector_db_client)
+    if app.vector_cache and not app.index_version_manager:
+        logger.warning("VECTOR_CACHE_ENABLED needs CACHE_REDIS_URL for invalidation, vector cache disabled.")
+        app.vector_cache = None
+    if app.vector_cache:
+        app.vector_cache.start_invalidation_listener(app.index_version_manager)
 
 
 @app.on_event("shutdown")
 async def shutdown_span():
     await app.db_engine.dispose()
     await app.vector_db_client.disconnect()
+    
+    if app.semantic_cache:
+        await app.semantic_cache.stop_invalidation_listener()
+    
+    if app.vector_cache:
+        await app.vector_cache.stop_invalidation_listener()
+    
+    if app.index_version_manager:
+        await app.index_version_manager.close()
 
 
 # app.router.lifespan.on_startup.append(startup_span)
@@ -3,6 +3,7 @@ from .db_schemes import Asset
 from .enums.DataBaseEnums import DataBaseEnum
 from bson import ObjectId
 from sqlalchemy.future import select
+from sqlalchemy import delete
 
 class AssetModel(BaseDataModel):
     
@@ -42,4 +43,12 @@ class AssetModel(BaseDataModel):
             result = await session.execute(stmt)
             record = result.scalar_one_or_none()
         return record
+    
+    async def delete_asset (self, asset_id: int):
+        # Its chunks have to be deleted first, they reference the asset
+        async with self.db_client() as session:
+            stmt = delete(Asset).where(Asset.asset_id == asset_id)
+            result = await session.execute(stmt)
+            await session.commit()
+        return result.rowcount
     
\ No newline at end of file
@@ -33,13 +33,18 @@ class ChunkModel(BaseDataModel):
             chunk = result.scalar_one_or_none()
         return chunk
 
-    async def insert_many_chunks(self, chunks: list, batch_size: int=100):
+    async def insert_many_chunks(self, chunks: list, batch_size: int=100, before_commit=None):
 
         async with self.db_client() as session:
             async with session.begin():
                 for i in range(0, len(chunks), batch_size):
                     batch = chunks[i:i+batch_size]
                     session.add_all(batch)
+                
+                # e.g. a task checkpoint, committed atomically with the chunks
+                if before_commit:
+                    await session.flush()
+                    await before_commit(session)
             await session.commit()
         return len(chunks)
 
@@ -50,6 +55,44 @@ class ChunkModel(BaseDataModel):
             await session.commit()
         return result.rowcount
     
+    async def delete_chunks_by_asset_ids(self, project_id: ObjectId, asset_ids: list, session=None):
+        """
+        Delete the chunks of some assets of a project.
+        With the session deleting their vectors, both are committed atomically by its transaction.
+        """
+        stmt = delete(DataChunk).where(
+            DataChunk.chunk_project_id == project_id,
+            DataChunk.chunk_asset_id.in_(asset_ids)
+        )
+        
+        if session is not None:
+            result = await session.execute(stmt)
+            return result.rowcount
+        
+        async with self.db_client() as session:
+            result = await session.execute(stmt)
+            await session.commit()
+        return result.rowcount
+    
+    async def get_chunk_ids_by_asset_ids(self, project_id: ObjectId, asset_ids: list):
+        async with self.db_client() as session:
+            stmt = select(DataChunk.chunk_id).where(
+                DataChunk.chunk_project_id == project_id,
+                DataChunk.chunk_asset_id.in_(asset_ids)
+            )
+            result = await session.execute(stmt)
+            chunk_ids = result.scalars().all()
+        return list(chunk_ids)
+    
+    def create_delete_hook(self, project_id: ObjectId, asset_ids: list):
+        """
+        Build a before_commit hook deleting the chunks of assets in the transaction deleting their vectors.
+        """
+        async def before_commit(session):
+            await self.delete_chunks_by_asset_ids(project_id=project_id, asset_ids=asset_ids, session=session)
+        
+        return before_commit
+    
     async def get_poject_chunks(self, project_id: ObjectId, page_num: int=1, page_size: int=50):
         async with self.db_client() as session:
             stmt = select(DataChunk).where(DataChunk.chunk_project_id == project_id).offset((page_num - 1) * page_size).limit(page_size)
@@ -57,12 +100,38 @@ class ChunkModel(BaseDataModel):
             records = result.scalars().all()
         return records
     
-    async def get_total_chunks_count(self, project_id: ObjectId):
+    async def get_project_chunks_after(self, project_id: ObjectId, last_chunk_id: int=0, page_size: int=50, asset_id: int=None):
+        # Keyset pagination, stable across resumes and cheap at any depth
+        async with self.db_client() as session:
+            stmt = select(DataChunk).where(
+                DataChunk.chunk_project_id == project_id,
+                DataChunk.chunk_id > last_chunk_id
+            )
+            if asset_id is not None:
+                stmt = stmt.where(DataChunk.chunk_asset_id == asset_id)
+            stmt = stmt.order_by(DataChunk.chunk_id).limit(page_size)
+            result = await session.execute(stmt)
+            records = result.scalars().all()
+        return records
+    
+    async def get_project_chunks_sample(self, project_id: ObjectId, sample_size: int):
+        # Random rows of the whole project, e.g. to fit its embedding projection
+        async with self.db_client() as session:
+            stmt = select(DataChunk).where(
+                DataChunk.chunk_project_id == project_id
+            ).order_by(func.random()).limit(sample_size)
+            result = await session.execute(stmt)
+            records = result.scalars().all()
+        return records
+    
+    async def get_total_chunks_count(self, project_id: ObjectId, asset_id: int=None):
         
         total_count = 0
         
         async with self.db_client() as session:
             count_sql = select(func.count(DataChunk.chunk_id)).where(DataChunk.chunk_project_id == project_id)
+            if asset_id is not None:
+                count_sql = count_sql.where(DataChunk.chunk_asset_id == asset_id)
             records_count = await session.execute(count_sql)
             total_count = records_count.scalar()
         
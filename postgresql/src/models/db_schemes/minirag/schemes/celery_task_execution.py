@@ -19,6 +19,9 @@ class CeleryTaskExecution(SQLAlchemyBase):
     task_args = Column(JSONB, nullable=True)
     result = Column(JSONB, nullable=True)
 
+    checkpoint = Column(JSONB, nullable=True)  # Last committed position, a retry resumes from it
+    progress = Column(JSONB, nullable=True)
+
     started_at = Column(DateTime(timezone=True), nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -2,7 +2,8 @@ from .minirag_base import SQLAlchemyBase
 from sqlalchemy import Column, Integer, String, ForeignKey, Index, DateTime, func
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import Optional, List
 import uuid
 
 
@@ -33,4 +34,7 @@ class DataChunk(SQLAlchemyBase):
 class RetrievedDocument(BaseModel):
     text: str
     score: float
+    chunk_id: Optional[int] = None
+    asset_id: Optional[int] = None
+    vector: Optional[List[float]] = Field(default=None, exclude=True)  # Only filled on request (e.g. for MMR)
 
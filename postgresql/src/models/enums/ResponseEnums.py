@@ -18,7 +18,12 @@ class ResponseSignal (Enum):
     GET_VECTOR_DB_COLLECTION_INFO_FAILED="Failed To Get Vector DB Collection Info!!"
     VECTOR_SEARCH_SUCCESS="Vector Search Success!!"
     VECTOR_SEARCH_FAILED="Vector Search Failed!!"
+    BATCH_SEARCH_INVALID_REQUEST="Batch Search Needs Texts Or Vectors Within The Allowed Size!!"
     RAG_ANSWER_FAILED="RAG Answer Failed!!"
     RAG_ANSWER_SUCCESS="RAG Answer Success!!"
     DATA_PUSH_TASK_READY="Task For Pushing Data Is Ready!!"
     PROCESS_AND_PUSH_WORKFLOW_READY="Process and Push Workflow Is Ready!!"
+    TASK_NOT_FOUND="Task Not Found!!"
+    TASK_PROGRESS_SUCCESS="Got Task Progress Successfully!!"
+    ASSET_DELETED_SUCCESSFULLY="Asset Deleted Successfully!!"
+    ASSET_DELETE_FAILED="Failed To Delete Asset!!"
@@ -1,18 +1,21 @@
 from fastapi import FastAPI, APIRouter, Depends, UploadFile, status, Request
 from fastapi.responses import JSONResponse
 from helpers.config import get_settings, Settings
-from controllers import DataController, ProjectController
+from controllers import DataController, ProjectController, NLPController
 from models import ResponseSignal
 import os
+import uuid
 import aiofiles
 import logging
 from .schemas.data_schema import ProcessRequest
 from models.ProjectModel import ProjectModel
 from models.AssetModel import AssetModel
+from models.ChunkModel import ChunkModel
 from models.db_schemes import Asset
 from models.enums.AssetTypeEnums import AssetTypeEnum
 from tasks.file_processing import process_project_files
 from tasks.process_workflow import process_and_push_workflow
+from utils.idempotency_manager import IdempotencyManager
 
 logger = logging.getLogger('uvicorn.error')
 
@@ -82,6 +85,73 @@ async def upload_data (request: Request, project_id: int, file: UploadFile, app_
         }
     )
 
+@data_router.delete ("/asset/{project_id}/{file_id}")
+async def delete_asset_endpoint (request: Request, project_id: int, file_id: str):
+    
+    project_model = await ProjectModel.create_instance(db_client=request.app.db_client)
+    
+    project = await project_model.get_project_or_create_one(project_id=project_id)
+    
+    asset_model = await AssetModel.create_instance(db_client=request.app.db_client)
+    
+    asset_record = await asset_model.get_asset_record(
+        asset_project_id=project.project_id,
+        asset_name=file_id
+    )
+    
+    if asset_record is None:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "Signal": ResponseSignal.FILE_ID_ERROR.value
+            }
+        )
+    
+    nlp_controller = NLPController(
+        vector_db_client=request.app.vector_db_client,
+        generation_client=request.app.generation_client,
+        embedding_client=request.app.embedding_client,
+        template_parser=request.app.template_parser
+    )
+    
+    chunk_model = await ChunkModel.create_instance(db_client=request.app.db_client)
+    
+    # The asset's vectors then its chunks, in one transaction when the vectors live in PostgreSQL
+    is_deleted = await nlp_controller.delete_assets_from_vector_db(
+        project=project,
+        asset_ids=[ asset_record.asset_id ],
+        record_ids=await chunk_model.get_chunk_ids_by_asset_ids(project_id=project.project_id, asset_ids=[ asset_record.asset_id ]),
+        before_commit=chunk_model.create_delete_hook(project_id=project.project_id, asset_ids=[ asset_record.asset_id ])
+    )
+    
+    if not is_deleted:
+        logger.error(f"Failed to delete the chunks of file {file_id} in project {project_id}.")
+        
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "Signal": ResponseSignal.ASSET_DELETE_FAILED.value
+            }
+        )
+    
+    _ = await asset_model.delete_asset(asset_id=asset_record.asset_id)
+    
+    file_path = os.path.join(ProjectController().get_project_path(project_id=project_id), asset_record.asset_name)
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    
+    # Cached answers may cite the deleted chunks
+    if request.app.index_version_manager:
+        await request.app.index_version_manager.bump_version(project.project_id)
+    
+    return JSONResponse(
+        content={
+            "Signal": ResponseSignal.ASSET_DELETED_SUCCESSFULLY.value,
+            "File_Id": file_id
+        }
+    )
+
+
 @data_router.post ("/process/{project_id}")
 async def process_endpoint (request: Request, project_id: int, process_request: ProcessRequest):
 
@@ -127,3 +197,40 @@ async def process_and_push_endpoint (request: Request, project_id: int, process_
         }
     )
 
+
+@data_router.get ("/tasks/progress/{task_id}")
+async def task_progress_endpoint (request: Request, task_id: str):
+    
+    try:
+        celery_task_id = uuid.UUID(task_id)
+    except ValueError:
+        celery_task_id = None
+    
+    task_records = None
+    if celery_task_id:
+        idempotency_manager = IdempotencyManager(request.app.db_client, request.app.db_engine)
+        task_records = await idempotency_manager.get_tasks_by_celery_id(celery_task_id=celery_task_id)
+    
+    if not task_records:
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "Signal": ResponseSignal.TASK_NOT_FOUND.value
+            }
+        )
+    
+    return JSONResponse(
+        content={
+            "Signal": ResponseSignal.TASK_PROGRESS_SUCCESS.value,
+            "Tasks": [
+                {
+                    "task_name": record.task_name,
+                    "status": record.status,
+                    "progress": record.progress,
+                    "checkpoint": record.checkpoint,
+                    "result": record.result
+                }
+                for record in task_records
+            ]
+        }
+    )
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, status, Request
 from fastapi.responses import JSONResponse
-from .schemas.nlp_schema import PushRequestSchema, SearchRequestSchema
+from .schemas.nlp_schema import PushRequestSchema, SearchRequestSchema, BatchSearchRequestSchema, SimilarSearchRequestSchema
+from helpers.config import get_settings
 from models.ProjectModel import ProjectModel
 from controllers import NLPController
 from models import ResponseSignal
@@ -19,7 +20,8 @@ async def index_project(request: Request, project_id: int, push_request: PushReq
     
     task = index_data_content.delay(
         project_id=project_id,
-        do_reset=push_request.do_reset
+        do_reset=push_request.do_reset,
+        asset_id=push_request.asset_id
     )
     
     return JSONResponse(
@@ -75,13 +77,19 @@ async def search_index (request: Request, project_id: int, search_request: Searc
         vector_db_client=request.app.vector_db_client,
         generation_client=request.app.generation_client,
         embedding_client=request.app.embedding_client,
-        template_parser=request.app.template_parser
+        template_parser=request.app.template_parser,
+        single_flight=request.app.single_flight,
+        embedding_batcher=request.app.embedding_batcher,
+        vector_cache=request.app.vector_cache
     )
     
     search_results = await nlp_controller.search_vector_db_collection(
         project=project,
         text=search_request.text,
-        limit=search_request.limit
+        limit=search_request.limit,
+        mode=search_request.mode,
+        diversify=search_request.diversify,
+        group_size=search_request.group_size
     )
     
     if not search_results:
@@ -101,8 +109,18 @@ async def search_index (request: Request, project_id: int, search_request: Searc
         }
     )
 
-@nlp_router.post("/index/answer/{project_id}")
-async def answer_rag (request: Request, project_id: int, search_request: SearchRequestSchema):
+@nlp_router.post("/index/search/batch/{project_id}")
+async def search_index_batch (request: Request, project_id: int, search_request: BatchSearchRequestSchema):
+    
+    queries = search_request.vectors or search_request.texts
+    
+    if not queries or len(queries) > get_settings().VECTOR_DB_MAX_BATCH_QUERIES:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "Signal": ResponseSignal.BATCH_SEARCH_INVALID_REQUEST.value
+            }
+        )
     
     project_model = await ProjectModel.create_instance(db_client=request.app.db_client)
     
@@ -122,31 +140,220 @@ async def answer_rag (request: Request, project_id: int, search_request: SearchR
         vector_db_client=request.app.vector_db_client,
         generation_client=request.app.generation_client,
         embedding_client=request.app.embedding_client,
-        template_parser=request.app.template_parser
+        template_parser=request.app.template_parser,
+        vector_cache=request.app.vector_cache
     )
     
-    answer, full_prompt, chat_history = await nlp_controller.answer_rag_question(
+    search_results = await nlp_controller.search_vector_db_collection_batch(
         project=project,
-        query=search_request.text,
+        texts=search_request.texts,
+        vectors=search_request.vectors,
         limit=search_request.limit
     )
     
-    if not answer:
-        logger.error(f"Failed to answer question for project {project_id} with query '{search_request.text}'.")
+    if not search_results:
+        logger.error(f"No batch search results found for project {project_id}.")
         
         return JSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
             content={
-                "Signal": ResponseSignal.RAG_ANSWER_FAILED.value
+                "Signal": ResponseSignal.VECTOR_SEARCH_FAILED.value
+            }
+        )
+    
+    return JSONResponse(
+        content={
+            "Signal": ResponseSignal.VECTOR_SEARCH_SUCCESS.value,
+            "SearchResults": [
+                [ result.dict() for result in query_results ]
+                for query_results in search_results
+            ],
+        }
+    )
+
+@nlp_router.post("/index/similar/{project_id}")
+async def search_similar (request: Request, project_id: int, similar_request: SimilarSearchRequestSchema):
+    
+    project_model = await ProjectModel.create_instance(db_client=request.app.db_client)
+    
+    project = await project_model.get_project_or_create_one(project_id=project_id)
+    
+    if not project:
+        logger.error(f"Project with ID {project_id} not found.")
+        
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "Signal": ResponseSignal.PROJECT_NOT_FOUND.value
+            }
+        )
+    
+    nlp_controller = NLPController(
+        vector_db_client=request.app.vector_db_client,
+        generation_client=request.app.generation_client,
+        embedding_client=request.app.embedding_client,
+        template_parser=request.app.template_parser
+    )
+    
+    search_results = await nlp_controller.search_similar_chunks(
+        project=project,
+        chunk_id=similar_request.chunk_id,
+        limit=similar_request.limit
+    )
+    
+    if not search_results:
+        logger.error(f"No similar chunks found for project {project_id} and chunk {similar_request.chunk_id}.")
+        
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "Signal": ResponseSignal.VECTOR_SEARCH_FAILED.value
             }
         )
     
     return JSONResponse(
         content={
+            "Signal": ResponseSignal.VECTOR_SEARCH_SUCCESS.value,
+            "SearchResults": [ result.dict() for result in search_results ],
+        }
+    )
+
+@nlp_router.post("/index/answer/{project_id}")
+async def answer_rag (request: Request, project_id: int, search_request: SearchRequestSchema):
+    
+    project_model = await ProjectModel.create_instance(db_client=request.app.db_client)
+    
+    project = await project_model.get_project_or_create_one(project_id=project_id)
+    
+    if not project:
+        logger.error(f"Project with ID {project_id} not found.")
+        
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "Signal": ResponseSignal.PROJECT_NOT_FOUND.value
+            }
+        )
+    
+    nlp_controller = NLPController(
+        vector_db_client=request.app.vector_db_client,
+        generation_client=request.app.generation_client,
+        embedding_client=request.app.embedding_client,
+        template_parser=request.app.template_parser,
+        single_flight=request.app.single_flight,
+        embedding_batcher=request.app.embedding_batcher,
+        vector_cache=request.app.vector_cache
+    )
+    
+    async def generate_answer(query_vector: list = None):
+        answer, full_prompt, chat_history, prompt_tokens, retrieved_documents = await nlp_controller.answer_rag_question(
+            project=project,
+            query=search_request.text,
+            limit=search_request.limit,
+            mode=search_request.mode,
+            diversify=search_request.diversify,
+            group_size=search_request.group_size,
+            compress=search_request.compress,
+            query_vector=query_vector
+        )
+        
+        if not answer:
+            return None
+        
+        return {
             "Signal": ResponseSignal.RAG_ANSWER_SUCCESS.value,
             "Answer": answer,
             "FullPrompt": full_prompt,
-            "ChatHistory": chat_history
+            "PromptTokens": prompt_tokens,
+            "ChatHistory": chat_history,
+            "ChunkIds": [ doc.chunk_id for doc in retrieved_documents ]
         }
+    
+    answer_cache = request.app.answer_cache
+    semantic_cache = request.app.semantic_cache
+    
+    # Only the caches need the index version, Redis being down bypasses them instead of failing the answer
+    index_version = 0
+    if (answer_cache or semantic_cache) and request.app.index_version_manager:
+        try:
+            index_version = await request.app.index_version_manager.get_version(project.project_id)
+        except Exception as e:
+            logger.error(f"Failed to read the index version of project {project.project_id}, bypassing the answer caches: {e}")
+            answer_cache, semantic_cache = None, None
+    
+    # Every request parameter that changes the answer, besides the query itself
+    cache_params = {
+        "limit": search_request.limit,
+        "mode": search_request.mode,
+        "diversify": search_request.diversify,
+        "group_size": search_request.group_size,
+        "compress": search_request.compress,
+        "model": request.app.generation_client.generation_model_id,
+        "language": request.app.template_parser.language,
+    }
+    
+    cache_key = None
+    if answer_cache:
+        cache_key = answer_cache.create_cache_key(
+            project_id=project.project_id,
+            index_version=index_version,
+            query=search_request.text,
+            **cache_params
+        )
+        
+        cached_answer, is_stale = await answer_cache.get(cache_key)
+        
+        if cached_answer:
+            if is_stale and await answer_cache.acquire_refresh_lock(cache_key):
+                answer_cache.refresh_in_background(project.project_id, cache_key, generate_answer)
+            
+            return JSONResponse(
+                content={**cached_answer, "Cached": True}
+            )
+    
+    query_vector, semantic_scope = None, None
+    if semantic_cache:
+        # Embedded once, the vector is reused by the retrieval below on a miss
+        query_vector = await nlp_controller.embed_query(text=search_request.text)
+        
+        if query_vector is not None:
+            semantic_scope = semantic_cache.create_scope(**cache_params)
+            cached_answer = semantic_cache.lookup(
+                project_id=project.project_id,
+                index_version=index_version,
+                scope=semantic_scope,
+                query_vector=query_vector
+            )
+            
+            if cached_answer:
+                return JSONResponse(
+                    content={**cached_answer, "Cached": True}
+                )
+    
+    answer_content = await generate_answer(query_vector=query_vector)
+    
+    if not answer_content:
+        logger.error(f"Failed to answer question for project {project_id} with query '{search_request.text}'.")
+        
+        return JSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "Signal": ResponseSignal.RAG_ANSWER_FAILED.value
+            }
+        )
+    
+    if answer_cache:
+        await answer_cache.set(project.project_id, cache_key, answer_content)
+    
+    if semantic_cache and query_vector is not None:
+        semantic_cache.store(
+            project_id=project.project_id,
+            index_version=index_version,
+            scope=semantic_scope,
+            query_vector=query_vector,
+            payload=answer_content
+        )
+    
+    return JSONResponse(
+        content=answer_content
     )
-
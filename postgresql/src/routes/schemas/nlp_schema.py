@@ -1,9 +1,23 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, List
 
 class PushRequestSchema(BaseModel):
     do_reset: Optional[int] = 0
+    asset_id: Optional[int] = None  # Index the chunks of one (re-processed) asset only
     
 class SearchRequestSchema(BaseModel):
     text: str
+    limit: Optional[int] = 5
+    mode: Optional[str] = "vector"  # "vector" | "hybrid"
+    diversify: Optional[str] = None  # None | "mmr" | "group_by_asset"
+    group_size: Optional[int] = 1  # Max chunks per asset with "group_by_asset"
+    compress: Optional[bool] = False  # Keep only the query-relevant sentences when answering
+
+class BatchSearchRequestSchema(BaseModel):
+    texts: Optional[List[str]] = None
+    vectors: Optional[List[List[float]]] = None  # Precomputed query vectors skip the embedding call
+    limit: Optional[int] = 5
+
+class SimilarSearchRequestSchema(BaseModel):
+    chunk_id: int
     limit: Optional[int] = 5
\ No newline at end of file
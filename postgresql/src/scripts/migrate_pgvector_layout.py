@@ -0,0 +1,51 @@
+"""
+Bring the existing pgvector collections up to the configured layout.
+
+Indexing runs never rewrite an existing table. This adds the tsv column and the GIN / chunk_id
+indexes to the full collections created before hybrid search existed (their hybrid searches fall
+back to vector search until then). When VECTOR_DB_PGVECTOR_TABLE_LAYOUT is "vectors_only", it
+then migrates the full collections to it. Running workers reload the layout of a migrated
+collection on their next query against it.
+
+    python -m scripts.migrate_pgvector_layout
+"""
+from stores.vectordb.VectorDBProviderFactory import VectorDBProviderFactory
+from stores.vectordb.VectorDBEnums import VectorDBEnums, PgVectorTableLayoutEnums
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from helpers.config import get_settings
+import asyncio
+
+
+async def main():
+    settings = get_settings()
+
+    postgres_conn = f"postgresql+asyncpg://{settings.POSTGRES_USERNAME}:{settings.POSTGRES_PASSWORD}@{settings.POSTGRES_HOST}:{settings.POSTGRES_PORT}/{settings.POSTGRES_MAIN_DB}"
+    db_engine = create_async_engine(postgres_conn)
+
+    db_client = sessionmaker(
+        db_engine,
+        class_=AsyncSession,
+        expire_on_commit=False
+    )
+
+    vector_db_client = VectorDBProviderFactory(config=settings, db_client=db_client).create(
+        provider=VectorDBEnums.PGVECTOR.value
+    )
+
+    try:
+        await vector_db_client.connect()
+
+        migrated = await vector_db_client.migrate_collections_text_search()
+        print(f"Added text search to {len(migrated)} collections: {migrated}")
+
+        if settings.VECTOR_DB_PGVECTOR_TABLE_LAYOUT == PgVectorTableLayoutEnums.VECTORS_ONLY.value:
+            migrated = await vector_db_client.migrate_collections_to_vectors_only()
+            print(f"Migrated {len(migrated)} collections to the vectors_only layout: {migrated}")
+    finally:
+        await vector_db_client.disconnect()
+        await db_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
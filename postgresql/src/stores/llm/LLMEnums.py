@@ -6,6 +6,8 @@ class LLMEnums(Enum):
     COHERE = "COHERE"
     DEEPSEEK = "DEEPSEEK"
     GEMINI = "GEMINI"
+    LOCAL = "LOCAL"
+    LOCAL_ONNX = "LOCAL_ONNX"
     
 class OpenAIEnums(Enum):
     SYSTEM = "system"
@@ -25,6 +27,11 @@ class GeminiEnums(Enum):
     USER = "user"
     ASSISTANT = "model"
 
+class EmbeddingReductionEnums(Enum):
+    NATIVE = "native"
+    MATRYOSHKA = "matryoshka"
+    PCA = "pca"
+
 class DocumentTypeEnum(Enum):
     DOCUMENT = "document"
     QUERY = "query"
@@ -1,5 +1,7 @@
 from .LLMEnums import LLMEnums
-from .providers import OpenAIProvider, CoHereProvider, GeminiProvider
+from .providers import OpenAIProvider, CoHereProvider, GeminiProvider, HedgedProvider, LocalProvider, LocalOnnxProvider
+from typing import List
+from .http_client import get_http_client
 
 class LLMProviderFactory:
     
@@ -15,6 +17,7 @@ class LLMProviderFactory:
                 default_input_max_characters=self.config.DEFAULT_INPUT_MAX_CHARACTERS,
                 default_generation_max_output_tokens=self.config.DEFAULT_GENERATION_MAX_OUTPUT_TOKENS,
                 default_generation_temperature=self.config.DEFAULT_GENERATION_TEMPERATURE,
+                http_client=get_http_client(self.config, provider=provider),
             )
 
         if provider == LLMEnums.COHERE.value:
@@ -23,6 +26,8 @@ class LLMProviderFactory:
                 default_input_max_characters=self.config.DEFAULT_INPUT_MAX_CHARACTERS,
                 default_generation_max_output_tokens=self.config.DEFAULT_GENERATION_MAX_OUTPUT_TOKENS,
                 default_generation_temperature=self.config.DEFAULT_GENERATION_TEMPERATURE,
+                http_client=get_http_client(self.config, provider=provider),
+                request_timeout=self.config.LLM_HTTP_READ_TIMEOUT,
             )
         
         if provider == LLMEnums.GEMINI.value:
@@ -31,6 +36,60 @@ class LLMProviderFactory:
                 default_input_max_characters=self.config.DEFAULT_INPUT_MAX_CHARACTERS,
                 default_generation_max_output_tokens=self.config.DEFAULT_GENERATION_MAX_OUTPUT_TOKENS,
                 default_generation_temperature=self.config.DEFAULT_GENERATION_TEMPERATURE,
+                request_timeout=self.config.LLM_HTTP_READ_TIMEOUT,
             )
         
-        return None
\ No newline at end of file
+        if provider == LLMEnums.LOCAL.value:
+            return LocalProvider(
+                default_input_max_characters=self.config.DEFAULT_INPUT_MAX_CHARACTERS,
+                default_generation_max_output_tokens=self.config.DEFAULT_GENERATION_MAX_OUTPUT_TOKENS,
+                default_generation_temperature=self.config.DEFAULT_GENERATION_TEMPERATURE,
+                hash_dim=self.config.LOCAL_EMBEDDING_HASH_DIM,
+                seed=self.config.LOCAL_SEED,
+                latency_median_ms=self.config.LOCAL_GENERATION_LATENCY_MEDIAN_MS,
+                latency_sigma=self.config.LOCAL_GENERATION_LATENCY_SIGMA,
+                tokens_per_second=self.config.LOCAL_GENERATION_TOKENS_PER_SECOND,
+                tokens_per_second_std=self.config.LOCAL_GENERATION_TOKENS_PER_SECOND_STD,
+                mean_output_tokens=self.config.LOCAL_GENERATION_MEAN_OUTPUT_TOKENS,
+            )
+        
+        if provider == LLMEnums.LOCAL_ONNX.value:
+            return LocalOnnxProvider(
+                models_dir=self.config.LOCAL_ONNX_MODELS_DIR,
+                default_input_max_characters=self.config.DEFAULT_INPUT_MAX_CHARACTERS,
+                max_length=self.config.LOCAL_ONNX_MAX_LENGTH,
+                batch_size=self.config.LOCAL_ONNX_BATCH_SIZE,
+                inference_threads=self.config.LOCAL_ONNX_INFERENCE_THREADS,
+                intra_op_threads=self.config.LOCAL_ONNX_INTRA_OP_THREADS,
+                query_prefix=self.config.LOCAL_ONNX_QUERY_PREFIX,
+                document_prefix=self.config.LOCAL_ONNX_DOCUMENT_PREFIX,
+            )
+        
+        return None
+    
+    def create_hedged (self, backends: List[str]):
+        """
+        Create a HedgedProvider over backends given as "PROVIDER" or "PROVIDER:model_id".
+        """
+        hedged_backends = []
+        
+        for backend in backends:
+            provider, _, model_id = backend.partition(":")
+            
+            client = self.create(provider=provider)
+            if client is None:
+                continue
+            
+            hedged_backends.append((backend, client, model_id or None))
+        
+        if not hedged_backends:
+            return None
+        
+        return HedgedProvider(
+            backends=hedged_backends,
+            hedge_percentile=self.config.LLM_HEDGE_PERCENTILE,
+            hedge_default_delay=self.config.LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+            failure_threshold=self.config.LLM_CIRCUIT_FAILURE_THRESHOLD,
+            reset_seconds=self.config.LLM_CIRCUIT_RESET_SECONDS,
+            ewma_alpha=self.config.LLM_EWMA_ALPHA,
+        )
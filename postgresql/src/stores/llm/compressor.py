@@ -0,0 +1,90 @@
+from typing import List
+from models.db_schemes import RetrievedDocument
+from stores.vectordb.sparse_encoder import tokenize
+from .tokenizer import TokenCounter
+import re
+
+
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.!?؟۔])\s+|\n+")
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text on sentence punctuation (latin and arabic) and line breaks."""
+    if not text:
+        return []
+
+    return [ sentence.strip() for sentence in SENTENCE_SPLIT_PATTERN.split(text) if sentence and sentence.strip() ]
+
+
+class ContextCompressor:
+    """
+    Extractive compression of retrieved documents, run before the prompt is built.
+
+    Every sentence is scored by its lexical overlap with the query, blended with the vector
+    score its document got against the query vector during retrieval, so no extra model call
+    is made. Each document keeps its best sentence, the next best sentences are added until
+    the token budget is spent, then all of them are put back in their original document and
+    sentence order.
+    """
+
+    def __init__(self, token_counter: TokenCounter, lexical_weight: float = 0.7):
+        """
+        :param token_counter: Counter of the generation model tokens.
+        :param lexical_weight: Weight of the query overlap against the document score (0..1).
+        """
+        self.token_counter = token_counter
+        self.lexical_weight = lexical_weight
+
+    def compress(self, query: str, documents: List[RetrievedDocument], token_budget: int) -> List[RetrievedDocument]:
+        if not documents or not token_budget:
+            return documents
+
+        query_terms = set(tokenize(query))
+
+        max_score = max(doc.score for doc in documents)
+        min_score = min(doc.score for doc in documents)
+        score_range = max_score - min_score
+
+        candidates = []
+        for doc_idx, doc in enumerate(documents):
+            doc_score = (doc.score - min_score) / score_range if score_range > 0 else 1.0
+
+            for sent_idx, sentence in enumerate(split_sentences(doc.text)):
+                overlap = len(query_terms & set(tokenize(sentence))) / len(query_terms) if query_terms else 0.0
+
+                score = self.lexical_weight * overlap + (1 - self.lexical_weight) * doc_score
+                candidates.append((score, doc_idx, sent_idx, sentence))
+
+        if not candidates:
+            return documents
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+
+        # The best sentence of every document first, so a paraphrased document is never dropped whole
+        best_candidates, other_candidates, seen_docs = [], [], set()
+        for candidate in candidates:
+            if candidate[1] in seen_docs:
+                other_candidates.append(candidate)
+            else:
+                seen_docs.add(candidate[1])
+                best_candidates.append(candidate)
+
+        selected = {}
+        remaining_tokens = token_budget
+        for _, doc_idx, sent_idx, sentence in best_candidates + other_candidates:
+            sentence_tokens = self.token_counter.count(sentence) + 1
+            if sentence_tokens > remaining_tokens:
+                continue
+
+            selected.setdefault(doc_idx, []).append((sent_idx, sentence))
+            remaining_tokens -= sentence_tokens
+
+        if not selected:
+            return documents
+
+        return [
+            documents[doc_idx].model_copy(update={
+                "text": " ".join(sentence for _, sentence in sorted(selected[doc_idx]))
+            })
+            for doc_idx in sorted(selected)
+        ]
@@ -0,0 +1,222 @@
+from contextlib import contextmanager
+from .LLMEnums import EmbeddingReductionEnums
+import numpy as np
+import logging
+import fcntl
+import json
+import uuid
+import os
+
+
+# Fitted projections of every project, shared by the requests / tasks of a process:
+# (projections_dir, project_id) -> (manifest file version, manifest, ProjectProjection or None)
+projection_cache = {}
+
+
+class ProjectProjection:
+    """A fitted PCA, vectors are centered on ``mean`` then projected on the ``components`` rows."""
+
+    def __init__(self, version: int, mean: np.ndarray, components: np.ndarray):
+        self.version = version
+        self.mean = mean
+        self.components = components
+
+    @classmethod
+    def fit(cls, version: int, vectors: np.ndarray, reduced_size: int):
+        mean = vectors.mean(axis=0)
+        centered = vectors - mean
+
+        # Fewer samples than components: the full basis completes the principal directions
+        _, _, vt = np.linalg.svd(centered, full_matrices=len(vectors) < reduced_size)
+
+        return cls(version=version, mean=mean, components=np.ascontiguousarray(vt[:reduced_size]))
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        return (vectors - self.mean) @ self.components.T
+
+
+class EmbeddingReducer:
+    """
+    Reduces the embeddings of documents and queries to ``reduced_size`` dimensions.
+
+    ``native`` asks the provider for shortened embeddings (OpenAI ``dimensions``, Gemini
+    ``output_dimensionality``), ``matryoshka`` truncates the full embeddings, and ``pca`` fits
+    a projection per project on a sample of up to ``pca_sample_size`` of its chunks before they
+    are indexed (on the first indexed batch as a fallback); the caller renormalizes the result.
+    Projections are persisted as ``project_<id>.v<version>.npz`` next to a ``project_<id>.json``
+    manifest, a reset bumps the version so a new collection is built with the refitted projection.
+    """
+
+    def __init__(self, method: str, input_size: int, reduced_size: int, projections_dir: str = None, pca_sample_size: int = 10000):
+        self.method = method
+        self.input_size = input_size
+        self.reduced_size = reduced_size
+        self.projections_dir = projections_dir
+        self.pca_sample_size = pca_sample_size
+
+        self.logger = logging.getLogger('uvicorn.error')
+
+    @classmethod
+    def from_settings(cls, settings, embedding_client, projections_dir: str):
+        if not settings.EMBEDDING_REDUCED_SIZE or settings.EMBEDDING_REDUCED_SIZE >= settings.EMBEDDING_MODEL_SIZE:
+            return None
+
+        method = settings.EMBEDDING_REDUCTION_METHOD
+        if method not in [ m.value for m in EmbeddingReductionEnums ]:
+            method = EmbeddingReductionEnums.PCA.value
+
+        if method == EmbeddingReductionEnums.NATIVE.value:
+            set_embedding_dimensions = getattr(embedding_client, "set_embedding_dimensions", None)
+
+            if not set_embedding_dimensions or not set_embedding_dimensions(settings.EMBEDDING_REDUCED_SIZE):
+                method = EmbeddingReductionEnums.PCA.value
+
+        return cls(
+            method=method,
+            input_size=settings.EMBEDDING_MODEL_SIZE,
+            reduced_size=settings.EMBEDDING_REDUCED_SIZE,
+            projections_dir=projections_dir,
+            pca_sample_size=settings.EMBEDDING_PCA_SAMPLE_SIZE,
+        )
+
+    def get_manifest_path(self, project_id: int) -> str:
+        return os.path.join(self.projections_dir, f"project_{project_id}.json")
+
+    def get_projection_path(self, project_id: int, version: int) -> str:
+        return os.path.join(self.projections_dir, f"project_{project_id}.v{version}.npz")
+
+    @contextmanager
+    def project_lock(self, project_id: int):
+        # API workers and Celery workers share the projections directory
+        with open(os.path.join(self.projections_dir, f".project_{project_id}.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def write_manifest(self, project_id: int, manifest: dict):
+        manifest_path = self.get_manifest_path(project_id)
+
+        tmp_path = f"{manifest_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+
+    def get_manifest(self, project_id: int):
+        """(manifest, fitted projection or None) of a project, reloaded when another process rewrites it."""
+        manifest_path = self.get_manifest_path(project_id)
+        cache_key = (self.projections_dir, project_id)
+
+        try:
+            manifest_stat = os.stat(manifest_path)
+        except FileNotFoundError:
+            projection_cache.pop(cache_key, None)
+            return { "version": 1, "fitted": False }, None
+
+        file_version = (manifest_stat.st_ino, manifest_stat.st_mtime_ns)
+        cached = projection_cache.get(cache_key)
+        if cached is not None and cached[0] == file_version:
+            return cached[1], cached[2]
+
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+        projection = None
+        if manifest["fitted"]:
+            with np.load(self.get_projection_path(project_id, manifest["version"])) as data:
+                projection = ProjectProjection(version=manifest["version"], mean=data["mean"], components=data["components"])
+
+        projection_cache[cache_key] = (file_version, manifest, projection)
+        return manifest, projection
+
+    def get_collection_tag(self, project_id: int) -> str:
+        if self.method == EmbeddingReductionEnums.PCA.value:
+            manifest, _ = self.get_manifest(project_id)
+            return f"pca{manifest['version']}"
+
+        return self.method
+
+    def get_metadata(self, project_id: int) -> dict:
+        metadata = {
+            "method": self.method,
+            "input_size": self.input_size,
+            "reduced_size": self.reduced_size,
+            "version": None,
+        }
+
+        if self.method == EmbeddingReductionEnums.PCA.value:
+            manifest, _ = self.get_manifest(project_id)
+            metadata.update(version=manifest["version"], fitted=manifest["fitted"], fit_size=manifest.get("fit_size"))
+
+        return metadata
+
+    def needs_fit(self, project_id: int) -> bool:
+        if self.method != EmbeddingReductionEnums.PCA.value:
+            return False
+
+        _, projection = self.get_manifest(project_id)
+        return projection is None
+
+    def reset(self, project_id: int):
+        """Retire the project's projection, the next indexed batch fits the next version."""
+        if self.method != EmbeddingReductionEnums.PCA.value:
+            return
+
+        with self.project_lock(project_id):
+            manifest, _ = self.get_manifest(project_id)
+
+            if manifest["fitted"]:
+                self.write_manifest(project_id, { "version": manifest["version"] + 1, "fitted": False })
+
+                try:
+                    os.remove(self.get_projection_path(project_id, manifest["version"]))
+                except FileNotFoundError:
+                    pass
+
+    def fit(self, project_id: int, vectors: np.ndarray):
+        with self.project_lock(project_id):
+            # Another worker may have fitted it while this one was waiting for the lock
+            manifest, projection = self.get_manifest(project_id)
+            if projection is not None:
+                return projection
+
+            sample = vectors
+            if len(vectors) > self.pca_sample_size:
+                sample = vectors[np.random.default_rng(project_id).choice(len(vectors), self.pca_sample_size, replace=False)]
+
+            if len(sample) < self.reduced_size:
+                self.logger.warning(
+                    f"Fitting the {self.reduced_size}-d projection of project {project_id} on {len(sample)} vectors only, "
+                    "reset the project to refit it on more data."
+                )
+
+            projection = ProjectProjection.fit(version=manifest["version"], vectors=sample, reduced_size=self.reduced_size)
+
+            np.savez(self.get_projection_path(project_id, projection.version), mean=projection.mean, components=projection.components)
+            self.write_manifest(project_id, { "version": projection.version, "fitted": True, "fit_size": len(sample) })
+
+        self.logger.info(f"Fitted projection v{projection.version} of project {project_id} on {len(sample)} vectors.")
+        return projection
+
+    def transform(self, project_id: int, matrix: np.ndarray, fit: bool = False):
+        """Reduce a full-size (n, size) matrix (a reduced one is kept), None when the project has no projection yet."""
+        if self.method == EmbeddingReductionEnums.NATIVE.value or matrix.shape[1] == self.reduced_size:
+            return matrix
+
+        if matrix.shape[1] != self.input_size:
+            self.logger.error(f"Vectors of size {matrix.shape[1]} can not be reduced, expected {self.input_size}.")
+            return None
+
+        if self.method == EmbeddingReductionEnums.MATRYOSHKA.value:
+            return np.ascontiguousarray(matrix[:, :self.reduced_size])
+
+        _, projection = self.get_manifest(project_id)
+        if projection is None:
+            if not fit:
+                self.logger.error(f"Project {project_id} has no fitted projection, index it first.")
+                return None
+
+            projection = self.fit(project_id, matrix)
+
+        return projection.transform(matrix)
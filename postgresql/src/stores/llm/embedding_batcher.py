@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import random
+import time
+from typing import List
+from .tokenizer import get_token_counter
+from .embedding_matrix import to_embedding_matrix
+import numpy as np
+
+
+def get_rate_limit_retry_after(error: Exception):
+    """
+    Return (is_rate_limited, retry_after_seconds) for an exception raised by a provider SDK.
+
+    OpenAI and Cohere errors carry a ``status_code`` and the HTTP response (with its
+    ``Retry-After`` header), google-api-core errors carry a ``code``.
+    """
+    status_code = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status_code != 429:
+        return False, None
+
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    retry_after = headers.get("retry-after") or headers.get("Retry-After")
+
+    try:
+        return True, float(retry_after) if retry_after else None
+    except ValueError:
+        return True, None
+
+
+class TokenBucketRateLimiter:
+    """
+    Token bucket over provider tokens per minute, adapting to rate-limit responses.
+
+    Callers reserve their tokens up front and sleep until the bucket covers them, so no
+    lock is needed inside an event loop. A 429 halves the refill rate and blocks the bucket
+    for the server's ``Retry-After``; each success gives back 5% of the configured rate.
+    """
+
+    def __init__(self, tokens_per_minute: int, min_rate_ratio: float = 0.1):
+        self.max_rate = tokens_per_minute / 60
+        self.min_rate = self.max_rate * min_rate_ratio
+        self.rate = self.max_rate
+        self.capacity = tokens_per_minute
+
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        return now
+
+    async def acquire(self, tokens: int):
+        now = self.refill()
+        self.tokens -= tokens
+
+        wait_seconds = max(
+            -self.tokens / self.rate if self.tokens < 0 else 0.0,
+            self.blocked_until - now
+        )
+
+        if wait_seconds > 0:
+            await asyncio.sleep(wait_seconds)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + 0.05 * self.max_rate)
+
+    def on_rate_limited(self, retry_after: float = None):
+        self.rate = max(self.min_rate, self.rate / 2)
+
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+
+# Shared by every task of a worker process, the provider quota is per API key
+rate_limiters = {}
+
+
+def get_rate_limiter(key: str, tokens_per_minute: int = None):
+    if not tokens_per_minute:
+        return None
+
+    if key not in rate_limiters:
+        rate_limiters[key] = TokenBucketRateLimiter(tokens_per_minute=tokens_per_minute)
+
+    return rate_limiters[key]
+
+
+class DocumentEmbeddingBatcher:
+    """
+    Embeds many documents with as few provider calls as the provider allows.
+
+    Texts are packed into batches under the provider's input-count and token limits, the
+    batches run concurrently under a shared rate limiter, and a failed batch is retried on
+    its own with jittered exponential backoff instead of failing the whole indexing task.
+    """
+
+    def __init__(
+        self,
+        embedding_client,
+        rate_limiter: TokenBucketRateLimiter = None,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        retry_base_delay: float = 1.0
+    ):
+        self.embedding_client = embedding_client
+        self.rate_limiter = rate_limiter
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+
+        self.max_inputs = getattr(embedding_client, "embedding_batch_max_inputs", None) or 96
+        self.max_tokens = getattr(embedding_client, "embedding_batch_max_tokens", None)
+        self.token_counter = get_token_counter(getattr(embedding_client, "embedding_model_id", None))
+
+        self.logger = logging.getLogger("uvicorn")
+
+    @classmethod
+    def from_settings(cls, settings, embedding_client):
+        return cls(
+            embedding_client=embedding_client,
+            rate_limiter=get_rate_limiter(
+                key=f"{settings.EMBEDDING_BACKEND}:{settings.EMBEDDING_MODEL_ID}",
+                tokens_per_minute=settings.DOCUMENT_EMBEDDING_TOKENS_PER_MINUTE
+            ),
+            max_concurrency=settings.DOCUMENT_EMBEDDING_MAX_CONCURRENCY,
+            max_retries=settings.DOCUMENT_EMBEDDING_MAX_RETRIES,
+            retry_base_delay=settings.DOCUMENT_EMBEDDING_RETRY_BASE_DELAY
+        )
+
+    def pack_batches(self, texts: List[str]):
+        """Return (start, end, tokens) spans of texts, each one a valid provider request."""
+        batches = []
+        start, batch_tokens = 0, 0
+
+        for idx, text in enumerate(texts):
+            text_tokens = self.token_counter.count(text)
+
+            is_full = idx - start >= self.max_inputs or (
+                self.max_tokens and batch_tokens + text_tokens > self.max_tokens
+            )
+
+            if is_full and idx > start:
+                batches.append((start, idx, batch_tokens))
+                start, batch_tokens = idx, 0
+
+            batch_tokens += text_tokens
+
+        if start < len(texts):
+            batches.append((start, len(texts), batch_tokens))
+
+        return batches
+
+    async def embed_batch(self, texts: List[str], tokens: int, document_type: str, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                retry_after = None
+
+                if self.rate_limiter:
+                    await self.rate_limiter.acquire(tokens)
+
+                try:
+                    vectors = await asyncio.to_thread(
+                        self.embedding_client.embed_text,
+                        text=texts,
+                        document_type=document_type
+                    )
+
+                    if vectors is not None and len(vectors) == len(texts):
+                        if self.rate_limiter:
+                            self.rate_limiter.on_success()
+                        return vectors
+
+                    self.logger.warning(f"Embedding batch of {len(texts)} texts returned no or partial vectors.")
+                except Exception as e:
+                    is_rate_limited, retry_after = get_rate_limit_retry_after(e)
+
+                    if is_rate_limited and self.rate_limiter:
+                        self.rate_limiter.on_rate_limited(retry_after)
+
+                    self.logger.warning(f"Embedding batch of {len(texts)} texts failed (attempt {attempt + 1}): {e}")
+
+                if attempt < self.max_retries:
+                    backoff = self.retry_base_delay * (2 ** attempt) * random.uniform(0.5, 1.5)
+                    await asyncio.sleep(max(backoff, retry_after or 0))
+
+        return None
+
+    async def embed(self, texts: List[str], document_type: str = None):
+        """Embed all texts in order, or return None if a batch still fails after its retries."""
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        batches = self.pack_batches(texts)
+
+        results = await asyncio.gather(*[
+            self.embed_batch(texts[start:end], tokens, document_type, semaphore)
+            for start, end, tokens in batches
+        ])
+
+        if any(vectors is None for vectors in results):
+            self.logger.error(f"Failed to embed {sum(r is None for r in results)}/{len(batches)} batches.")
+            return None
+
+        # One (n, size) float32 matrix for the whole page
+        return np.concatenate([ to_embedding_matrix(vectors) for vectors in results ])
@@ -0,0 +1,28 @@
+from typing import List
+import numpy as np
+import base64
+
+
+def to_embedding_matrix(vectors) -> np.ndarray:
+    """A C-contiguous (n, size) float32 matrix, no copy when ``vectors`` already is one."""
+    return np.ascontiguousarray(np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1))
+
+
+def decode_base64_embeddings(encoded: List[str]) -> np.ndarray:
+    """Decode little-endian float32 base64 embeddings straight into one preallocated matrix."""
+    first = np.frombuffer(base64.b64decode(encoded[0]), dtype="<f4")
+
+    matrix = np.empty((len(encoded), len(first)), dtype=np.float32)
+    matrix[0] = first
+    for row, embedding in enumerate(encoded[1:], start=1):
+        matrix[row] = np.frombuffer(base64.b64decode(embedding), dtype="<f4")
+
+    return matrix
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize the rows of a float32 matrix in place."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
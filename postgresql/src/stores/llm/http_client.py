@@ -0,0 +1,57 @@
+import httpx
+from utils.metrics import LLM_HTTP_REQUESTS, LLM_HTTP_CONNECTIONS_OPENED, LLM_HTTP_POOL_CONNECTIONS
+
+
+# Shared by every client of a provider in the process (e.g. generation and embedding)
+http_clients = {}
+
+
+def get_http_client(config, provider: str) -> httpx.Client:
+    if provider not in http_clients:
+        http_clients[provider] = build_http_client(config, provider=provider)
+
+    return http_clients[provider]
+
+
+def build_http_client(config, provider: str) -> httpx.Client:
+    """
+    Build the long-lived HTTP client of an LLM provider SDK.
+
+    One pooled (HTTP/2 when enabled) client per provider keeps connections alive across
+    calls. Requests and newly opened connections are counted per provider, so connection
+    churn under load shows up as opened connections growing with the requests.
+    """
+    def trace(event_name: str, info: dict):
+        if event_name == "connection.connect_tcp.complete":
+            LLM_HTTP_CONNECTIONS_OPENED.labels(provider=provider).inc()
+
+    def on_request(request: httpx.Request):
+        LLM_HTTP_REQUESTS.labels(provider=provider).inc()
+        request.extensions["trace"] = trace
+
+    http_client = httpx.Client(
+        http2=config.LLM_HTTP2_ENABLED,
+        limits=httpx.Limits(
+            max_connections=config.LLM_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=config.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.LLM_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=build_timeout(config),
+        event_hooks={"request": [ on_request ]},
+    )
+
+    # The pool is not public API, the gauge reads it defensively
+    def count_pool_connections():
+        pool = getattr(http_client._transport, "_pool", None)
+        return len(getattr(pool, "connections", []) or [])
+
+    LLM_HTTP_POOL_CONNECTIONS.labels(provider=provider).set_function(count_pool_connections)
+
+    return http_client
+
+
+def build_timeout(config) -> httpx.Timeout:
+    return httpx.Timeout(
+        timeout=config.LLM_HTTP_READ_TIMEOUT,
+        connect=config.LLM_HTTP_CONNECT_TIMEOUT,
+    )
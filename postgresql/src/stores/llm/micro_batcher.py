@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from utils.metrics import EMBEDDING_BATCH_QUEUE_WAIT, EMBEDDING_BATCH_SIZE
+
+
+class EmbeddingMicroBatcher:
+    """
+    Gathers concurrent single-text embedding requests into batched provider calls.
+
+    A request arriving while no batch is in flight is sent right away, so an idle service
+    pays no extra latency. Under load, requests queue up until ``max_batch_size`` of them
+    are pending or the oldest one waited ``max_wait_ms``, then go out as one call (run in
+    a thread, the provider clients are synchronous) and the vectors are fanned back out.
+    """
+
+    def __init__(self, embedding_client, max_wait_ms: float = 5, max_batch_size: int = 32):
+        self.embedding_client = embedding_client
+        self.max_wait_seconds = max_wait_ms / 1000
+        self.max_batch_size = max_batch_size
+
+        self.pending = {}
+        self.flush_handles = {}
+        self.in_flight_batches = 0
+        self.batch_tasks = set()
+
+        self.logger = logging.getLogger("uvicorn")
+
+    @classmethod
+    def from_settings(cls, settings, embedding_client):
+        if not settings.EMBEDDING_BATCH_ENABLED:
+            return None
+
+        return cls(
+            embedding_client=embedding_client,
+            max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE
+        )
+
+    async def embed(self, text: str, document_type: str = None):
+        future = asyncio.get_running_loop().create_future()
+
+        # Requests are batched per document type, providers embed queries and documents differently
+        pending = self.pending.setdefault(document_type, [])
+        pending.append((text, future, time.perf_counter()))
+
+        if self.in_flight_batches == 0 or len(pending) >= self.max_batch_size:
+            self.flush(document_type)
+        elif document_type not in self.flush_handles:
+            self.flush_handles[document_type] = asyncio.get_running_loop().call_later(
+                self.max_wait_seconds, self.flush, document_type
+            )
+
+        return await future
+
+    def flush(self, document_type: str):
+        flush_handle = self.flush_handles.pop(document_type, None)
+        if flush_handle:
+            flush_handle.cancel()
+
+        batch = self.pending.pop(document_type, [])
+        if not batch:
+            return
+
+        self.in_flight_batches += 1
+        task = asyncio.create_task(self.run_batch(batch, document_type))
+        self.batch_tasks.add(task)
+        task.add_done_callback(self.batch_tasks.discard)
+
+    async def run_batch(self, batch: list, document_type: str):
+        flushed_at = time.perf_counter()
+        for _, _, enqueued_at in batch:
+            EMBEDDING_BATCH_QUEUE_WAIT.observe(flushed_at - enqueued_at)
+        EMBEDDING_BATCH_SIZE.observe(len(batch))
+
+        try:
+            vectors = await asyncio.to_thread(
+                self.embedding_client.embed_text,
+                text=[ text for text, _, _ in batch ],
+                document_type=document_type
+            )
+
+            if vectors is None or len(vectors) != len(batch):
+                self.logger.error(f"Embedding batch of {len(batch)} texts returned no or partial vectors.")
+                vectors = [ None ] * len(batch)
+
+            for (_, future, _), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+        except Exception as e:
+            self.logger.error(f"Embedding batch of {len(batch)} texts failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.in_flight_batches -= 1
+
+            # Nothing left in flight, queued requests need not wait for their timer
+            if self.in_flight_batches == 0:
+                for pending_type in list(self.pending):
+                    self.flush(pending_type)
@@ -1,5 +1,6 @@
 from ..LLMInterface import LLMInterface
 from ..LLMEnums import CoHereEnums, DocumentTypeEnum
+from ..embedding_matrix import to_embedding_matrix
 import cohere
 import logging
 from typing import List, Union
@@ -17,6 +18,8 @@ class CoHereProvider(LLMInterface):
         default_input_max_characters: int=1000,
         default_generation_max_output_tokens: int=1000,
         default_generation_temperature: float=0.1,
+        http_client=None,
+        request_timeout: float = None,
     ):
         """
         Initialize the CoHereProvider with the given API key and optional parameters.
@@ -25,6 +28,8 @@ class CoHereProvider(LLMInterface):
         :param default_input_max_characters: The default maximum number of input tokens (optional).
         :param default_generation_max_output_tokens: The default maximum number of output tokens for generation (optional).
         :param default_generation_temperature: The default temperature for generation (optional).
+        :param http_client: A long-lived pooled httpx.Client carrying the timeouts (optional).
+        :param request_timeout: Per request timeout in seconds (optional).
         """
         self.api_key = api_key
 
@@ -37,10 +42,15 @@ class CoHereProvider(LLMInterface):
         self.embedding_model_id = None
         self.embedding_size = None
         
-        self.client = cohere.Client(api_key=self.api_key)
+        # With a custom httpx_client the SDK sends timeout=None on every request, overriding the client's own
+        self.client = cohere.Client(api_key=self.api_key, httpx_client=http_client, timeout=request_timeout)
         
         self.enums = CoHereEnums
         
+        # Limits of a single embedding request (inputs, total tokens) enforced by the API
+        self.embedding_batch_max_inputs = 96
+        self.embedding_batch_max_tokens = None
+        
         self.logger = logging.getLogger(__name__)
 
     
@@ -78,7 +88,7 @@ class CoHereProvider(LLMInterface):
         response = self.client.chat (
             model=self.generation_model_id,
             chat_history=formatted_chat_history,
-            message=self.process_text(prompt),
+            message=prompt,
             temperature=temperature,
             max_tokens=max_output_tokens,
         )
@@ -116,7 +126,7 @@ class CoHereProvider(LLMInterface):
             self.logger.error("Failed to get embedding from CoHere API.")
             return None
         
-        return [f for f in response.embeddings.float]
+        return to_embedding_matrix(response.embeddings.float)
     
     def construct_prompt (self, prompt: str, role: str):
         return {
@@ -1,5 +1,6 @@
 from ..LLMInterface import LLMInterface
 from ..LLMEnums import GeminiEnums
+from ..embedding_matrix import to_embedding_matrix
 import logging
 import google.generativeai as genai
 from typing import List, Union
@@ -18,6 +19,7 @@ class GeminiProvider(LLMInterface):
         default_input_max_characters: int = 1000,
         default_generation_max_output_tokens: int = 1000,
         default_generation_temperature: float = 0.1,
+        request_timeout: float = None,
     ):
         """
         Initialize the GeminiProvider with the given API key and optional parameters.
@@ -26,17 +28,29 @@ class GeminiProvider(LLMInterface):
         :param default_input_max_characters: Max number of characters in input prompt.
         :param default_generation_max_output_tokens: Max number of output tokens.
         :param default_generation_temperature: Generation randomness/creativity.
+        :param request_timeout: Per-call timeout in seconds (the SDK keeps its own gRPC channel).
         """
         self.api_key = api_key
         self.default_input_max_characters = default_input_max_characters
         self.default_generation_max_output_tokens = default_generation_max_output_tokens
         self.default_generation_temperature = default_generation_temperature
 
+        self.request_timeout = request_timeout
+
         self.generation_model_id = None
         self.embedding_model_id = None
         self.embedding_size = None
+        self.embedding_dimensions = None
+
+        # GenerativeModel handles, built once per model id
+        self.generative_models = {}
 
         self.enums = GeminiEnums
+        
+        # Limits of a single embedding request (inputs, total tokens) enforced by the API
+        self.embedding_batch_max_inputs = 100
+        self.embedding_batch_max_tokens = None
+
         self.logger = logging.getLogger(__name__)
         genai.configure(api_key=self.api_key)
 
@@ -47,6 +61,23 @@ class GeminiProvider(LLMInterface):
         self.embedding_model_id = model_id
         self.embedding_size = embedding_size
 
+    def set_embedding_dimensions(self, dimensions: int) -> bool:
+        # The legacy embedding-001 model has no output_dimensionality
+        if (self.embedding_model_id or "").endswith("embedding-001"):
+            return False
+
+        self.embedding_dimensions = dimensions
+        return True
+
+    def get_generative_model(self, model_id: str):
+        if model_id not in self.generative_models:
+            self.generative_models[model_id] = genai.GenerativeModel(model_name=model_id)
+
+        return self.generative_models[model_id]
+
+    def get_request_options(self):
+        return {"timeout": self.request_timeout} if self.request_timeout else None
+
     def process_text(self, text: str):
         return text[:self.default_input_max_characters].strip()
 
@@ -56,18 +87,19 @@ class GeminiProvider(LLMInterface):
             return None
 
         try:
-            model = genai.GenerativeModel(model_name=self.generation_model_id)
+            model = self.get_generative_model(self.generation_model_id)
             chat = model.start_chat(history=chat_history)
 
             max_output_tokens = max_output_tokens or self.default_generation_max_output_tokens
             temperature = temperature or self.default_generation_temperature
             
             response = chat.send_message(
-            self.process_text(prompt),
+            prompt,
             generation_config={
                 "max_output_tokens": max_output_tokens,
                 "temperature": temperature,
-            })
+            },
+            request_options=self.get_request_options())
 
             return response.text
         except Exception as e:
@@ -82,15 +114,24 @@ class GeminiProvider(LLMInterface):
         if isinstance(text, str):
             text = [text]
 
+        embedding_kwargs = {}
+        if self.embedding_dimensions:
+            embedding_kwargs["output_dimensionality"] = self.embedding_dimensions
+
         try:
             response = genai.embed_content(
                 model=self.embedding_model_id,
                 content=[self.process_text(t) for t in text],
                 task_type="retrieval_document" if document_type == "document" else "retrieval_query",
+                request_options=self.get_request_options(),
+                **embedding_kwargs
             )
 
-            return [ rec for rec in response["embedding"] ]
+            return to_embedding_matrix(response["embedding"])
         except Exception as e:
+            # Rate limits are left to the caller, which backs off and retries
+            if getattr(e, "code", None) == 429:
+                raise
             self.logger.error(f"Failed to get embedding from Gemini API: {e}")
             return None
 
@@ -0,0 +1,282 @@
+from ..LLMInterface import LLMInterface
+from ..embedding_batcher import get_rate_limit_retry_after
+from utils.metrics import LLM_BACKEND_LATENCY_EWMA, LLM_BACKEND_ERROR_EWMA, LLM_HEDGED_REQUESTS
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+from typing import List, Union
+import numpy as np
+import threading
+import logging
+import time
+
+
+class BackendStats:
+    """Latency and error EWMAs of one backend, plus its circuit breaker."""
+
+    def __init__(self, name: str, ewma_alpha: float = 0.2, failure_threshold: int = 5, reset_seconds: float = 30):
+        self.name = name
+        self.ewma_alpha = ewma_alpha
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+
+        self.latency_ewma = None
+        self.error_ewma = 0.0
+        self.latencies = deque(maxlen=200)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+        self.lock = threading.Lock()
+
+    def record(self, is_success: bool, latency: float):
+        with self.lock:
+            self.error_ewma += self.ewma_alpha * ((0.0 if is_success else 1.0) - self.error_ewma)
+
+            if is_success:
+                self.latencies.append(latency)
+                self.latency_ewma = latency if self.latency_ewma is None else (
+                    self.latency_ewma + self.ewma_alpha * (latency - self.latency_ewma)
+                )
+                self.consecutive_failures = 0
+                self.open_until = 0.0
+            else:
+                self.consecutive_failures += 1
+                # Trips after too many failures in a row, and re-trips when a half-open probe fails
+                if self.consecutive_failures >= self.failure_threshold:
+                    self.open_until = time.monotonic() + self.reset_seconds
+
+        LLM_BACKEND_ERROR_EWMA.labels(backend=self.name).set(self.error_ewma)
+        if self.latency_ewma is not None:
+            LLM_BACKEND_LATENCY_EWMA.labels(backend=self.name).set(self.latency_ewma)
+
+    def is_available(self):
+        return time.monotonic() >= self.open_until
+
+    def score(self):
+        # Unknown backends get tried, errors make a fast backend look slow
+        return (self.latency_ewma or 0.0) * (1 + 10 * self.error_ewma)
+
+    def latency_percentile(self, percentile: float, min_samples: int = 20):
+        with self.lock:
+            if len(self.latencies) < min_samples:
+                return None
+            return float(np.percentile(self.latencies, percentile * 100))
+
+
+class HedgedProvider(LLMInterface):
+    """
+    HedgedProvider wraps several LLM backends behind the LLMInterface.
+
+    Each call goes to the fastest healthy backend (latency EWMA weighted by error EWMA). If it
+    has not answered once its usual latency percentile has passed, a hedged request goes to the
+    next backend and the first answer wins; errors fail over to the remaining backends, and a
+    backend failing repeatedly is skipped by its circuit breaker until a reset period passed.
+
+    Embedding backends must share one vector space, so only backends with the same embedding
+    model id are kept (e.g. the same model behind several endpoints or keys).
+    """
+
+    def __init__(
+        self,
+        backends: List[tuple],
+        hedge_percentile: float = 0.95,
+        hedge_default_delay: float = 2.0,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30,
+        ewma_alpha: float = 0.2,
+    ):
+        """
+        Initialize the HedgedProvider with its backends.
+
+        :param backends: (name, provider, model_id) tuples, model_id may be None to use the one set later.
+        :param hedge_percentile: Latency percentile of a backend after which a hedged request is sent.
+        :param hedge_default_delay: Hedging delay in seconds until a backend has enough latency samples.
+        :param failure_threshold: Consecutive failures tripping a backend circuit breaker.
+        :param reset_seconds: Time a tripped backend is skipped before it gets probed again.
+        :param ewma_alpha: Weight of the newest sample in the latency and error EWMAs.
+        """
+        self.backends = [
+            {
+                "name": name,
+                "provider": provider,
+                "model_id": model_id,
+                "stats": BackendStats(name, ewma_alpha, failure_threshold, reset_seconds),
+            }
+            for name, provider, model_id in backends
+        ]
+
+        self.hedge_percentile = hedge_percentile
+        self.hedge_default_delay = hedge_default_delay
+
+        primary = self.backends[0]["provider"]
+        self.default_input_max_characters = primary.default_input_max_characters
+        self.default_generation_max_output_tokens = primary.default_generation_max_output_tokens
+        self.default_generation_temperature = primary.default_generation_temperature
+
+        self.generation_model_id = None
+        self.embedding_model_id = None
+        self.embedding_size = None
+
+        self.embedding_batch_max_inputs = None
+        self.embedding_batch_max_tokens = None
+
+        self.enums = primary.enums
+
+        # Threads for the backend calls, a losing hedged call is left to finish on its own
+        self.executor = ThreadPoolExecutor(max_workers=4 * len(self.backends))
+
+        self.logger = logging.getLogger("uvicorn")
+
+    def set_generation_model(self, model_id: str):
+        for backend in self.backends:
+            backend["provider"].set_generation_model(model_id=backend["model_id"] or model_id)
+
+        self.generation_model_id = self.backends[0]["model_id"] or model_id
+
+    def set_embedding_model(self, model_id: str, embedding_size: int):
+        same_space_backends = []
+        for backend in self.backends:
+            backend_model_id = backend["model_id"] or model_id
+
+            if backend_model_id != model_id:
+                self.logger.warning(
+                    f"Embedding backend {backend['name']} ({backend_model_id}) does not share the vector space of {model_id}, skipped."
+                )
+                continue
+
+            backend["provider"].set_embedding_model(model_id=backend_model_id, embedding_size=embedding_size)
+            same_space_backends.append(backend)
+
+        self.backends = same_space_backends
+
+        self.embedding_model_id = model_id
+        self.embedding_size = embedding_size
+
+        # A batch must be valid for whichever backend ends up serving it
+        self.embedding_batch_max_inputs = min(
+            (getattr(b["provider"], "embedding_batch_max_inputs", None) or 96) for b in self.backends
+        ) if self.backends else None
+        token_limits = [ b["provider"].embedding_batch_max_tokens for b in self.backends
+                         if getattr(b["provider"], "embedding_batch_max_tokens", None) ]
+        self.embedding_batch_max_tokens = min(token_limits) if token_limits else None
+
+    def set_embedding_dimensions(self, dimensions: int) -> bool:
+        # Shortened embeddings only share a space when every backend produces them
+        if not all(hasattr(b["provider"], "set_embedding_dimensions") for b in self.backends):
+            return False
+
+        return all([ b["provider"].set_embedding_dimensions(dimensions) for b in self.backends ])
+
+    def process_text(self, text: str):
+        return text[:self.default_input_max_characters].strip()
+
+    def ordered_backends(self):
+        available = [ b for b in self.backends if b["stats"].is_available() ]
+        tripped = [ b for b in self.backends if not b["stats"].is_available() ]
+
+        # With every circuit open, still try the ones closest to their reset
+        return sorted(available, key=lambda b: b["stats"].score()) + \
+            sorted(tripped, key=lambda b: b["stats"].open_until)
+
+    def timed_call(self, backend: dict, method_name: str, kwargs: dict):
+        started_at = time.perf_counter()
+
+        # Hedged calls run concurrently, none of them may see another one's history changes
+        if "chat_history" in kwargs:
+            kwargs = { **kwargs, "chat_history": list(kwargs["chat_history"]) }
+
+        try:
+            result = getattr(backend["provider"], method_name)(**kwargs)
+        except Exception as e:
+            backend["stats"].record(is_success=False, latency=time.perf_counter() - started_at)
+
+            # Rate limits reach the caller (e.g. the embedding batcher backs off on them), other errors fail over
+            is_rate_limited, _ = get_rate_limit_retry_after(e)
+            if is_rate_limited:
+                self.logger.warning(f"Backend {backend['name']} is rate limited on {method_name}: {e}")
+                raise
+
+            self.logger.error(f"Backend {backend['name']} failed on {method_name}: {e}")
+            return None
+
+        backend["stats"].record(is_success=result is not None, latency=time.perf_counter() - started_at)
+
+        return result
+
+    def call(self, method_name: str, **kwargs):
+        candidates = self.ordered_backends()
+        if not candidates:
+            self.logger.error("No backend is configured.")
+            return None
+
+        pending = {}
+        next_idx = 0
+        is_hedged = False
+        rate_limit_error = None
+
+        def launch():
+            nonlocal next_idx
+            backend = candidates[next_idx]
+            next_idx += 1
+            pending[self.executor.submit(self.timed_call, backend, method_name, kwargs)] = backend
+            return backend
+
+        primary = launch()
+
+        while pending:
+            hedge_delay = None
+            if not is_hedged and next_idx < len(candidates):
+                hedge_delay = primary["stats"].latency_percentile(self.hedge_percentile)
+                if hedge_delay is None:
+                    hedge_delay = self.hedge_default_delay
+
+            done, _ = wait(list(pending), timeout=hedge_delay, return_when=FIRST_COMPLETED)
+
+            if not done:
+                hedged_backend = launch()
+                is_hedged = True
+                LLM_HEDGED_REQUESTS.labels(backend=hedged_backend["name"]).inc()
+                continue
+
+            for future in done:
+                pending.pop(future)
+
+                # timed_call only raises rate limit errors, the other backends are still tried
+                try:
+                    result = future.result()
+                except Exception as e:
+                    rate_limit_error = e
+                    continue
+
+                if result is not None:
+                    return result
+
+            # Fail over once nothing is left in flight
+            if not pending and next_idx < len(candidates):
+                primary = launch()
+
+        self.logger.error(f"Every backend failed on {method_name}.")
+
+        # The caller's rate limiting adapts to it (Retry-After included) instead of seeing a plain failure
+        if rate_limit_error is not None:
+            raise rate_limit_error
+
+        return None
+
+    def generate_text(self, prompt: str, chat_history: list = [], max_output_tokens: int = None, temperature: float = None):
+        return self.call(
+            "generate_text",
+            prompt=prompt,
+            chat_history=chat_history or [],
+            max_output_tokens=max_output_tokens,
+            temperature=temperature,
+        )
+
+    def embed_text(self, text: Union[str, List[str]], document_type: str = None):
+        return self.call(
+            "embed_text",
+            text=text,
+            document_type=document_type,
+        )
+
+    def construct_prompt(self, prompt: str, role: str):
+        return self.backends[0]["provider"].construct_prompt(prompt=prompt, role=role)
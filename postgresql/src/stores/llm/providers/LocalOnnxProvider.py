@@ -0,0 +1,208 @@
+from ..LLMInterface import LLMInterface
+from ..LLMEnums import OpenAIEnums, DocumentTypeEnum
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Union
+import numpy as np
+import logging
+import os
+
+try:
+    import onnxruntime
+    from tokenizers import Tokenizer
+except ImportError:  # pragma: no cover - only needed with EMBEDDING_BACKEND=LOCAL_ONNX
+    onnxruntime = None
+    Tokenizer = None
+
+
+class LocalOnnxProvider(LLMInterface):
+    """
+    LocalOnnxProvider runs a sentence embedding model exported to ONNX on the CPU.
+
+    The model directory holds ``model.onnx`` (or ``onnx/model.onnx``) and the Hugging Face
+    ``tokenizer.json``. Inputs are sorted by token length and cut into batches padded only to
+    their own longest input, so short chunks do not pay for long ones; the batches run in a
+    thread pool (ONNX Runtime releases the GIL) and the token embeddings are mean pooled.
+    The provider only embeds, generation has to use another backend.
+    """
+
+    def __init__(
+        self,
+        models_dir: str = None,
+        default_input_max_characters: int = 1000,
+        max_length: int = 512,
+        batch_size: int = 32,
+        inference_threads: int = 2,
+        intra_op_threads: int = 4,
+        query_prefix: str = "",
+        document_prefix: str = "",
+    ):
+        """
+        Initialize the LocalOnnxProvider.
+
+        :param models_dir: Directory the embedding model ids are resolved in (absolute ids are used as is).
+        :param default_input_max_characters: The default maximum number of input characters (optional).
+        :param max_length: Maximum number of tokens per input, longer inputs are truncated.
+        :param batch_size: Maximum number of inputs per inference batch.
+        :param inference_threads: Number of batches run concurrently.
+        :param intra_op_threads: Number of ONNX Runtime threads used by each batch.
+        :param query_prefix: Text prepended to queries (e.g. "query: " for E5 models).
+        :param document_prefix: Text prepended to documents (e.g. "passage: " for E5 models).
+        """
+        self.models_dir = models_dir
+        self.default_input_max_characters = default_input_max_characters
+        self.default_generation_max_output_tokens = None
+        self.default_generation_temperature = None
+
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.intra_op_threads = intra_op_threads
+        self.query_prefix = query_prefix or ""
+        self.document_prefix = document_prefix or ""
+
+        self.generation_model_id = None
+
+        self.embedding_model_id = None
+        self.embedding_size = None
+        self.session = None
+        self.tokenizer = None
+        self.input_names = []
+
+        self.enums = OpenAIEnums
+
+        # Bigger requests are split into inference batches anyway, this only bounds memory
+        self.embedding_batch_max_inputs = batch_size * inference_threads * 4
+        self.embedding_batch_max_tokens = None
+
+        self.executor = ThreadPoolExecutor(max_workers=inference_threads)
+
+        self.logger = logging.getLogger(__name__)
+
+    def set_generation_model(self, model_id: str):
+        self.generation_model_id = model_id
+
+    def resolve_model_dir(self, model_id: str):
+        if os.path.isabs(model_id) or not self.models_dir:
+            return model_id
+        return os.path.join(self.models_dir, model_id)
+
+    def set_embedding_model(self, model_id: str, embedding_size: int):
+        if onnxruntime is None or Tokenizer is None:
+            self.logger.error("onnxruntime and tokenizers are required by the LOCAL_ONNX backend.")
+            return
+
+        model_dir = self.resolve_model_dir(model_id)
+
+        model_path = next(
+            (path for path in (os.path.join(model_dir, "model.onnx"), os.path.join(model_dir, "onnx", "model.onnx"))
+             if os.path.exists(path)),
+            None
+        )
+        tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+
+        if model_path is None or not os.path.exists(tokenizer_path):
+            self.logger.error(f"No model.onnx and tokenizer.json found in {model_dir}.")
+            return
+
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = self.intra_op_threads
+        # Parallelism across batches comes from the thread pool
+        session_options.inter_op_num_threads = 1
+        session_options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        session_options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = onnxruntime.InferenceSession(
+            model_path, sess_options=session_options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [ model_input.name for model_input in self.session.get_inputs() ]
+
+        # Padding is done per batch, the tokenizer only truncates
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.no_padding()
+        self.tokenizer.enable_truncation(max_length=self.max_length)
+
+        self.embedding_model_id = model_id
+        self.embedding_size = embedding_size
+
+        output_size = self.session.get_outputs()[0].shape[-1]
+        if isinstance(output_size, int) and output_size != embedding_size:
+            self.logger.warning(
+                f"Model {model_id} outputs {output_size} dimensions, EMBEDDING_MODEL_SIZE is {embedding_size}."
+            )
+
+    def process_text(self, text: str):
+        return text[:self.default_input_max_characters].strip()
+
+    def build_inputs(self, encodings: list):
+        max_len = max(len(encoding.ids) for encoding in encodings)
+
+        input_ids = np.zeros((len(encodings), max_len), dtype=np.int64)
+        attention_mask = np.zeros((len(encodings), max_len), dtype=np.int64)
+
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+
+        inputs = {
+            "input_ids": input_ids,
+            "attention_mask": attention_mask,
+            "token_type_ids": np.zeros_like(input_ids),
+        }
+
+        return { name: inputs[name] for name in self.input_names if name in inputs }
+
+    def run_batch(self, encodings: list):
+        inputs = self.build_inputs(encodings)
+        output = self.session.run(None, inputs)[0]
+
+        if output.ndim == 3:
+            # Mean pooling over the real (not padded) tokens
+            mask = inputs["attention_mask"][..., None].astype(np.float32)
+            output = (output * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+        output = output.astype(np.float32)
+        return output / (np.linalg.norm(output, axis=1, keepdims=True) + 1e-12)
+
+    def embed_text(self, text: Union[str, List[str]], document_type: str = None):
+        if self.session is None:
+            self.logger.error("Embedding model for Local ONNX was not set.")
+            return None
+
+        if isinstance(text, str):
+            text = [text]
+
+        prefix = self.query_prefix if document_type == DocumentTypeEnum.QUERY.value else self.document_prefix
+        encodings = self.tokenizer.encode_batch([ prefix + self.process_text(t) for t in text ])
+
+        # Similar lengths share a batch, so padding stays small
+        order = sorted(range(len(encodings)), key=lambda idx: len(encodings[idx].ids))
+        batches = [ order[i:i + self.batch_size] for i in range(0, len(order), self.batch_size) ]
+
+        futures = [
+            self.executor.submit(self.run_batch, [ encodings[idx] for idx in batch ])
+            for batch in batches
+        ]
+
+        vectors = None
+        try:
+            for batch, future in zip(batches, futures):
+                batch_vectors = future.result()
+                if vectors is None:
+                    vectors = np.empty((len(encodings), batch_vectors.shape[1]), dtype=np.float32)
+
+                # Rows back in the input order
+                vectors[batch] = batch_vectors
+        except Exception as e:
+            self.logger.error(f"Error while embedding with Local ONNX: {e}")
+            return None
+
+        return vectors
+
+    def generate_text(self, prompt: str, chat_history: list = [], max_output_tokens: int = None, temperature: float = None):
+        self.logger.error("Local ONNX backend does not support generation.")
+        return None
+
+    def construct_prompt(self, prompt: str, role: str):
+        return {
+            "role": role,
+            "content": prompt,
+        }
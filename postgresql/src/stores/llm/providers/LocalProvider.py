@@ -0,0 +1,156 @@
+from ..LLMInterface import LLMInterface
+from ..LLMEnums import OpenAIEnums
+from stores.vectordb.sparse_encoder import tokenize
+from typing import List, Union
+import numpy as np
+import threading
+import logging
+import time
+import zlib
+
+
+class LocalProvider(LLMInterface):
+    """
+    LocalProvider is a network-free LLM backend for load tests, CI and air-gapped perf boxes.
+
+    Embeddings are deterministic: word unigrams and bigrams are feature-hashed (signed) into
+    ``hash_dim`` buckets and mapped to the embedding size by a seeded Gaussian random
+    projection, so texts sharing words get similar vectors. Generation is a stub whose
+    time-to-first-token follows a log-normal distribution and whose output is produced at a
+    normally distributed token rate, mimicking the latency profile of a remote model.
+    """
+
+    def __init__(
+        self,
+        default_input_max_characters: int = 1000,
+        default_generation_max_output_tokens: int = 1000,
+        default_generation_temperature: float = 0.1,
+        hash_dim: int = 4096,
+        seed: int = 42,
+        latency_median_ms: float = 300,
+        latency_sigma: float = 0.5,
+        tokens_per_second: float = 50,
+        tokens_per_second_std: float = 10,
+        mean_output_tokens: int = 150,
+    ):
+        """
+        Initialize the LocalProvider.
+
+        :param default_input_max_characters: The default maximum number of input characters (optional).
+        :param default_generation_max_output_tokens: The default maximum number of output tokens for generation (optional).
+        :param default_generation_temperature: The default temperature for generation (unused, kept for the interface).
+        :param hash_dim: Number of feature hashing buckets.
+        :param seed: Seed of the random projection and of the latency sampling.
+        :param latency_median_ms: Median time to first token of the generation stub.
+        :param latency_sigma: Log-normal sigma of the time to first token.
+        :param tokens_per_second: Mean generation token rate.
+        :param tokens_per_second_std: Standard deviation of the generation token rate.
+        :param mean_output_tokens: Mean number of generated tokens (capped by max_output_tokens).
+        """
+        self.default_input_max_characters = default_input_max_characters
+        self.default_generation_max_output_tokens = default_generation_max_output_tokens
+        self.default_generation_temperature = default_generation_temperature
+
+        self.hash_dim = hash_dim
+        self.seed = seed
+
+        self.latency_median_ms = latency_median_ms
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.tokens_per_second_std = tokens_per_second_std
+        self.mean_output_tokens = mean_output_tokens
+
+        self.generation_model_id = None
+
+        self.embedding_model_id = None
+        self.embedding_size = None
+        self.projection = None
+
+        self.enums = OpenAIEnums
+
+        # Limits of a single embedding request (inputs, total tokens), nothing is sent anywhere
+        self.embedding_batch_max_inputs = 2048
+        self.embedding_batch_max_tokens = None
+
+        self.rng = np.random.default_rng(seed)
+        self.rng_lock = threading.Lock()
+
+        self.logger = logging.getLogger(__name__)
+
+    def set_generation_model(self, model_id: str):
+        self.generation_model_id = model_id
+
+    def set_embedding_model(self, model_id: str, embedding_size: int):
+        self.embedding_model_id = model_id
+        self.embedding_size = embedding_size
+
+        # Entries ~ N(0, 1/embedding_size) keep the projected norms close to the hashed ones
+        projection_rng = np.random.default_rng(self.seed)
+        self.projection = projection_rng.standard_normal(
+            (self.hash_dim, embedding_size), dtype=np.float32
+        ) / np.sqrt(embedding_size)
+
+    def process_text(self, text: str):
+        return text[:self.default_input_max_characters].strip()
+
+    def hash_features(self, text: str):
+        tokens = tokenize(self.process_text(text))
+        features = tokens + [ f"{a} {b}" for a, b in zip(tokens, tokens[1:]) ]
+
+        hashes = np.fromiter(
+            (zlib.crc32(feature.encode("utf-8")) for feature in features),
+            dtype=np.uint32, count=len(features)
+        )
+
+        # Low bits pick the bucket, the top bit the sign (keeps the hashed inner products unbiased)
+        buckets = (hashes % self.hash_dim).astype(np.int64)
+        signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+
+        return buckets, signs
+
+    def embed_text(self, text: Union[str, List[str]], document_type: str = None):
+        if self.projection is None:
+            self.logger.error("Embedding model for Local was not set.")
+            return None
+
+        if isinstance(text, str):
+            text = [text]
+
+        hashed = np.zeros((len(text), self.hash_dim), dtype=np.float32)
+        for row, single_text in enumerate(text):
+            buckets, signs = self.hash_features(single_text)
+            np.add.at(hashed[row], buckets, signs)
+
+        # Sub-linear term frequency, as in the usual tf-idf variants
+        hashed = np.sign(hashed) * np.sqrt(np.abs(hashed))
+
+        vectors = hashed @ self.projection
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+
+        return vectors
+
+    def generate_text(self, prompt: str, chat_history: list = [], max_output_tokens: int = None, temperature: float = None):
+        if not self.generation_model_id:
+            self.logger.error("Generation model for Local was not set.")
+            return None
+
+        max_output_tokens = max_output_tokens if max_output_tokens else self.default_generation_max_output_tokens
+
+        with self.rng_lock:
+            first_token_seconds = self.rng.lognormal(np.log(self.latency_median_ms / 1000), self.latency_sigma)
+            tokens_per_second = max(1.0, self.rng.normal(self.tokens_per_second, self.tokens_per_second_std))
+            output_tokens = int(min(max_output_tokens, max(1, self.rng.poisson(self.mean_output_tokens))))
+
+        time.sleep(first_token_seconds + output_tokens / tokens_per_second)
+
+        # Deterministic text built from the prompt words, one word per token
+        words = tokenize(prompt) or [ "local" ]
+        offset = zlib.crc32(prompt.encode("utf-8")) % len(words)
+
+        return " ".join(words[(offset + i) % len(words)] for i in range(output_tokens))
+
+    def construct_prompt(self, prompt: str, role: str):
+        return {
+            "role": role,
+            "content": prompt,
+        }
@@ -1,5 +1,6 @@
 from ..LLMInterface import LLMInterface
 from ..LLMEnums import OpenAIEnums
+from ..embedding_matrix import decode_base64_embeddings
 from openai import OpenAI
 import logging
 from typing import List, Union
@@ -18,6 +19,7 @@ class OpenAIProvider(LLMInterface):
         default_input_max_characters: int=1000,
         default_generation_max_output_tokens: int=1000,
         default_generation_temperature: float=0.1,
+        http_client=None,
     ):
         """
         Initialize the OpenAIProvider with the given API key and optional parameters.
@@ -27,6 +29,7 @@ class OpenAIProvider(LLMInterface):
         :param default_input_max_characters: The default maximum number of input tokens (optional).
         :param default_generation_max_output_tokens: The default maximum number of output tokens for generation (optional).
         :param default_generation_temperature: The default temperature for generation (optional).
+        :param http_client: A long-lived pooled httpx.Client carrying the timeouts (optional).
         """
         self.api_key = api_key
         self.api_url = api_url
@@ -39,14 +42,19 @@ class OpenAIProvider(LLMInterface):
         
         self.embedding_model_id = None
         self.embedding_size = None
+        self.embedding_dimensions = None
         
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = OpenAI(api_key=self.api_key, http_client=http_client)
         
         if self.api_url and len(self.api_url):
             self.client.base_url = self.api_url
         
         self.enums = OpenAIEnums
         
+        # Limits of a single embedding request (inputs, total tokens) enforced by the API
+        self.embedding_batch_max_inputs = 2048
+        self.embedding_batch_max_tokens = 300000
+        
         self.logger = logging.getLogger(__name__)
         
     def set_generation_model(self, model_id: str):
@@ -56,6 +64,14 @@ class OpenAIProvider(LLMInterface):
         self.embedding_model_id = model_id
         self.embedding_size = embedding_size
     
+    def set_embedding_dimensions(self, dimensions: int) -> bool:
+        # Only the text-embedding-3 models can shorten their embeddings
+        if not (self.embedding_model_id or "").startswith("text-embedding-3"):
+            return False
+        
+        self.embedding_dimensions = dimensions
+        return True
+    
     # Custom Function To Process Text
     def process_text(self, text: str):
         return text[:self.default_input_max_characters].strip()
@@ -101,16 +117,23 @@ class OpenAIProvider(LLMInterface):
         if isinstance(text, str):
             text = [text]
         
+        embedding_kwargs = {}
+        if self.embedding_dimensions:
+            embedding_kwargs["dimensions"] = self.embedding_dimensions
+        
+        # Raw float32 bytes instead of a JSON list of floats, decoded into one (n, size) matrix
         response = self.client.embeddings.create(
             model=self.embedding_model_id,
             input=text,
+            encoding_format="base64",
+            **embedding_kwargs
         )
         
         if not response or not response.data or len(response.data) == 0:
             self.logger.error("Failed To Get Embedding From OpenAI API.")
             return None
         
-        return [rec.embedding for rec in response.data]
+        return decode_base64_embeddings([ rec.embedding for rec in response.data ])
     
     def construct_prompt (self, prompt: str, role: str):
         return {
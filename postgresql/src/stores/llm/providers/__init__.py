@@ -1,3 +1,6 @@
 from .CoHereProvider import CoHereProvider
 from .OpenAIProvider import OpenAIProvider
-from .GeminiProvider import GeminiProvider
\ No newline at end of file
+from .GeminiProvider import GeminiProvider
+from .HedgedProvider import HedgedProvider
+from .LocalProvider import LocalProvider
+from .LocalOnnxProvider import LocalOnnxProvider
@@ -0,0 +1,67 @@
+from functools import lru_cache
+import logging
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - tiktoken is optional, counts fall back to an estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCounter:
+    """
+    Counts and truncates text in model tokens.
+
+    Uses the model's tiktoken encoding when it is known, ``cl100k_base`` as a close
+    approximation for other providers (Gemini, Cohere), and a ~4 characters per token
+    estimate when no encoding can be loaded at all.
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, model_id: str = None):
+        self.model_id = model_id
+        self.encoding = None
+
+        if tiktoken is None:
+            return
+
+        # Both loads may download the encoding file, an offline worker keeps the estimate
+        try:
+            self.encoding = tiktoken.encoding_for_model(model_id) if model_id else tiktoken.get_encoding("cl100k_base")
+        except KeyError:
+            try:
+                self.encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                logger.warning(f"Could not load the cl100k_base tokenizer for model {model_id}, estimating token counts: {e}")
+        except Exception as e:
+            logger.warning(f"Could not load a tokenizer for model {model_id}, estimating token counts: {e}")
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+
+        if self.encoding is None:
+            return (len(text) + self.CHARS_PER_TOKEN - 1) // self.CHARS_PER_TOKEN
+
+        return len(self.encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0 or not text:
+            return ""
+
+        if self.encoding is None:
+            return text[:max_tokens * self.CHARS_PER_TOKEN].strip()
+
+        tokens = self.encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+
+        return self.encoding.decode(tokens[:max_tokens]).strip()
+
+
+@lru_cache(maxsize=32)
+def get_token_counter(model_id: str = None) -> TokenCounter:
+    """Return the cached TokenCounter of a model (loading an encoding is far too slow to do per request)."""
+    return TokenCounter(model_id=model_id)
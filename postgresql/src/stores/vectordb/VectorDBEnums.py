@@ -3,6 +3,8 @@ from enum import Enum
 class VectorDBEnums(Enum):
     QDRANT = "QDRANT"
     PGVECTOR = "PGVECTOR"
+    NUMPY = "NUMPY"
+    IVFPQ = "IVFPQ"
 
 class DistanceMethodEnums(Enum):
     EUCLIDEAN = "euclidean"
@@ -17,14 +19,36 @@ class PgVectorTableSchemeEnums(Enum):
     VECTOR = 'vector'
     METADATA = 'metadata'
     CHUNK_ID = 'chunk_id'
+    TSV = 'tsv'
     _PREFIX = 'pgvector'
 
 class PgVectorDistanceMethodEnums(Enum):
     COSINE = 'vector_cosine_ops'
     DOT = 'vector_l2_ops'
 
+class PgVectorStorageEnums(Enum):
+    VECTOR = 'vector'
+    HALFVEC = 'halfvec'
+
+class PgVectorTableLayoutEnums(Enum):
+    FULL = 'full'
+    VECTORS_ONLY = 'vectors_only'
+
 class PgvectorIndexTypeEnums(Enum):
     HNSW = 'hnsw'
     IVFFLAT = 'ivfflat'
 
+class PgVectorTextSearchConfigEnums(Enum):
+    EN = 'english'
+    AR = 'arabic'
+    SIMPLE = 'simple'
+
+class SearchModeEnums(Enum):
+    VECTOR = 'vector'
+    HYBRID = 'hybrid'
+
+class DiversifyEnums(Enum):
+    MMR = 'mmr'
+    GROUP_BY_ASSET = 'group_by_asset'
+
 
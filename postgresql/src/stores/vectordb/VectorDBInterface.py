@@ -60,12 +60,60 @@ class VectorDBInterface(ABC):
         vectors: List, 
         metadata: List = None, 
         record_ids: List = None, 
-        batch_size: int = 50
+        batch_size: int = 50,
+        asset_ids: List = None,
+        before_commit = None
     ):
-        """Insert multiple records into a collection."""
+        """Insert multiple records into a collection, asset_ids are kept by stores that cannot join data_chunks.
+
+        before_commit(session) is awaited once all records are written, inside the insert transaction
+        when the store shares the application database (session is None otherwise)."""
+        pass
+    
+    @abstractmethod
+    def delete_by_asset_ids (self, collection_name: str, asset_ids: List, record_ids: List = None, before_commit = None):
+        """Delete every record of the given assets (data_chunks.chunk_asset_id) in bulk.
+
+        record_ids are the chunk ids of these assets, used by stores whose older records
+        do not keep their asset id.
+
+        before_commit(session) is awaited once they are deleted, as for insert_many; the chunks
+        themselves can be deleted through it, in the same transaction when the store allows it."""
+        pass
+    
+    @abstractmethod
+    def search_by_vector (self, collection_name: str, vector: list, limit: int = 5, with_vectors: bool = False) -> List[RetrievedDocument]:
+        """Search for records in a collection by vector, optionally returning the stored vectors."""
+        pass
+    
+    @abstractmethod
+    def search_grouped_by_vector (
+        self, 
+        collection_name: str, 
+        vector: list, 
+        limit: int = 5, 
+        group_size: int = 1, 
+        candidates_limit: int = None
+    ) -> List[RetrievedDocument]:
+        """Search for records in a collection by vector, keeping at most group_size records per asset."""
+        pass
+
+    @abstractmethod
+    def search_by_vectors (self, collection_name: str, vectors: List, limit: int = 5) -> List[List[RetrievedDocument]]:
+        """Search for records in a collection for several query vectors in one round trip, results per query."""
+        pass
+    
+    @abstractmethod
+    def search_by_record_id (self, collection_name: str, record_id: int, limit: int = 5) -> List[RetrievedDocument]:
+        """Search for records similar to a stored record, using its stored vector (no embedding call)."""
+        pass
+    
+    @abstractmethod
+    def hybrid_search (self, collection_name: str, text: str, vector: list, limit: int = 5) -> List[RetrievedDocument]:
+        """Search for records in a collection by combining lexical (text) and vector retrieval."""
         pass
     
     @abstractmethod
-    def search_by_vector (self, collection_name: str, vector: list, limit: int = 5) -> List[RetrievedDocument]:
-        """Search for records in a collection by vector."""
+    def export_vectors (self, collection_name: str, batch_size: int = 1000):
+        """Yield every record of a collection page by page, as (record_ids, texts, vectors, asset_ids) lists."""
         pass
@@ -1,4 +1,4 @@
-from .providers import QdrantDBProvider, PGVectorProvider
+from .providers import QdrantDBProvider, PGVectorProvider, NumpyFlatProvider, NumpyIVFPQProvider
 from .VectorDBEnums import VectorDBEnums
 from controllers.BaseController import BaseController
 from sqlalchemy.orm import sessionmaker
@@ -18,14 +18,51 @@ class VectorDBProviderFactory:
                 db_client=qdrant_db_client,
                 distance_method=self.config.VECTOR_DB_DISTANCE_METHOD,
                 default_vector_size=self.config.EMBEDDING_MODEL_SIZE,
-                index_threshold=self.config.VECTOR_DB_PGEVCTOR_INDEX_THRESHOLD
+                index_threshold=self.config.VECTOR_DB_PGEVCTOR_INDEX_THRESHOLD,
+                sparse_vectors_enabled=self.config.VECTOR_DB_QDRANT_SPARSE_VECTORS,
+                hybrid_candidates_multiplier=self.config.VECTOR_DB_HYBRID_CANDIDATES_MULTIPLIER,
             )
         if provider == VectorDBEnums.PGVECTOR.value:
             return PGVectorProvider(
                 db_client=self.db_client,
                 distance_method=self.config.VECTOR_DB_DISTANCE_METHOD,
                 default_vector_size=self.config.EMBEDDING_MODEL_SIZE,
-                index_threshold=self.config.VECTOR_DB_PGEVCTOR_INDEX_THRESHOLD
+                index_threshold=self.config.VECTOR_DB_PGEVCTOR_INDEX_THRESHOLD,
+                text_search_language=self.config.PRIMARY_LANGUAGE,
+                storage=self.config.VECTOR_DB_PGVECTOR_STORAGE,
+                binary_index=self.config.VECTOR_DB_PGVECTOR_BINARY_INDEX,
+                rerank_multiplier=self.config.VECTOR_DB_PGVECTOR_RERANK_MULTIPLIER,
+                table_layout=self.config.VECTOR_DB_PGVECTOR_TABLE_LAYOUT,
+                hybrid_rrf_k=self.config.VECTOR_DB_HYBRID_RRF_K,
+                hybrid_candidates_multiplier=self.config.VECTOR_DB_HYBRID_CANDIDATES_MULTIPLIER,
+            )
+        if provider == VectorDBEnums.NUMPY.value:
+            numpy_db_client = self.base_controller.get_database_path(db_name=self.config.VECTOR_DB_NUMPY_PATH)
+            
+            return NumpyFlatProvider(
+                db_client=numpy_db_client,
+                distance_method=self.config.VECTOR_DB_DISTANCE_METHOD,
+                default_vector_size=self.config.EMBEDDING_MODEL_SIZE,
+                max_segments=self.config.VECTOR_DB_NUMPY_MAX_SEGMENTS,
+                max_deleted_ratio=self.config.VECTOR_DB_NUMPY_MAX_DELETED_RATIO,
+            )
+        if provider == VectorDBEnums.IVFPQ.value:
+            # Same on-disk segments as NUMPY, the IVF-PQ index files are added next to them
+            numpy_db_client = self.base_controller.get_database_path(db_name=self.config.VECTOR_DB_NUMPY_PATH)
+            
+            return NumpyIVFPQProvider(
+                db_client=numpy_db_client,
+                distance_method=self.config.VECTOR_DB_DISTANCE_METHOD,
+                default_vector_size=self.config.EMBEDDING_MODEL_SIZE,
+                max_segments=self.config.VECTOR_DB_NUMPY_MAX_SEGMENTS,
+                max_deleted_ratio=self.config.VECTOR_DB_NUMPY_MAX_DELETED_RATIO,
+                nlist=self.config.VECTOR_DB_IVFPQ_NLIST,
+                nprobe=self.config.VECTOR_DB_IVFPQ_NPROBE,
+                pq_m=self.config.VECTOR_DB_IVFPQ_PQ_M,
+                min_train_size=self.config.VECTOR_DB_IVFPQ_MIN_TRAIN_SIZE,
+                train_sample_size=self.config.VECTOR_DB_IVFPQ_TRAIN_SAMPLE_SIZE,
+                kmeans_iterations=self.config.VECTOR_DB_IVFPQ_KMEANS_ITERATIONS,
+                rerank_factor=self.config.VECTOR_DB_IVFPQ_RERANK_FACTOR,
             )
         
         return None
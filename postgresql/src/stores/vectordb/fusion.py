@@ -0,0 +1,35 @@
+from typing import List
+from models.db_schemes import RetrievedDocument
+
+
+def reciprocal_rank_fusion(ranked_lists: List[List[RetrievedDocument]], k: int = 60, limit: int = None) -> List[RetrievedDocument]:
+    """
+    Fuse several ranked result lists using Reciprocal Rank Fusion.
+
+    Every document gets ``sum(1 / (k + rank))`` over the lists it appears in, so only
+    the ranks matter and scores coming from different retrievers never get compared.
+
+    :param ranked_lists: Result lists, each one sorted best first.
+    :param k: The RRF smoothing constant (60 in the original paper).
+    :param limit: The number of fused documents to return (optional).
+    :return: The fused documents, best first, carrying their RRF score.
+    """
+    fused_scores = {}
+    fused_documents = {}
+
+    for ranked_list in ranked_lists:
+        for rank, document in enumerate(ranked_list or [], start=1):
+            key = document.chunk_id if document.chunk_id is not None else document.text
+
+            fused_scores[key] = fused_scores.get(key, 0.0) + 1.0 / (k + rank)
+            fused_documents.setdefault(key, document)
+
+    ranked_keys = sorted(fused_scores, key=fused_scores.get, reverse=True)
+
+    if limit:
+        ranked_keys = ranked_keys[:limit]
+
+    return [
+        fused_documents[key].model_copy(update={"score": fused_scores[key]})
+        for key in ranked_keys
+    ]
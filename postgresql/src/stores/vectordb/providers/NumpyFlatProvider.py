@@ -0,0 +1,716 @@
+from ..VectorDBInterface import VectorDBInterface
+from ..VectorDBEnums import DistanceMethodEnums
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import List
+from models.db_schemes import RetrievedDocument
+import numpy as np
+import logging
+import shutil
+import fcntl
+import json
+import uuid
+import os
+
+
+class FlatSegment:
+    """
+    One immutable, append-only segment of a collection.
+
+    ``<name>.vectors.npy`` holds the float32 matrix (memory-mapped), next to the record ids,
+    asset ids (-1 when unknown) and squared norms; texts and metadata are JSON payloads
+    concatenated in ``<name>.payloads.bin`` and located through ``<name>.offsets.npy``.
+    """
+
+    def __init__(self, directory: str, name: str):
+        prefix = os.path.join(directory, name)
+
+        self.name = name
+        self.vectors = np.load(f"{prefix}.vectors.npy", mmap_mode="r")
+        self.sq_norms = np.load(f"{prefix}.norms.npy")
+        self.record_ids = np.load(f"{prefix}.ids.npy")
+        self.asset_ids = np.load(f"{prefix}.assets.npy")
+        self.offsets = np.load(f"{prefix}.offsets.npy")
+        self.payloads = np.memmap(f"{prefix}.payloads.bin", dtype=np.uint8, mode="r")
+
+        self.alive = np.ones(len(self.record_ids), dtype=bool)
+
+    @staticmethod
+    def write(directory: str, name: str, vectors: np.ndarray, record_ids: np.ndarray, asset_ids: np.ndarray, payloads: List[bytes]):
+        prefix = os.path.join(directory, name)
+
+        offsets = np.zeros(len(payloads) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([ len(payload) for payload in payloads ])
+
+        np.save(f"{prefix}.vectors.npy", vectors.astype(np.float32, copy=False))
+        np.save(f"{prefix}.norms.npy", np.einsum("ij,ij->i", vectors, vectors).astype(np.float32))
+        np.save(f"{prefix}.ids.npy", record_ids.astype(np.int64, copy=False))
+        np.save(f"{prefix}.assets.npy", asset_ids.astype(np.int64, copy=False))
+        np.save(f"{prefix}.offsets.npy", offsets)
+        with open(f"{prefix}.payloads.bin", "wb") as f:
+            f.write(b"".join(payloads))
+
+    @staticmethod
+    def remove(directory: str, name: str):
+        # Every file of the segment, including the ones indexes keep next to it
+        for file_name in os.listdir(directory):
+            if file_name.startswith(f"{name}."):
+                try:
+                    os.remove(os.path.join(directory, file_name))
+                except FileNotFoundError:
+                    pass
+
+    def get_payload_bytes(self, row: int) -> bytes:
+        return self.payloads[self.offsets[row]:self.offsets[row + 1]].tobytes()
+
+    def get_payload(self, row: int) -> dict:
+        return json.loads(self.get_payload_bytes(row))
+
+
+class FlatCollection:
+    """Segments of a collection as listed by its manifest, with the tombstoned rows masked out."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+        manifest_path = os.path.join(directory, "manifest.json")
+        manifest_stat = os.stat(manifest_path)
+        with open(manifest_path) as f:
+            self.manifest = json.load(f)
+
+        self.version = (manifest_stat.st_ino, manifest_stat.st_mtime_ns)
+        self.embedding_size = self.manifest["embedding_size"]
+        self.distance_method = self.manifest["distance_method"]
+
+        self.segments = [ FlatSegment(directory, name) for name in self.manifest["segments"] ]
+
+        self.live_count = 0
+        for segment in self.segments:
+            tombstones = self.manifest["tombstones"].get(segment.name)
+            if tombstones:
+                segment.alive[np.asarray(tombstones, dtype=np.int64)] = False
+
+            # Live rows sorted by record id: lookups are binary searches, no per-row Python objects
+            live_rows = np.flatnonzero(segment.alive)
+            segment.live_rows = live_rows[np.argsort(segment.record_ids[live_rows], kind="stable")]
+            segment.live_ids = segment.record_ids[segment.live_rows]
+            self.live_count += len(live_rows)
+
+    def locate(self, record_ids) -> tuple:
+        """(segment idx, row) arrays of the live rows of ``record_ids``, -1 for the ids without one."""
+        record_ids = np.asarray(record_ids, dtype=np.int64)
+        segment_idxs = np.full(len(record_ids), -1, dtype=np.int64)
+        rows = np.full(len(record_ids), -1, dtype=np.int64)
+
+        for segment_idx, segment in enumerate(self.segments):
+            if len(segment.live_ids) == 0:
+                continue
+
+            positions = np.minimum(np.searchsorted(segment.live_ids, record_ids), len(segment.live_ids) - 1)
+            found = segment.live_ids[positions] == record_ids
+
+            segment_idxs[found] = segment_idx
+            rows[found] = segment.live_rows[positions[found]]
+
+        return segment_idxs, rows
+
+    def count(self):
+        return self.live_count
+
+    def count_deleted(self):
+        return sum(len(rows) for rows in self.manifest["tombstones"].values())
+
+
+class NumpyFlatProvider(VectorDBInterface):
+    """
+    NumpyFlatProvider keeps every collection in-process as memory-mapped float32 matrices.
+
+    A collection is a directory of append-only segments (one per insert) and a manifest
+    listing them with their tombstoned rows. Search is exact: one matmul per segment for a
+    whole batch of queries, ``argpartition`` for the per-segment top-k, then a merge. Segments
+    and tombstones pile up with inserts, so they get compacted into one segment by a
+    background thread. Writers (API and Celery workers) serialize on a per-collection file
+    lock, readers reload a collection whenever its manifest was replaced.
+    """
+
+    def __init__(
+        self,
+        db_client: str,
+        default_vector_size: int = 768,
+        distance_method: str = None,
+        max_segments: int = 8,
+        max_deleted_ratio: float = 0.2,
+    ):
+        self.db_client = db_client
+        self.default_vector_size = default_vector_size
+
+        if distance_method in (DistanceMethodEnums.COSINE.value, DistanceMethodEnums.DOT_PRODUCT.value):
+            self.distance_method = distance_method
+        else:
+            self.distance_method = DistanceMethodEnums.EUCLIDEAN.value
+
+        self.max_segments = max_segments
+        self.max_deleted_ratio = max_deleted_ratio
+
+        self.collections = {}
+        self.compacting = set()
+        self.compaction_executor = ThreadPoolExecutor(max_workers=1)
+        # collection_name -> future of its latest scheduled background job
+        self.maintenance_futures = {}
+
+        self.logger = logging.getLogger("uvicorn")
+
+    async def connect(self):
+        os.makedirs(self.db_client, exist_ok=True)
+        self.logger.info(f"Connected to NumPy vector store at {self.db_client}")
+
+    async def disconnect(self):
+        self.collections = {}
+        self.logger.info(f"Disconnected from NumPy vector store at {self.db_client}")
+
+    def get_collection_dir(self, collection_name: str) -> str:
+        return os.path.join(self.db_client, collection_name)
+
+    def get_manifest_path(self, collection_name: str) -> str:
+        return os.path.join(self.get_collection_dir(collection_name), "manifest.json")
+
+    @contextmanager
+    def collection_lock(self, collection_name: str):
+        with open(os.path.join(self.db_client, f".{collection_name}.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def write_manifest(self, collection_name: str, manifest: dict):
+        manifest_path = self.get_manifest_path(collection_name)
+
+        # Atomic replace: readers see the old or the new manifest, never half of one
+        tmp_path = f"{manifest_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+
+    def get_collection(self, collection_name: str):
+        manifest_path = self.get_manifest_path(collection_name)
+
+        # A stat per call is enough to notice writes made by other processes
+        for _ in range(3):
+            try:
+                manifest_stat = os.stat(manifest_path)
+            except FileNotFoundError:
+                self.collections.pop(collection_name, None)
+                return None
+
+            collection = self.collections.get(collection_name)
+            if collection is not None and collection.version == (manifest_stat.st_ino, manifest_stat.st_mtime_ns):
+                return collection
+
+            try:
+                collection = self.open_collection(collection_name)
+            except FileNotFoundError:
+                # Segments removed by a concurrent compaction, the manifest was replaced meanwhile
+                continue
+
+            self.collections[collection_name] = collection
+            return collection
+
+        self.logger.error(f"Could not load NumPy collection: {collection_name}")
+        return None
+
+    def open_collection(self, collection_name: str) -> FlatCollection:
+        return FlatCollection(self.get_collection_dir(collection_name))
+
+    async def is_collection_existed(self, collection_name: str) -> bool:
+        return os.path.exists(self.get_manifest_path(collection_name))
+
+    async def list_all_collections(self) -> List:
+        return [
+            name for name in sorted(os.listdir(self.db_client))
+            if os.path.exists(self.get_manifest_path(name))
+        ]
+
+    async def get_collection_info(self, collection_name: str) -> dict:
+        collection = self.get_collection(collection_name)
+        if collection is None:
+            return None
+
+        return {
+            "embedding_size": collection.embedding_size,
+            "distance_method": collection.distance_method,
+            "vectors_count": collection.count(),
+            "segments_count": len(collection.segments),
+            "deleted_count": collection.count_deleted(),
+        }
+
+    async def delete_collection(self, collection_name: str):
+        if not await self.is_collection_existed(collection_name):
+            self.logger.info(f"Collection not found: {collection_name}")
+            return None
+
+        self.logger.info(f"Deleting/Resetting NumPy collection: {collection_name}")
+
+        with self.collection_lock(collection_name):
+            shutil.rmtree(self.get_collection_dir(collection_name), ignore_errors=True)
+
+        self.collections.pop(collection_name, None)
+        return True
+
+    async def create_collection(self, collection_name: str, embedding_size: int, do_reset: bool = False) -> bool:
+        if do_reset:
+            await self.delete_collection(collection_name=collection_name)
+
+        if await self.is_collection_existed(collection_name):
+            self.logger.info(f"Collection: {collection_name} Already Exists!")
+            return True
+
+        try:
+            with self.collection_lock(collection_name):
+                os.makedirs(self.get_collection_dir(collection_name), exist_ok=True)
+                if not os.path.exists(self.get_manifest_path(collection_name)):
+                    self.write_manifest(collection_name, {
+                        "embedding_size": embedding_size,
+                        "distance_method": self.distance_method,
+                        "segments": [],
+                        "tombstones": {},
+                    })
+        except Exception as e:
+            self.logger.error(f"Error creating collection: {collection_name}: {e}")
+            return False
+
+        self.logger.info(f"NumPy Collection: {collection_name} Created Successfully!!!!")
+        return True
+
+    def prepare_vectors(self, vectors, distance_method: str) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+
+        if distance_method == DistanceMethodEnums.COSINE.value:
+            vectors = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+
+        return vectors
+
+    def append_segment(self, collection_name: str, texts: List, vectors: List, metadata: List, record_ids: List, asset_ids: List):
+        with self.collection_lock(collection_name):
+            collection = self.get_collection(collection_name)
+            if collection is None:
+                self.logger.error(f"Can't Insert New Records To Non-existed Collection: {collection_name}")
+                return False
+
+            matrix = self.prepare_vectors(vectors, collection.distance_method)
+            if matrix.shape[1] != collection.embedding_size:
+                self.logger.error(f"Vectors of size {matrix.shape[1]} do not fit collection {collection_name} ({collection.embedding_size}).")
+                return False
+
+            # Upserts by record id: the last occurrence wins, older rows get tombstoned
+            last_rows = {}
+            for idx, record_id in enumerate(record_ids):
+                last_rows[int(record_id)] = idx
+            rows = sorted(last_rows.values())
+
+            manifest = dict(collection.manifest)
+            manifest["tombstones"] = { name: list(deleted) for name, deleted in manifest["tombstones"].items() }
+
+            segment_idxs, located_rows = collection.locate(list(last_rows))
+            is_located = segment_idxs >= 0
+            for segment_idx, row in zip(segment_idxs[is_located], located_rows[is_located]):
+                manifest["tombstones"].setdefault(collection.segments[segment_idx].name, []).append(int(row))
+
+            segment_name = uuid.uuid4().hex
+            FlatSegment.write(
+                directory=self.get_collection_dir(collection_name),
+                name=segment_name,
+                vectors=matrix[rows],
+                record_ids=np.asarray([ record_ids[idx] for idx in rows ], dtype=np.int64),
+                asset_ids=np.asarray([ -1 if asset_ids[idx] is None else asset_ids[idx] for idx in rows ], dtype=np.int64),
+                payloads=[
+                    json.dumps({ "text": texts[idx], "metadata": metadata[idx] }).encode("utf-8")
+                    for idx in rows
+                ],
+            )
+
+            manifest["segments"] = manifest["segments"] + [ segment_name ]
+            self.write_manifest(collection_name, manifest)
+
+        self.schedule_compaction(collection_name)
+        return True
+
+    async def insert_one(
+        self,
+        collection_name: str,
+        text: str,
+        vector: list,
+        metadata: dict = None,
+        record_id: str = None
+    ):
+        if not await self.is_collection_existed(collection_name):
+            self.logger.error(f"Can't Insert New Record To Non-existed Collection: {collection_name}")
+            return False
+
+        try:
+            return self.append_segment(
+                collection_name, [ text ], [ vector ], [ metadata ],
+                [ record_id if record_id is not None else 0 ], [ None ]
+            )
+        except Exception as e:
+            self.logger.error(f"Insert New Record Failed: {e}")
+            return False
+
+    async def insert_many(
+        self,
+        collection_name: str,
+        texts: List,
+        vectors: List,
+        metadata: List = None,
+        record_ids: List = None,
+        batch_size: int = 50,
+        asset_ids: List = None,
+        before_commit = None
+    ):
+        if metadata is None:
+            metadata = [None] * len(texts)
+
+        if record_ids is None:
+            record_ids = list(range(0, len(texts)))
+
+        if asset_ids is None:
+            asset_ids = [None] * len(texts)
+
+        if not await self.is_collection_existed(collection_name):
+            self.logger.error(f"Can't Insert New Records To Non-existed Collection: {collection_name}")
+            return False
+
+        if len(texts) == 0:
+            return True
+
+        # One segment per call, batch_size has no meaning without network round trips
+        try:
+            if not self.append_segment(collection_name, texts, vectors, metadata, record_ids, asset_ids):
+                return False
+        except Exception as e:
+            self.logger.error(f"Error while inserting records: {e}")
+            return False
+
+        # Not transactional with the application database, upserts by record id make replays harmless
+        if before_commit:
+            await before_commit(None)
+
+        return True
+
+    def tombstone_assets(self, collection_name: str, asset_ids: List) -> int:
+        with self.collection_lock(collection_name):
+            collection = self.get_collection(collection_name)
+            if collection is None:
+                return 0
+
+            manifest = dict(collection.manifest)
+            manifest["tombstones"] = { name: list(deleted) for name, deleted in manifest["tombstones"].items() }
+
+            asset_ids = np.asarray(list(asset_ids), dtype=np.int64)
+            deleted_count = 0
+            for segment in collection.segments:
+                rows = np.flatnonzero(segment.alive & np.isin(segment.asset_ids, asset_ids))
+                if len(rows):
+                    manifest["tombstones"].setdefault(segment.name, []).extend(rows.tolist())
+                    deleted_count += len(rows)
+
+            if deleted_count:
+                self.write_manifest(collection_name, manifest)
+
+        # The tombstoned rows are dropped by the next compaction
+        self.schedule_compaction(collection_name)
+        return deleted_count
+
+    async def delete_by_asset_ids(self, collection_name: str, asset_ids: List, record_ids: List = None, before_commit = None):
+        try:
+            deleted_count = self.tombstone_assets(collection_name, asset_ids)
+        except Exception as e:
+            self.logger.error(f"Error while deleting the records of assets {asset_ids}: {e}")
+            return False
+
+        self.logger.info(f"Deleted {deleted_count} records of assets {asset_ids} from collection {collection_name}.")
+
+        if before_commit:
+            await before_commit(None)
+
+        return True
+
+    def needs_compaction(self, collection: FlatCollection) -> bool:
+        total_rows = collection.count() + collection.count_deleted()
+
+        return len(collection.segments) > self.max_segments or \
+            collection.count_deleted() > self.max_deleted_ratio * max(total_rows, 1)
+
+    def schedule_compaction(self, collection_name: str):
+        collection = self.get_collection(collection_name)
+        if collection is None or collection_name in self.compacting:
+            return
+
+        if not self.needs_compaction(collection):
+            return
+
+        self.compacting.add(collection_name)
+        self.maintenance_futures[collection_name] = self.compaction_executor.submit(self.compact, collection_name)
+
+    def wait_for_maintenance(self, collection_name: str):
+        """Block until the background jobs of a collection are done, including the ones they re-scheduled."""
+        while True:
+            future = self.maintenance_futures.get(collection_name)
+            if future is None:
+                return
+
+            future.result()
+
+            # A job re-scheduling itself registers its successor before its own future resolves
+            if self.maintenance_futures.get(collection_name) is future:
+                self.maintenance_futures.pop(collection_name, None)
+                return
+
+    def compact(self, collection_name: str):
+        """Merge the live rows of every segment into one, off the request path."""
+        directory = self.get_collection_dir(collection_name)
+        merged_name = uuid.uuid4().hex
+
+        try:
+            collection = FlatCollection(directory)
+            snapshot = [ segment.name for segment in collection.segments ]
+
+            sources = [ (segment, np.flatnonzero(segment.alive)) for segment in collection.segments ]
+            if sum(len(rows) for _, rows in sources) == 0:
+                merged_name = None
+            else:
+                FlatSegment.write(
+                    directory=directory,
+                    name=merged_name,
+                    vectors=np.concatenate([ segment.vectors[rows] for segment, rows in sources ]),
+                    record_ids=np.concatenate([ segment.record_ids[rows] for segment, rows in sources ]),
+                    asset_ids=np.concatenate([ segment.asset_ids[rows] for segment, rows in sources ]),
+                    payloads=[ segment.get_payload_bytes(row) for segment, rows in sources for row in rows ],
+                )
+
+            with self.collection_lock(collection_name):
+                manifest_path = self.get_manifest_path(collection_name)
+                if not os.path.exists(manifest_path):
+                    raise FileNotFoundError(f"Collection {collection_name} was deleted while compacting")
+
+                with open(manifest_path) as f:
+                    manifest = json.load(f)
+
+                if manifest["segments"][:len(snapshot)] != snapshot:
+                    raise RuntimeError(f"Collection {collection_name} was rewritten while compacting")
+
+                # Rows deleted while compacting still have to go, on their merged position
+                merged_tombstones = []
+                merged_row = 0
+                for segment, rows in sources:
+                    deleted_now = set(manifest["tombstones"].get(segment.name, [])) - \
+                        set(collection.manifest["tombstones"].get(segment.name, []))
+                    merged_tombstones.extend(
+                        merged_row + idx for idx, row in enumerate(rows) if int(row) in deleted_now
+                    )
+                    merged_row += len(rows)
+
+                tombstones = {
+                    name: deleted for name, deleted in manifest["tombstones"].items() if name not in snapshot
+                }
+                if merged_name and merged_tombstones:
+                    tombstones[merged_name] = merged_tombstones
+
+                manifest["segments"] = ([ merged_name ] if merged_name else []) + manifest["segments"][len(snapshot):]
+                manifest["tombstones"] = tombstones
+                self.write_manifest(collection_name, manifest)
+
+            # Readers holding the old segments keep their mappings, new readers load the merged one
+            for name in snapshot:
+                FlatSegment.remove(directory, name)
+
+            self.logger.info(f"Compacted NumPy collection {collection_name}: {len(snapshot)} segments merged.")
+        except Exception as e:
+            self.logger.error(f"Error while compacting collection {collection_name}: {e}")
+            if merged_name:
+                FlatSegment.remove(directory, merged_name)
+        finally:
+            self.compacting.discard(collection_name)
+
+    def score_vectors(self, collection: FlatCollection, vectors: np.ndarray, sq_norms: np.ndarray, queries: np.ndarray) -> np.ndarray:
+        """Exact scores (higher is better) of stored vectors against every query, shaped (vectors, queries)."""
+        scores = np.asarray(vectors @ queries.T)
+        if collection.distance_method == DistanceMethodEnums.EUCLIDEAN.value:
+            # -||v - q||^2 up to the per-query constant ||q||^2
+            scores = 2 * scores - sq_norms[:, None]
+
+        return scores
+
+    def search_segment(self, collection: FlatCollection, segment_idx: int, queries: np.ndarray, limit: int, exclude: tuple = None):
+        """Top-k rows of one segment and their scores, both shaped (k, queries)."""
+        segment = collection.segments[segment_idx]
+
+        scores = self.score_vectors(collection, segment.vectors, segment.sq_norms, queries)
+
+        scores[~segment.alive] = -np.inf
+        if exclude is not None and exclude[0] == segment_idx:
+            scores[exclude[1]] = -np.inf
+
+        k = min(limit, len(scores))
+        if k < len(scores):
+            # The k largest end up last, no negated copy of the scores needed
+            top_rows = np.argpartition(scores, len(scores) - k, axis=0)[len(scores) - k:]
+        else:
+            top_rows = np.broadcast_to(np.arange(len(scores))[:, None], scores.shape)
+
+        return top_rows, np.take_along_axis(scores, top_rows, axis=0)
+
+    def search_collection(self, collection: FlatCollection, queries: np.ndarray, limit: int, exclude: tuple = None):
+        """Top-k for every query row over all segments, as (segment idx, row, score) lists."""
+        candidate_segments, candidate_rows, candidate_scores = [], [], []
+
+        for segment_idx, segment in enumerate(collection.segments):
+            if len(segment.record_ids) == 0:
+                continue
+
+            top_rows, top_scores = self.search_segment(collection, segment_idx, queries, limit, exclude=exclude)
+
+            candidate_rows.append(top_rows)
+            candidate_scores.append(top_scores)
+            candidate_segments.append(np.full(top_rows.shape, segment_idx))
+
+        if not candidate_rows:
+            return [ [] for _ in range(len(queries)) ]
+
+        rows = np.concatenate(candidate_rows)
+        scores = np.concatenate(candidate_scores)
+        segments = np.concatenate(candidate_segments)
+
+        order = np.argsort(-scores, axis=0, kind="stable")[:limit]
+
+        if collection.distance_method == DistanceMethodEnums.EUCLIDEAN.value:
+            query_sq_norms = np.einsum("ij,ij->i", queries, queries)
+            scores = np.sqrt(np.maximum(query_sq_norms[None, :] - scores, 0))
+
+        results = []
+        for query_idx in range(len(queries)):
+            hits = []
+            for candidate_idx in order[:, query_idx]:
+                score = scores[candidate_idx, query_idx]
+                if not np.isfinite(score):
+                    break
+                hits.append((int(segments[candidate_idx, query_idx]), int(rows[candidate_idx, query_idx]), float(score)))
+            results.append(hits)
+
+        return results
+
+    def to_documents(self, collection: FlatCollection, hits: list, with_vectors: bool = False) -> List[RetrievedDocument]:
+        documents = []
+        for segment_idx, row, score in hits:
+            segment = collection.segments[segment_idx]
+            asset_id = int(segment.asset_ids[row])
+
+            documents.append(RetrievedDocument(**{
+                "score": score,
+                "text": segment.get_payload(row)["text"],
+                "chunk_id": int(segment.record_ids[row]),
+                "asset_id": asset_id if asset_id >= 0 else None,
+                "vector": segment.vectors[row].tolist() if with_vectors else None,
+            }))
+
+        return documents
+
+    async def search_by_vector(self, collection_name: str, vector: list, limit: int = 5, with_vectors: bool = False):
+        collection = self.get_collection(collection_name)
+        if collection is None:
+            self.logger.error(f"Collection {collection_name} does not exist, cannot search..?")
+            return None
+
+        queries = self.prepare_vectors(vector, collection.distance_method)
+        hits = self.search_collection(collection, queries, limit)[0]
+
+        if not hits:
+            self.logger.error("No results found for the given vector.")
+            return None
+
+        return self.to_documents(collection, hits, with_vectors=with_vectors)
+
+    async def search_grouped_by_vector(self, collection_name: str, vector: list, limit: int = 5, group_size: int = 1, candidates_limit: int = None):
+        collection = self.get_collection(collection_name)
+        if collection is None:
+            self.logger.error(f"Collection {collection_name} does not exist, cannot search..?")
+            return None
+
+        candidates_limit = max(candidates_limit or 0, limit * group_size)
+
+        queries = self.prepare_vectors(vector, collection.distance_method)
+        hits = self.search_collection(collection, queries, candidates_limit)[0]
+
+        asset_counts = {}
+        grouped_hits = []
+        for segment_idx, row, score in hits:
+            asset_id = int(collection.segments[segment_idx].asset_ids[row])
+            if asset_counts.get(asset_id, 0) >= group_size:
+                continue
+
+            asset_counts[asset_id] = asset_counts.get(asset_id, 0) + 1
+            grouped_hits.append((segment_idx, row, score))
+            if len(grouped_hits) >= limit:
+                break
+
+        if not grouped_hits:
+            self.logger.error("No grouped results found for the given vector.")
+            return None
+
+        return self.to_documents(collection, grouped_hits)
+
+    async def search_by_vectors(self, collection_name: str, vectors: List, limit: int = 5):
+        collection = self.get_collection(collection_name)
+        if collection is None:
+            self.logger.error(f"Collection {collection_name} does not exist, cannot search..?")
+            return None
+
+        queries = self.prepare_vectors(vectors, collection.distance_method)
+
+        return [
+            self.to_documents(collection, hits)
+            for hits in self.search_collection(collection, queries, limit)
+        ]
+
+    async def search_by_record_id(self, collection_name: str, record_id: int, limit: int = 5):
+        collection = self.get_collection(collection_name)
+        if collection is None:
+            self.logger.error(f"Collection {collection_name} does not exist, cannot search..?")
+            return None
+
+        segment_idxs, rows = collection.locate([ int(record_id) ])
+        if segment_idxs[0] < 0:
+            self.logger.error(f"Record {record_id} not found in collection {collection_name}.")
+            return None
+
+        segment_idx, row = int(segment_idxs[0]), int(rows[0])
+        queries = np.asarray(collection.segments[segment_idx].vectors[row:row + 1], dtype=np.float32)
+
+        hits = self.search_collection(collection, queries, limit, exclude=(segment_idx, row))[0]
+        if not hits:
+            self.logger.error(f"No results found similar to record {record_id}.")
+            return None
+
+        return self.to_documents(collection, hits)
+
+    async def hybrid_search(self, collection_name: str, text: str, vector: list, limit: int = 5):
+        self.logger.info(f"NumPy collection {collection_name} has no lexical index, using vector search.")
+        return await self.search_by_vector(collection_name=collection_name, vector=vector, limit=limit)
+
+    async def export_vectors(self, collection_name: str, batch_size: int = 1000):
+        collection = self.get_collection(collection_name)
+        if collection is None:
+            return
+
+        for segment in collection.segments:
+            live_rows = np.flatnonzero(segment.alive)
+            for start in range(0, len(live_rows), batch_size):
+                rows = live_rows[start:start + batch_size]
+                yield (
+                    segment.record_ids[rows].tolist(),
+                    [ segment.get_payload(row)["text"] for row in rows ],
+                    np.asarray(segment.vectors[rows]),
+                    [ int(asset_id) if asset_id >= 0 else None for asset_id in segment.asset_ids[rows] ],
+                )
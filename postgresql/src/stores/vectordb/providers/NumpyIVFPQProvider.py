@@ -0,0 +1,348 @@
+from .NumpyFlatProvider import NumpyFlatProvider, FlatCollection
+import numpy as np
+import threading
+import uuid
+import os
+
+
+def nearest_centroids(data: np.ndarray, centroids: np.ndarray, batch_size: int = 8192) -> np.ndarray:
+    """Index of the nearest (L2) centroid of every row, batched to bound the distance matrix."""
+    centroid_sq_norms = np.einsum("ij,ij->i", centroids, centroids)
+
+    assignments = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), batch_size):
+        batch = np.asarray(data[start:start + batch_size], dtype=np.float32)
+        # ||x||^2 is the same for every centroid, it does not change the argmin
+        distances = centroid_sq_norms[None, :] - 2 * (batch @ centroids.T)
+        assignments[start:start + batch_size] = np.argmin(distances, axis=1)
+
+    return assignments
+
+
+def kmeans(data: np.ndarray, k: int, n_iter: int, rng: np.random.Generator):
+    """Plain Lloyd's k-means, empty clusters are re-seeded with random points."""
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignments = nearest_centroids(data, centroids)
+
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=k)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        non_empty = counts > 0
+        sums = np.add.reduceat(data[order], starts[non_empty], axis=0)
+        centroids[non_empty] = sums / counts[non_empty, None]
+
+        empty = np.flatnonzero(~non_empty)
+        if len(empty):
+            centroids[empty] = data[rng.choice(len(data), size=len(empty), replace=False)]
+
+    return centroids
+
+
+class NumpyIVFPQProvider(NumpyFlatProvider):
+    """
+    NumpyIVFPQProvider adds a compressed IVF-PQ index on top of the NumPy flat segments.
+
+    Once a collection holds ``min_train_size`` vectors, a coarse quantizer (``nlist`` k-means
+    centroids) and product quantization codebooks (``pq_m`` sub-spaces of 256 centroids each,
+    trained on the residuals) are learned on a sample. Every segment then gets uint8 PQ codes
+    and its inverted list ids, which are the only per-vector data kept in RAM. A search probes
+    the ``nprobe`` closest lists, ranks their rows with asymmetric distance tables, and
+    re-ranks the best ``limit * rerank_factor`` exactly from the memory-mapped float32 file.
+
+    Training, encoding and compaction run in the background thread; segments without codes
+    yet are searched exactly. Codes approximate L2 distances, which rank like cosine on the
+    normalized vectors; with dot product they only pick candidates for the exact re-rank.
+    """
+
+    def __init__(
+        self,
+        db_client: str,
+        default_vector_size: int = 768,
+        distance_method: str = None,
+        max_segments: int = 8,
+        max_deleted_ratio: float = 0.2,
+        nlist: int = 256,
+        nprobe: int = 16,
+        pq_m: int = 64,
+        min_train_size: int = 20000,
+        train_sample_size: int = 50000,
+        kmeans_iterations: int = 20,
+        rerank_factor: int = 10,
+    ):
+        super().__init__(
+            db_client=db_client,
+            default_vector_size=default_vector_size,
+            distance_method=distance_method,
+            max_segments=max_segments,
+            max_deleted_ratio=max_deleted_ratio,
+        )
+
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.min_train_size = min_train_size
+        self.train_sample_size = train_sample_size
+        self.kmeans_iterations = kmeans_iterations
+        self.rerank_factor = rerank_factor
+
+        self.maintaining = set()
+        # Collections written to while being maintained, they get another pass once it is over
+        self.maintenance_requested = set()
+        self.maintenance_lock = threading.Lock()
+        self.checked_versions = {}
+
+    def get_codebook_path(self, collection_name: str, codebook_name: str) -> str:
+        return os.path.join(self.get_collection_dir(collection_name), f"ivfpq.{codebook_name}.npz")
+
+    def open_collection(self, collection_name: str) -> FlatCollection:
+        collection = super().open_collection(collection_name)
+        collection.ivfpq = None
+
+        index_info = collection.manifest.get("ivfpq")
+        if not index_info:
+            return collection
+
+        codebook = np.load(self.get_codebook_path(collection_name, index_info["codebook"]))
+        codebooks = codebook["codebooks"]
+        collection.ivfpq = {
+            "coarse": codebook["coarse"],
+            "codebooks": codebooks,
+            "codebooks_t": np.ascontiguousarray(codebooks.transpose(0, 2, 1)),
+            "codebook_sq_norms": np.einsum("mkd,mkd->mk", codebooks, codebooks),
+        }
+
+        encoded = set(index_info["encoded"])
+        for segment in collection.segments:
+            segment.codes = None
+            if segment.name not in encoded:
+                continue
+
+            prefix = os.path.join(collection.directory, segment.name)
+            segment.codes = np.load(f"{prefix}.ivfpq.codes.npy")
+            lists = np.load(f"{prefix}.ivfpq.lists.npy")
+
+            # Rows grouped by inverted list: list c is list_order[list_offsets[c]:list_offsets[c + 1]]
+            segment.list_order = np.argsort(lists, kind="stable")
+            segment.list_offsets = np.searchsorted(lists[segment.list_order], np.arange(len(collection.ivfpq["coarse"]) + 1))
+
+        return collection
+
+    def get_collection(self, collection_name: str):
+        collection = super().get_collection(collection_name)
+
+        # Collections written before the index existed get trained on their first load
+        if collection is not None and self.checked_versions.get(collection_name) != collection.version:
+            self.checked_versions[collection_name] = collection.version
+            self.schedule_compaction(collection_name, collection=collection)
+
+        return collection
+
+    def needs_maintenance(self, collection: FlatCollection) -> bool:
+        if self.needs_compaction(collection):
+            return True
+
+        index_info = collection.manifest.get("ivfpq")
+        if not index_info:
+            return collection.count() >= self.min_train_size
+
+        return bool(set(collection.manifest["segments"]) - set(index_info["encoded"]))
+
+    def schedule_compaction(self, collection_name: str, collection: FlatCollection = None):
+        with self.maintenance_lock:
+            if collection_name in self.maintaining:
+                self.maintenance_requested.add(collection_name)
+                return
+
+        collection = collection or self.get_collection(collection_name)
+        if collection is None or not self.needs_maintenance(collection):
+            return
+
+        with self.maintenance_lock:
+            if collection_name in self.maintaining:
+                self.maintenance_requested.add(collection_name)
+                return
+
+            self.maintaining.add(collection_name)
+            self.maintenance_futures[collection_name] = self.compaction_executor.submit(self.maintain, collection_name)
+
+    def maintain(self, collection_name: str):
+        """Compact, train and encode a collection, off the request path."""
+        try:
+            if self.needs_compaction(self.open_collection(collection_name)):
+                self.compact(collection_name)
+
+            collection = self.open_collection(collection_name)
+            if not collection.manifest.get("ivfpq"):
+                if collection.count() < self.min_train_size:
+                    return
+                self.train(collection_name, collection)
+                collection = self.open_collection(collection_name)
+
+            self.encode_segments(collection_name, collection)
+        except Exception as e:
+            self.logger.error(f"Error while indexing collection {collection_name}: {e}")
+        finally:
+            with self.maintenance_lock:
+                self.maintaining.discard(collection_name)
+                is_requested = collection_name in self.maintenance_requested
+                self.maintenance_requested.discard(collection_name)
+
+            # Segments appended meanwhile would otherwise stay unencoded until the next write
+            if is_requested:
+                self.schedule_compaction(collection_name)
+
+    def get_pq_m(self, embedding_size: int) -> int:
+        # Sub-spaces must split the dimensions evenly
+        return max(m for m in range(1, min(self.pq_m, embedding_size) + 1) if embedding_size % m == 0)
+
+    def sample_vectors(self, collection: FlatCollection, rng: np.random.Generator) -> np.ndarray:
+        live_rows = [ (segment, np.flatnonzero(segment.alive)) for segment in collection.segments ]
+        total = sum(len(rows) for _, rows in live_rows)
+
+        picked = np.sort(rng.choice(total, size=min(total, self.train_sample_size), replace=False))
+
+        samples, offset = [], 0
+        for segment, rows in live_rows:
+            local = picked[(picked >= offset) & (picked < offset + len(rows))] - offset
+            if len(local):
+                samples.append(np.asarray(segment.vectors[rows[local]], dtype=np.float32))
+            offset += len(rows)
+
+        return np.concatenate(samples)
+
+    def train(self, collection_name: str, collection: FlatCollection):
+        rng = np.random.default_rng(0)
+        sample = self.sample_vectors(collection, rng)
+
+        coarse = kmeans(sample, self.nlist, self.kmeans_iterations, rng)
+        residuals = sample - coarse[nearest_centroids(sample, coarse)]
+
+        pq_m = self.get_pq_m(collection.embedding_size)
+        sub_size = collection.embedding_size // pq_m
+        codebooks = np.stack([
+            kmeans(np.ascontiguousarray(residuals[:, j * sub_size:(j + 1) * sub_size]), 256, self.kmeans_iterations, rng)
+            for j in range(pq_m)
+        ]).astype(np.float32)
+
+        if codebooks.shape[1] < 256:
+            # Tiny samples: pad so that every code stays a valid index
+            codebooks = np.concatenate([ codebooks, np.repeat(codebooks[:, -1:], 256 - codebooks.shape[1], axis=1) ], axis=1)
+
+        codebook_name = uuid.uuid4().hex
+        np.savez(self.get_codebook_path(collection_name, codebook_name), coarse=coarse.astype(np.float32), codebooks=codebooks)
+
+        with self.collection_lock(collection_name):
+            manifest = self.open_collection(collection_name).manifest
+            if manifest.get("ivfpq"):
+                # Trained by another process meanwhile
+                os.remove(self.get_codebook_path(collection_name, codebook_name))
+                return
+
+            manifest["ivfpq"] = { "codebook": codebook_name, "encoded": [] }
+            self.write_manifest(collection_name, manifest)
+
+        self.logger.info(f"Trained IVF-PQ index of {collection_name}: {len(coarse)} lists, {pq_m} sub-spaces.")
+
+    def encode(self, vectors: np.ndarray, coarse: np.ndarray, codebooks: np.ndarray, batch_size: int = 8192):
+        pq_m, _, sub_size = codebooks.shape
+
+        lists = nearest_centroids(vectors, coarse, batch_size=batch_size)
+        codes = np.empty((len(vectors), pq_m), dtype=np.uint8)
+
+        for start in range(0, len(vectors), batch_size):
+            batch = np.asarray(vectors[start:start + batch_size], dtype=np.float32)
+            residuals = batch - coarse[lists[start:start + batch_size]]
+            for j in range(pq_m):
+                codes[start:start + batch_size, j] = nearest_centroids(residuals[:, j * sub_size:(j + 1) * sub_size], codebooks[j])
+
+        return codes, lists
+
+    def encode_segments(self, collection_name: str, collection: FlatCollection):
+        index_info = collection.manifest["ivfpq"]
+        pending = [ segment for segment in collection.segments if segment.name not in index_info["encoded"] ]
+        if not pending:
+            return
+
+        for segment in pending:
+            codes, lists = self.encode(segment.vectors, collection.ivfpq["coarse"], collection.ivfpq["codebooks"])
+
+            prefix = os.path.join(collection.directory, segment.name)
+            np.save(f"{prefix}.ivfpq.codes.npy", codes)
+            np.save(f"{prefix}.ivfpq.lists.npy", lists)
+
+        with self.collection_lock(collection_name):
+            manifest = self.open_collection(collection_name).manifest
+            if not manifest.get("ivfpq") or manifest["ivfpq"]["codebook"] != index_info["codebook"]:
+                return
+
+            # Segments compacted away meanwhile are dropped from the encoded list too
+            encoded = set(manifest["ivfpq"]["encoded"]) | { segment.name for segment in pending }
+            manifest["ivfpq"]["encoded"] = [ name for name in manifest["segments"] if name in encoded ]
+            self.write_manifest(collection_name, manifest)
+
+    def search_segment(self, collection: FlatCollection, segment_idx: int, queries: np.ndarray, limit: int, exclude: tuple = None):
+        segment = collection.segments[segment_idx]
+        if collection.ivfpq is None or getattr(segment, "codes", None) is None:
+            return super().search_segment(collection, segment_idx, queries, limit, exclude=exclude)
+
+        coarse = collection.ivfpq["coarse"]
+        codebooks = collection.ivfpq["codebooks"]
+        pq_m, _, sub_size = codebooks.shape
+        subspaces = np.arange(pq_m)[None, :]
+
+        top_rows = np.zeros((limit, len(queries)), dtype=np.int64)
+        top_scores = np.full((limit, len(queries)), -np.inf, dtype=np.float32)
+
+        coarse_distances = np.einsum("ij,ij->i", coarse, coarse)[None, :] - 2 * (queries @ coarse.T)
+        nprobe = min(self.nprobe, len(coarse))
+
+        for query_idx, query in enumerate(queries):
+            probes = np.argpartition(coarse_distances[query_idx], nprobe - 1)[:nprobe]
+
+            list_starts = segment.list_offsets[probes]
+            list_sizes = segment.list_offsets[probes + 1] - list_starts
+            if list_sizes.sum() == 0:
+                continue
+
+            # Rows of every probed list, and the probe each one belongs to
+            probe_idx = np.repeat(np.arange(nprobe), list_sizes)
+            rows = segment.list_order[np.repeat(list_starts - np.cumsum(list_sizes) + list_sizes, list_sizes) + np.arange(list_sizes.sum())]
+
+            # Asymmetric distance tables, one per probe: ||r_j - y_jk||^2 for residual r = q - coarse centroid
+            residuals = (query[None, :] - coarse[probes]).reshape(nprobe, pq_m, sub_size)
+            tables = collection.ivfpq["codebook_sq_norms"][None] - 2 * np.matmul(
+                residuals.transpose(1, 0, 2), collection.ivfpq["codebooks_t"]
+            ).transpose(1, 0, 2)
+            tables += np.einsum("pmd,pmd->p", residuals, residuals)[:, None, None] / pq_m
+
+            # One flat gather: entry (probe, sub-space, code) of the tables for every row
+            table_idx = (probe_idx[:, None] * pq_m + subspaces) * 256 + segment.codes[rows]
+            distances = np.take(tables.ravel(), table_idx).sum(axis=1)
+
+            keep = segment.alive[rows]
+            if exclude is not None and exclude[0] == segment_idx:
+                keep &= rows != exclude[1]
+            rows, distances = rows[keep], distances[keep]
+
+            rerank_limit = min(limit * self.rerank_factor, len(rows))
+            if rerank_limit == 0:
+                continue
+            if rerank_limit < len(rows):
+                best = np.argpartition(distances, rerank_limit - 1)[:rerank_limit]
+                rows = rows[best]
+
+            # Exact re-rank, sorted rows keep the reads of the memory-mapped file sequential
+            rows = np.sort(rows)
+            scores = self.score_vectors(collection, segment.vectors[rows], segment.sq_norms[rows], query[None, :])[:, 0]
+
+            k = min(limit, len(rows))
+            best = np.argsort(-scores, kind="stable")[:k]
+            top_rows[:k, query_idx] = rows[best]
+            top_scores[:k, query_idx] = scores[best]
+
+        return top_rows, top_scores
+
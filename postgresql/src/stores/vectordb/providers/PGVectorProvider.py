@@ -1,16 +1,102 @@
 from ..VectorDBInterface import VectorDBInterface
-from ..VectorDBEnums import DistanceMethodEnums, PgVectorTableSchemeEnums, PgVectorDistanceMethodEnums, PgvectorIndexTypeEnums
+from ..VectorDBEnums import (
+    DistanceMethodEnums, PgVectorTableSchemeEnums, PgVectorDistanceMethodEnums, PgvectorIndexTypeEnums, PgVectorTextSearchConfigEnums,
+    PgVectorStorageEnums, PgVectorTableLayoutEnums
+)
+from ..fusion import reciprocal_rank_fusion
+import asyncio
 import logging
 from typing import List
 from models.db_schemes import RetrievedDocument
 from sqlalchemy.sql import text as sql_text
+from sqlalchemy import event
+from pgvector.asyncpg import register_vector
+import numpy as np
+import functools
 import json
+import re
+
+
+# SQLSTATE of a column that does not exist, e.g. the text column of a collection migrated to vectors_only
+UNDEFINED_COLUMN_SQLSTATE = "42703"
+
+
+def register_vector_codec(dbapi_connection, connection_record):
+    # Binary wire format for vector / halfvec parameters and columns instead of text literals
+    dbapi_connection.run_async(register_vector)
+
+
+def get_sqlstate(error: Exception):
+    # SQLAlchemy wraps the asyncpg error, which carries the SQLSTATE
+    orig = getattr(error, "orig", None)
+    for candidate in (orig, getattr(orig, "__cause__", None), error):
+        sqlstate = getattr(candidate, "sqlstate", None) or getattr(candidate, "pgcode", None)
+        if sqlstate:
+            return sqlstate
+    return None
+
+
+def retry_on_stale_layout(method):
+    """
+    Retry a collection method once with a fresh layout when its cached one is outdated, e.g. once
+    another process has migrated the collection to vectors_only or recreated it.
+    """
+    @functools.wraps(method)
+    async def wrapper(self, collection_name: str, *args, **kwargs):
+        try:
+            return await method(self, collection_name, *args, **kwargs)
+        except Exception as e:
+            if collection_name not in self.vector_columns or get_sqlstate(e) != UNDEFINED_COLUMN_SQLSTATE:
+                raise
+            
+            self.logger.warning(f"Collection {collection_name} changed layout in another process, reloading it.")
+            self.forget_collection_layout(collection_name)
+            return await method(self, collection_name, *args, **kwargs)
+    
+    return wrapper
+
 
 class PGVectorProvider(VectorDBInterface):
-    def __init__(self, db_client, default_vector_size: int = 768, distance_method: str = None, index_threshold: int = 100):
+    def __init__(
+        self,
+        db_client,
+        default_vector_size: int = 768,
+        distance_method: str = None,
+        index_threshold: int = 100,
+        text_search_language: str = None,
+        hybrid_rrf_k: int = 60,
+        hybrid_candidates_multiplier: int = 2,
+        storage: str = None,
+        binary_index: bool = False,
+        rerank_multiplier: int = 4,
+        table_layout: str = None,
+    ):
         self.db_client = db_client
         self.default_vector_size = default_vector_size
         self.index_threshold = index_threshold
+        self.hybrid_rrf_k = hybrid_rrf_k
+        self.hybrid_candidates_multiplier = hybrid_candidates_multiplier
+        
+        # halfvec stores float16 (half the heap), the binary index keeps 1 bit per dimension
+        # and its Hamming candidates are re-ranked with the exact distance
+        self.storage = PgVectorStorageEnums.VECTOR.value
+        if storage in [ s.value for s in PgVectorStorageEnums ]:
+            self.storage = storage
+        
+        self.binary_index = binary_index
+        self.rerank_multiplier = rerank_multiplier
+        
+        # vectors_only tables keep (chunk_id, vector), texts are read from data_chunks for the returned rows
+        self.table_layout = PgVectorTableLayoutEnums.FULL.value
+        if table_layout in [ l.value for l in PgVectorTableLayoutEnums ]:
+            self.table_layout = table_layout
+        
+        # Language-aware full text search config (our locales: en / ar), 'simple' for anything else
+        text_search_config = PgVectorTextSearchConfigEnums.SIMPLE.value
+        if text_search_language and text_search_language.upper() in PgVectorTextSearchConfigEnums.__members__:
+            text_search_config = PgVectorTextSearchConfigEnums[text_search_language.upper()].value
+        
+        self.text_search_config = text_search_config
         
         if distance_method == DistanceMethodEnums.COSINE.value:
             distance_method = PgVectorDistanceMethodEnums.COSINE.value
@@ -24,6 +110,16 @@ class PGVectorProvider(VectorDBInterface):
         self.logger = logging.getLogger("uvicorn")
         
         self.default_index_name = lambda collection_name: f"{collection_name}_vector_idx"
+        self.default_text_index_name = lambda collection_name: f"{collection_name}_tsv_idx"
+        self.default_chunk_index_name = lambda collection_name: f"{collection_name}_chunk_id_idx"
+        
+        # Collections already known to carry the tsv column + GIN index / the chunk_id index
+        self.text_search_collections = set()
+        self.chunk_index_collections = set()
+        
+        # (column type, dimensions, is vectors_only) of every collection already looked up,
+        # refreshed by retry_on_stale_layout when another process migrated or recreated the table
+        self.vector_columns = {}
     
     async def connect(self):
         async with self.db_client() as session:
@@ -42,6 +138,19 @@ class PGVectorProvider(VectorDBInterface):
                 # If extension already exists or any other error, just log and continue
                 self.logger.warning(f"Vector extension setup: {str(e)}")
                 await session.rollback()
+        
+        await self.register_binary_codec()
+    
+    async def register_binary_codec(self):
+        # The codec needs the vector type, so it is only installed once the extension exists
+        engine = self.db_client.kw.get("bind")
+        if engine is None or event.contains(engine.sync_engine, "connect", register_vector_codec):
+            return
+        
+        event.listen(engine.sync_engine, "connect", register_vector_codec)
+        
+        # Pooled connections opened before the listener (e.g. the one above) would still expect text literals
+        await engine.dispose()
     
     async def disconnect(self):
         # PGVector does not require explicit disconnection like some other databases
@@ -121,6 +230,7 @@ class PGVectorProvider(VectorDBInterface):
                 self.logger.info(f"Deleted collection: {collection_name}")
                 await session.commit()
         
+        self.vector_columns.pop(collection_name, None)
         return True
     
     async def create_collection (self, collection_name: str, embedding_size: int, do_reset: bool = False):
@@ -134,27 +244,338 @@ class PGVectorProvider(VectorDBInterface):
             
             async with self.db_client() as session:
                 async with session.begin():
-                    create_table_sql = sql_text(
-                        f'CREATE TABLE {collection_name} ('
-                            f'{PgVectorTableSchemeEnums.ID.value} bigserial PRIMARY KEY, '
-                            f'{PgVectorTableSchemeEnums.TEXT.value} text, '
-                            f'{PgVectorTableSchemeEnums.VECTOR.value} vector({embedding_size}), '
-                            f'{PgVectorTableSchemeEnums.METADATA.value} jsonb  DEFAULT \'{{}}\', '
-                            f'{PgVectorTableSchemeEnums.CHUNK_ID.value} integer, '
-                            f'FOREIGN KEY ({PgVectorTableSchemeEnums.CHUNK_ID.value}) REFERENCES data_chunks(chunk_id)'
-                        ')'
-                    )
+                    create_table_sql = sql_text(self.get_create_table_sql(
+                        collection_name=collection_name,
+                        vector_type=f"{self.storage}({embedding_size})",
+                        is_vectors_only=self.table_layout == PgVectorTableLayoutEnums.VECTORS_ONLY.value
+                    ))
                     
                     await session.execute(create_table_sql, {"collection_name": collection_name})
-                    self.logger.info(f"Created collection: {collection_name} with embedding size: {embedding_size}")
+                    self.logger.info(
+                        f"Created collection: {collection_name} with embedding size: {embedding_size} ({self.storage}, {self.table_layout})"
+                    )
                     await session.commit()
-                    
+            
+            self.vector_columns.pop(collection_name, None)
+            
+            if self.table_layout == PgVectorTableLayoutEnums.FULL.value:
+                await self.create_text_search_index(collection_name=collection_name)
+                await self.create_chunk_id_index(collection_name=collection_name)
+            
             return True
         
         else:
             self.logger.info(f"Collection {collection_name} already exists, skipping creation.")
+            
+            # Full collections keep their layout until migrate_collections_to_vectors_only is run, and
+            # the ones created before hybrid search existed get their tsv column from migrate_collections_text_search
             return False
     
+    def get_create_table_sql(self, collection_name: str, vector_type: str, is_vectors_only: bool = False) -> str:
+        if is_vectors_only:
+            # The primary key is the chunk_id index, a chunk has one vector per collection
+            return (
+                f'CREATE TABLE {collection_name} ('
+                    f'{PgVectorTableSchemeEnums.CHUNK_ID.value} integer PRIMARY KEY, '
+                    f'{PgVectorTableSchemeEnums.VECTOR.value} {vector_type}, '
+                    f'FOREIGN KEY ({PgVectorTableSchemeEnums.CHUNK_ID.value}) REFERENCES data_chunks(chunk_id)'
+                ')'
+            )
+        
+        return (
+            f'CREATE TABLE {collection_name} ('
+                f'{PgVectorTableSchemeEnums.ID.value} bigserial PRIMARY KEY, '
+                f'{PgVectorTableSchemeEnums.TEXT.value} text, '
+                f'{PgVectorTableSchemeEnums.VECTOR.value} {vector_type}, '
+                f'{PgVectorTableSchemeEnums.METADATA.value} jsonb  DEFAULT \'{{}}\', '
+                f'{PgVectorTableSchemeEnums.CHUNK_ID.value} integer, '
+                f'{self.get_text_search_column_sql()}, '
+                f'FOREIGN KEY ({PgVectorTableSchemeEnums.CHUNK_ID.value}) REFERENCES data_chunks(chunk_id)'
+            ')'
+        )
+    
+    async def get_full_collections(self) -> List[str]:
+        """Names of the full collections: the tables carrying both a vector and a text column."""
+        async with self.db_client() as session:
+            async with session.begin():
+                results = await session.execute(sql_text(
+                    "SELECT c.relname FROM pg_class c "
+                    "JOIN pg_attribute v ON v.attrelid = c.oid AND v.attname = :column_name AND NOT v.attisdropped "
+                    "JOIN pg_attribute t ON t.attrelid = c.oid AND t.attname = :text_column AND NOT t.attisdropped "
+                    "WHERE c.relkind = 'r' AND c.relnamespace = 'public'::regnamespace "
+                    "AND format_type(v.atttypid, NULL) IN ('vector', 'halfvec')"
+                ), {
+                    "column_name": PgVectorTableSchemeEnums.VECTOR.value,
+                    "text_column": PgVectorTableSchemeEnums.TEXT.value,
+                })
+                collection_names = results.scalars().all()
+        
+        return list(collection_names)
+    
+    async def migrate_collections_text_search(self) -> List[str]:
+        """
+        Add the tsv column and the GIN / chunk_id indexes to the full collections created before
+        hybrid search existed, the collections migrated are returned.
+
+        Adding the generated column rewrites the table under an exclusive lock, so this is run
+        explicitly rather than from an indexing run; the indexes are then built concurrently.
+        Until then hybrid searches of these collections fall back to vector search.
+        """
+        migrated = []
+        for collection_name in await self.get_full_collections():
+            is_migrated = await self.create_text_search_index(collection_name=collection_name)
+            await self.create_chunk_id_index(collection_name=collection_name)
+            
+            if is_migrated:
+                migrated.append(collection_name)
+        
+        return migrated
+    
+    async def migrate_collections_to_vectors_only(self) -> List[str]:
+        """
+        Migrate every full collection to the vectors_only layout, the collections migrated are returned.
+
+        Run it once the layout is switched (scripts.migrate_pgvector_layout); other processes reload
+        the layout they cached on their next query against a migrated collection.
+        """
+        migrated = []
+        for collection_name in await self.get_full_collections():
+            if await self.migrate_to_vectors_only(collection_name=collection_name):
+                migrated.append(collection_name)
+        
+        return migrated
+    
+    async def migrate_to_vectors_only(self, collection_name: str) -> bool:
+        """Rewrite a full collection as a (chunk_id, vector) table, its texts stay in data_chunks."""
+        migrated_name = f"{collection_name}_migrated"
+        
+        async with self.db_client() as session:
+            async with session.begin():
+                column_type, dimensions, is_vectors_only = await self.get_vector_column(session, collection_name)
+                if is_vectors_only:
+                    return False
+                
+                self.logger.info(f"START :: Migrating collection {collection_name} to the vectors_only layout.")
+                
+                # Searches keep reading the old table until the swap, concurrent inserts wait for it
+                await session.execute(sql_text(f"LOCK TABLE {collection_name} IN SHARE MODE"))
+                
+                vector_type = f"{column_type}({dimensions})" if dimensions else column_type
+                await session.execute(sql_text(self.get_create_table_sql(
+                    collection_name=migrated_name, vector_type=vector_type, is_vectors_only=True
+                )))
+                
+                # A new table rather than DROP COLUMN, which would leave the text in the heap until a full rewrite.
+                # Replayed indexing runs may have stored a chunk twice, its latest vector is kept.
+                result = await session.execute(sql_text(
+                    f"INSERT INTO {migrated_name} ({PgVectorTableSchemeEnums.CHUNK_ID.value}, {PgVectorTableSchemeEnums.VECTOR.value}) "
+                    f"SELECT DISTINCT ON ({PgVectorTableSchemeEnums.CHUNK_ID.value}) "
+                    f"{PgVectorTableSchemeEnums.CHUNK_ID.value}, {PgVectorTableSchemeEnums.VECTOR.value} "
+                    f"FROM {collection_name} WHERE {PgVectorTableSchemeEnums.CHUNK_ID.value} IS NOT NULL "
+                    f"ORDER BY {PgVectorTableSchemeEnums.CHUNK_ID.value}, {PgVectorTableSchemeEnums.ID.value} DESC"
+                ))
+                
+                await session.execute(sql_text(f"DROP TABLE {collection_name}"))
+                await session.execute(sql_text(f"ALTER TABLE {migrated_name} RENAME TO {collection_name}"))
+                await session.execute(sql_text(
+                    f"ALTER TABLE {collection_name} RENAME CONSTRAINT {migrated_name}_pkey TO {collection_name}_pkey"
+                ))
+                await session.execute(sql_text(
+                    f"ALTER TABLE {collection_name} RENAME CONSTRAINT {migrated_name}_{PgVectorTableSchemeEnums.CHUNK_ID.value}_fkey "
+                    f"TO {collection_name}_{PgVectorTableSchemeEnums.CHUNK_ID.value}_fkey"
+                ))
+                
+                self.logger.info(f"END :: Migrated {result.rowcount} vectors of collection {collection_name} to the vectors_only layout.")
+        
+        self.forget_collection_layout(collection_name)
+        
+        # The ANN index went with the old table
+        await self.create_vector_index(collection_name=collection_name)
+        return True
+    
+    def get_text_search_column_sql(self) -> str:
+        return (
+            f"{PgVectorTableSchemeEnums.TSV.value} tsvector GENERATED ALWAYS AS "
+            f"(to_tsvector('{self.text_search_config}', coalesce({PgVectorTableSchemeEnums.TEXT.value}, ''))) STORED"
+        )
+    
+    def to_vector_param(self, vector) -> np.ndarray:
+        # float32 rows go to the binary codec as they are, lists are converted once
+        return np.asarray(vector, dtype=np.float32)
+    
+    def from_vector_value(self, value) -> np.ndarray:
+        # vector columns decode to ndarrays, halfvec ones to pgvector's HalfVector
+        if hasattr(value, "to_numpy"):
+            value = value.to_numpy()
+        
+        return np.asarray(value, dtype=np.float32)
+    
+    def forget_collection_layout(self, collection_name: str):
+        self.vector_columns.pop(collection_name, None)
+        self.text_search_collections.discard(collection_name)
+        self.chunk_index_collections.discard(collection_name)
+    
+    async def get_vector_column(self, session, collection_name: str) -> tuple:
+        """(column type, dimensions, is vectors_only) of a collection, read from the catalog once."""
+        # Fixed at creation (or migration) time, collections created under other settings keep theirs.
+        # Cached per process: the create / delete / migrate calls of this process invalidate it, a change
+        # made by another process is picked up by retry_on_stale_layout on the first failing query.
+        if collection_name in self.vector_columns:
+            return self.vector_columns[collection_name]
+        
+        result = await session.execute(sql_text(
+            "SELECT format_type(v.atttypid, v.atttypmod) as column_type, "
+            "NOT EXISTS ("
+                "SELECT 1 FROM pg_attribute t "
+                "WHERE t.attrelid = v.attrelid AND t.attname = :text_column AND NOT t.attisdropped"
+            ") as is_vectors_only "
+            "FROM pg_attribute v "
+            "WHERE v.attrelid = to_regclass(:collection_name) AND v.attname = :column_name"
+        ), {
+            "collection_name": collection_name,
+            "column_name": PgVectorTableSchemeEnums.VECTOR.value,
+            "text_column": PgVectorTableSchemeEnums.TEXT.value,
+        })
+        record = result.fetchone()
+        
+        if record is None:
+            return self.storage, None, self.table_layout == PgVectorTableLayoutEnums.VECTORS_ONLY.value
+        
+        # e.g. "halfvec(1536)"
+        match = re.match(r"(\w+)(?:\((\d+)\))?", record.column_type)
+        vector_column = (match.group(1), int(match.group(2)) if match.group(2) else None, record.is_vectors_only)
+        
+        self.vector_columns[collection_name] = vector_column
+        return vector_column
+    
+    def is_binary_search(self, vector_column: tuple) -> bool:
+        _, dimensions, _ = vector_column
+        return self.binary_index and dimensions is not None
+    
+    def get_record_columns_sql(self, vector_column: tuple) -> str:
+        chunk_id_sql = f"{PgVectorTableSchemeEnums.CHUNK_ID.value} as chunk_id"
+        
+        if vector_column[2]:
+            return chunk_id_sql
+        
+        return f"{PgVectorTableSchemeEnums.TEXT.value} as text, {chunk_id_sql}"
+    
+    def with_chunk_texts_sql(self, vector_column: tuple, ranked_sql: str, order_sql: str = "r.score DESC") -> str:
+        # vectors_only rows carry no text: only the final (already limited) rows are joined to data_chunks
+        if not vector_column[2]:
+            return ranked_sql
+        
+        return (
+            "SELECT t.chunk_text as text, r.* "
+            f"FROM ({ranked_sql}) r "
+            "JOIN data_chunks t ON t.chunk_id = r.chunk_id "
+            f"ORDER BY {order_sql}"
+        )
+    
+    async def set_candidates_limit(self, session, vector_column: tuple, limit: int):
+        # An HNSW scan returns at most ef_search rows, it has to cover the over-fetched Hamming candidates
+        if self.is_binary_search(vector_column):
+            ef_search = min(max(limit * self.rerank_multiplier, 40), 1000)
+            await session.execute(sql_text(f"SET LOCAL hnsw.ef_search = {ef_search}"))
+    
+    def get_ann_sql(self, collection_name: str, vector_column: tuple, query_sql: str, columns_sql: str, limit_sql: str, where_sql: str = "") -> str:
+        vector = PgVectorTableSchemeEnums.VECTOR.value
+        score_sql = f"1 - ({vector} <=> {query_sql}) as score"
+        
+        # Order by the raw distance operator so the HNSW / IVFFlat index can serve the query
+        if not self.is_binary_search(vector_column):
+            return (
+                f"SELECT {columns_sql}, {score_sql} "
+                f"FROM {collection_name} {where_sql} "
+                f"ORDER BY {vector} <=> {query_sql} "
+                f"LIMIT {limit_sql}"
+            )
+        
+        # Hamming ANN over the binary index over-fetches candidates, the exact distance re-ranks them
+        _, dimensions, _ = vector_column
+        return (
+            "SELECT * FROM ("
+                f"SELECT {columns_sql}, {score_sql} "
+                f"FROM {collection_name} {where_sql} "
+                f"ORDER BY binary_quantize({vector})::bit({dimensions}) <~> binary_quantize({query_sql}) "
+                f"LIMIT {limit_sql} * {self.rerank_multiplier}"
+            ") bq "
+            "ORDER BY bq.score DESC "
+            f"LIMIT {limit_sql}"
+        )
+    
+    async def is_text_search_enabled(self, collection_name: str) -> bool:
+        if collection_name in self.text_search_collections:
+            return True
+        
+        async with self.db_client() as session:
+            async with session.begin():
+                check_sql = sql_text("""
+                                    SELECT 1
+                                    FROM information_schema.columns
+                                    WHERE table_name = :collection_name
+                                    AND column_name = :column_name
+                                    """)
+                result = await session.execute(check_sql, {
+                    "collection_name": collection_name,
+                    "column_name": PgVectorTableSchemeEnums.TSV.value
+                })
+                record = result.scalar_one_or_none()
+        
+        if record is None:
+            return False
+        
+        self.text_search_collections.add(collection_name)
+        return True
+    
+    async def create_text_search_index(self, collection_name: str) -> bool:
+        """Ensure the tsv column and its GIN index, True when the column had to be added."""
+        index_name = self.default_text_index_name(collection_name)
+        
+        self.logger.info(f"START :: Creating text search column and index for collection {collection_name}.")
+        
+        # New collections already have the column, only older ones are rewritten here
+        is_column_added = False
+        if not await self.is_text_search_enabled(collection_name=collection_name):
+            async with self.db_client() as session:
+                async with session.begin():
+                    await session.execute(sql_text(
+                        f"ALTER TABLE {collection_name} ADD COLUMN IF NOT EXISTS {self.get_text_search_column_sql()}"
+                    ))
+            is_column_added = True
+        
+        await self.create_index_concurrently(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {collection_name} "
+            f"USING gin ({PgVectorTableSchemeEnums.TSV.value})"
+        )
+        
+        self.logger.info(f"END :: Created text search column and index for collection {collection_name}.")
+        
+        self.text_search_collections.add(collection_name)
+        return is_column_added
+    
+    async def create_index_concurrently(self, create_index_sql: str):
+        # CONCURRENTLY can not run inside a transaction block, searches and inserts go on during the build
+        engine = self.db_client.kw.get("bind")
+        
+        async with engine.connect() as connection:
+            connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+            await connection.execute(sql_text(create_index_sql))
+    
+    async def create_chunk_id_index(self, collection_name: str) -> bool:
+        if collection_name in self.chunk_index_collections:
+            return False
+        
+        index_name = self.default_chunk_index_name(collection_name)
+        
+        await self.create_index_concurrently(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {collection_name} "
+            f"({PgVectorTableSchemeEnums.CHUNK_ID.value})"
+        )
+        
+        self.chunk_index_collections.add(collection_name)
+        return True
+    
     async def is_index_existed(self, collection_name: str) -> bool:
         index_name = self.default_index_name(collection_name)
         
@@ -202,9 +623,19 @@ class PGVectorProvider(VectorDBInterface):
                 
                 index_name = self.default_index_name(collection_name)
                 
+                vector_column = await self.get_vector_column(session, collection_name)
+                column_type, dimensions, _ = vector_column
+                
+                if self.is_binary_search(vector_column):
+                    index_sql = f"(binary_quantize({PgVectorTableSchemeEnums.VECTOR.value})::bit({dimensions})) bit_hamming_ops"
+                else:
+                    # vector_cosine_ops -> halfvec_cosine_ops on halfvec columns
+                    operator_class = self.distance_method.replace(PgVectorStorageEnums.VECTOR.value, column_type, 1)
+                    index_sql = f"{PgVectorTableSchemeEnums.VECTOR.value} {operator_class}"
+                
                 create_idx_sql = sql_text(
                     f"CREATE INDEX IF NOT EXISTS {index_name} ON {collection_name} "
-                    f"USING {index_type} ({PgVectorTableSchemeEnums.VECTOR.value} {self.distance_method})"
+                    f"USING {index_type} ({index_sql})"
                 )
                 
                 await session.execute(create_idx_sql)
@@ -233,6 +664,38 @@ class PGVectorProvider(VectorDBInterface):
         
         return await self.create_vector_index(collection_name=collection_name, index_type=index_type)
     
+    def get_insert_sql(self, collection_name: str, is_vectors_only: bool = False) -> str:
+        if is_vectors_only:
+            # Texts and metadata already live in data_chunks, only the vector is written (and re-written on replays)
+            return (
+                f"INSERT INTO {collection_name} "
+                f"({PgVectorTableSchemeEnums.CHUNK_ID.value}, {PgVectorTableSchemeEnums.VECTOR.value}) "
+                "VALUES (:chunk_id, :vector) "
+                f"ON CONFLICT ({PgVectorTableSchemeEnums.CHUNK_ID.value}) "
+                f"DO UPDATE SET {PgVectorTableSchemeEnums.VECTOR.value} = EXCLUDED.{PgVectorTableSchemeEnums.VECTOR.value}"
+            )
+        
+        return (
+            f"INSERT INTO {collection_name} "
+            f"({PgVectorTableSchemeEnums.TEXT.value}, "
+            f"{PgVectorTableSchemeEnums.VECTOR.value}, "
+            f"{PgVectorTableSchemeEnums.METADATA.value}, "
+            f"{PgVectorTableSchemeEnums.CHUNK_ID.value}) "
+            "VALUES (:text, :vector, :metadata, :chunk_id)"
+        )
+    
+    def get_insert_values(self, is_vectors_only: bool, text: str, vector, metadata_json: str, record_id) -> dict:
+        if is_vectors_only:
+            return { "vector": self.to_vector_param(vector), "chunk_id": record_id }
+        
+        return {
+            "text": text,
+            "vector": self.to_vector_param(vector),
+            "metadata": metadata_json,
+            "chunk_id": record_id
+        }
+    
+    @retry_on_stale_layout
     async def insert_one(self, collection_name: str, text: str, vector: list, metadata: dict = None, record_id: str = None):
         is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
         if not is_collection_existed:
@@ -245,23 +708,14 @@ class PGVectorProvider(VectorDBInterface):
 
         async with self.db_client() as session:
             async with session.begin():
-                insert_sql = sql_text(
-                    f"INSERT INTO {collection_name} "
-                    f"({PgVectorTableSchemeEnums.TEXT.value}, "
-                    f"{PgVectorTableSchemeEnums.VECTOR.value}, "
-                    f"{PgVectorTableSchemeEnums.METADATA.value}), "
-                    f"{PgVectorTableSchemeEnums.CHUNK_ID.value}) "
-                    "VALUES (:text, :vector, :metadata, :chunk_id)"
-                )
+                _, _, is_vectors_only = await self.get_vector_column(session, collection_name)
+                insert_sql = sql_text(self.get_insert_sql(collection_name=collection_name, is_vectors_only=is_vectors_only))
                 
                 metadata_json = json.dumps(metadata, ensure_ascii=False) if metadata else '{}'
                 
-                await session.execute(insert_sql, {
-                    "text": text,
-                    "vector": '[' + ",".join([ str(v) for v in vector ]) + ']',
-                    "metadata": metadata_json,
-                    "chunk_id": record_id
-                })
+                await session.execute(insert_sql, self.get_insert_values(
+                    is_vectors_only=is_vectors_only, text=text, vector=vector, metadata_json=metadata_json, record_id=record_id
+                ))
                 self.logger.info(f"Inserted record into {collection_name}: {record_id}")
                 await session.commit()
                 
@@ -269,7 +723,9 @@ class PGVectorProvider(VectorDBInterface):
         
         return True
         
-    async def insert_many (self, collection_name: str, texts: List, vectors: List, metadata: List = None, record_ids: List = None, batch_size: int = 50):
+    @retry_on_stale_layout
+    async def insert_many (self, collection_name: str, texts: List, vectors: List, metadata: List = None, record_ids: List = None, batch_size: int = 50, asset_ids: List = None, before_commit = None):
+        # asset_ids are not stored, grouping joins data_chunks on chunk_id instead
         is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
         if not is_collection_existed:
             self.logger.error(f"Collection {collection_name} does not exist, cannot insert record.")
@@ -285,6 +741,9 @@ class PGVectorProvider(VectorDBInterface):
         
         async with self.db_client() as session:
             async with session.begin():
+                _, _, is_vectors_only = await self.get_vector_column(session, collection_name)
+                batch_insert_sql = sql_text(self.get_insert_sql(collection_name=collection_name, is_vectors_only=is_vectors_only))
+                
                 for i in range(0, len(texts), batch_size):
                     batch_texts = texts[i:i + batch_size]
                     batch_vectors = vectors[i:i + batch_size]
@@ -295,55 +754,352 @@ class PGVectorProvider(VectorDBInterface):
                     
                     for _text, _vector, _metadata, _record_id in zip(batch_texts, batch_vectors, batch_metadata, batch_record_ids):
                         
-                        metadata_json = json.dumps(_metadata, ensure_ascii=False) if _metadata else '{}'
+                        metadata_json = None
+                        if not is_vectors_only:
+                            metadata_json = json.dumps(_metadata, ensure_ascii=False) if _metadata else '{}'
                         
-                        values.append({
-                            "text": _text,
-                            "vector": '[' + ",".join([ str(v) for v in _vector ]) + ']',
-                            "metadata": metadata_json,
-                            "chunk_id": _record_id
-                        })
+                        values.append(self.get_insert_values(
+                            is_vectors_only=is_vectors_only, text=_text, vector=_vector, metadata_json=metadata_json, record_id=_record_id
+                        ))
                     
-                    batch_insert_sql = sql_text(
-                        f"INSERT INTO {collection_name} "
-                        f"({PgVectorTableSchemeEnums.TEXT.value}, "
-                        f"{PgVectorTableSchemeEnums.VECTOR.value}, "
-                        f"{PgVectorTableSchemeEnums.METADATA.value}, "
-                        f"{PgVectorTableSchemeEnums.CHUNK_ID.value}) "
-                        "VALUES (:text, :vector, :metadata, :chunk_id)"
-                    )
                     await session.execute(batch_insert_sql, values)
                     self.logger.info(f"Inserted batch of records into {collection_name} from index {i} to {i + len(batch_texts) - 1}")
+                
+                # e.g. a task checkpoint, committed atomically with the records
+                if before_commit:
+                    await before_commit(session)
             
         await self.create_vector_index(collection_name=collection_name)
         return True
     
-    async def search_by_vector (self, collection_name: str, vector: list, limit: int):
+    async def delete_by_asset_ids (self, collection_name: str, asset_ids: List, record_ids: List = None, before_commit = None):
+        is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
+        
+        async with self.db_client() as session:
+            async with session.begin():
+                if is_collection_existed:
+                    # idx_chunk_asset_id finds the chunks, the chunk_id index (or primary key) their vectors
+                    delete_sql = sql_text(
+                        f"DELETE FROM {collection_name} c USING data_chunks d "
+                        f"WHERE c.{PgVectorTableSchemeEnums.CHUNK_ID.value} = d.chunk_id "
+                        "AND d.chunk_asset_id = ANY(:asset_ids)"
+                    )
+                    result = await session.execute(delete_sql, {"asset_ids": list(asset_ids)})
+                    self.logger.info(f"Deleted {result.rowcount} records of assets {asset_ids} from collection {collection_name}.")
+                
+                # e.g. deleting the chunks the records referenced, committed atomically with them
+                if before_commit:
+                    await before_commit(session)
+        
+        return True
+    
+    async def search_by_vector (self, collection_name: str, vector: list, limit: int, with_vectors: bool = False):
         is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
         if not is_collection_existed:
             self.logger.error(f"Collection {collection_name} does not exist, cannot search..?")
             return False
         
-        vector = '[' + ",".join([ str(v) for v in vector ]) + ']'
+        retrieved_docs = await self.query_by_vector(
+            collection_name=collection_name,
+            vector=vector,
+            limit=limit,
+            with_vectors=with_vectors
+        )
+        
+        self.logger.info(f"Retrieved {len(retrieved_docs)} documents from collection {collection_name}.")
+        return retrieved_docs
+    
+    @retry_on_stale_layout
+    async def query_by_vector (self, collection_name: str, vector: list, limit: int, with_vectors: bool = False):
+        vector = self.to_vector_param(vector)
+        
+        vector_column_sql = (
+            f", {PgVectorTableSchemeEnums.VECTOR.value} as vector"
+            if with_vectors else ""
+        )
         
         async with self.db_client() as session:
             async with session.begin():
+                vector_column = await self.get_vector_column(session, collection_name)
+                await self.set_candidates_limit(session, vector_column, limit)
+                
+                search_sql = sql_text(self.with_chunk_texts_sql(vector_column, self.get_ann_sql(
+                    collection_name=collection_name,
+                    vector_column=vector_column,
+                    query_sql=f"CAST(:vector AS {vector_column[0]})",
+                    columns_sql=f"{self.get_record_columns_sql(vector_column)}{vector_column_sql}",
+                    limit_sql=":limit",
+                )))
+                
+                results = await session.execute(search_sql, {"vector": vector, "limit": limit})
+                records = results.fetchall()
+        
+        return [
+            RetrievedDocument(
+                text=record.text,
+                score=record.score,
+                chunk_id=record.chunk_id,
+                vector=self.from_vector_value(record.vector).tolist() if with_vectors else None,
+            )
+            for record in records
+        ]
+    
+    @retry_on_stale_layout
+    async def search_grouped_by_vector (self, collection_name: str, vector: list, limit: int, group_size: int = 1, candidates_limit: int = None):
+        is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
+        if not is_collection_existed:
+            self.logger.error(f"Collection {collection_name} does not exist, cannot search..?")
+            return False
+        
+        candidates_limit = max(candidates_limit or 0, limit * group_size)
+        
+        async with self.db_client() as session:
+            async with session.begin():
+                vector_column = await self.get_vector_column(session, collection_name)
+                await self.set_candidates_limit(session, vector_column, candidates_limit)
+                
+                text_sql = "" if vector_column[2] else "{}.text as text, "
+                
+                # ANN over-fetch first (index scan), then keep the best group_size chunks per asset
+                # (group_size = 1 is the DISTINCT ON case, row_number() generalizes it)
+                search_sql = sql_text(self.with_chunk_texts_sql(vector_column,
+                    f"SELECT {text_sql.format('g')}g.chunk_id as chunk_id, g.asset_id as asset_id, g.score as score "
+                    "FROM ("
+                        f"SELECT {text_sql.format('c')}c.chunk_id, d.chunk_asset_id as asset_id, c.score, "
+                        "row_number() OVER (PARTITION BY d.chunk_asset_id ORDER BY c.score DESC) as asset_rank "
+                        "FROM ("
+                            + self.get_ann_sql(
+                                collection_name=collection_name,
+                                vector_column=vector_column,
+                                query_sql=f"CAST(:vector AS {vector_column[0]})",
+                                columns_sql=self.get_record_columns_sql(vector_column),
+                                limit_sql=":candidates_limit",
+                            ) +
+                        ") c "
+                        "JOIN data_chunks d ON d.chunk_id = c.chunk_id"
+                    ") g "
+                    "WHERE g.asset_rank <= :group_size "
+                    "ORDER BY g.score DESC "
+                    "LIMIT :limit"
+                ))
+                
+                results = await session.execute(search_sql, {
+                    "vector": self.to_vector_param(vector),
+                    "candidates_limit": candidates_limit,
+                    "group_size": group_size,
+                    "limit": limit
+                })
+                records = results.fetchall()
+        
+        self.logger.info(f"Retrieved {len(records)} grouped documents from collection {collection_name}.")
+        
+        return [
+            RetrievedDocument(
+                text=record.text,
+                score=record.score,
+                chunk_id=record.chunk_id,
+                asset_id=record.asset_id,
+            )
+            for record in records
+        ]
+    
+    @retry_on_stale_layout
+    async def search_by_vectors (self, collection_name: str, vectors: List, limit: int):
+        is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
+        if not is_collection_existed:
+            self.logger.error(f"Collection {collection_name} does not exist, cannot search..?")
+            return False
+        
+        async with self.db_client() as session:
+            async with session.begin():
+                vector_column = await self.get_vector_column(session, collection_name)
+                await self.set_candidates_limit(session, vector_column, limit)
+                
+                text_sql = "" if vector_column[2] else "c.text as text, "
+                
+                # One round trip: every query vector drives its own index scan through a LATERAL join,
+                # the vectors are bound as one vector[] / halfvec[] array through the binary codec
+                search_sql = sql_text(self.with_chunk_texts_sql(vector_column,
+                    f"SELECT q.query_idx as query_idx, {text_sql}c.chunk_id as chunk_id, c.score as score "
+                    f"FROM unnest(CAST(:vectors AS {vector_column[0]}[])) WITH ORDINALITY AS q(query_vector, query_idx) "
+                    "CROSS JOIN LATERAL ("
+                        + self.get_ann_sql(
+                            collection_name=collection_name,
+                            vector_column=vector_column,
+                            query_sql="q.query_vector",
+                            columns_sql=self.get_record_columns_sql(vector_column),
+                            limit_sql=":limit",
+                        ) +
+                    ") c "
+                    "ORDER BY q.query_idx, c.score DESC",
+                    order_sql="r.query_idx, r.score DESC"
+                ))
+                
+                results = await session.execute(search_sql, {
+                    "vectors": [ self.to_vector_param(vector) for vector in vectors ],
+                    "limit": limit
+                })
+                records = results.fetchall()
+        
+        retrieved_docs = [ [] for _ in vectors ]
+        for record in records:
+            retrieved_docs[record.query_idx - 1].append(RetrievedDocument(
+                text=record.text,
+                score=record.score,
+                chunk_id=record.chunk_id,
+            ))
+        
+        self.logger.info(f"Retrieved {len(records)} documents for {len(vectors)} queries from collection {collection_name}.")
+        return retrieved_docs
+    
+    @retry_on_stale_layout
+    async def search_by_record_id (self, collection_name: str, record_id: int, limit: int):
+        is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
+        if not is_collection_existed:
+            self.logger.error(f"Collection {collection_name} does not exist, cannot search..?")
+            return False
+        
+        async with self.db_client() as session:
+            async with session.begin():
+                vector_column = await self.get_vector_column(session, collection_name)
+                await self.set_candidates_limit(session, vector_column, limit)
+                
+                text_sql = "" if vector_column[2] else "c.text as text, "
+                
+                # Self-join: the stored vector of the source chunk drives the ANN scan, it never leaves the database
+                search_sql = sql_text(self.with_chunk_texts_sql(vector_column,
+                    f"SELECT {text_sql}c.chunk_id as chunk_id, c.score as score "
+                    "FROM ("
+                        f"SELECT {PgVectorTableSchemeEnums.VECTOR.value} as vector, {PgVectorTableSchemeEnums.CHUNK_ID.value} as chunk_id "
+                        f"FROM {collection_name} WHERE {PgVectorTableSchemeEnums.CHUNK_ID.value} = :chunk_id LIMIT 1"
+                    ") s "
+                    "CROSS JOIN LATERAL ("
+                        + self.get_ann_sql(
+                            collection_name=collection_name,
+                            vector_column=vector_column,
+                            query_sql="s.vector",
+                            columns_sql=self.get_record_columns_sql(vector_column),
+                            limit_sql=":limit",
+                            where_sql=f"WHERE {PgVectorTableSchemeEnums.CHUNK_ID.value} <> s.chunk_id",
+                        ) +
+                    ") c "
+                    "ORDER BY c.score DESC"
+                ))
+                
+                results = await session.execute(search_sql, {"chunk_id": record_id, "limit": limit})
+                records = results.fetchall()
+        
+        self.logger.info(f"Retrieved {len(records)} documents similar to chunk {record_id} from collection {collection_name}.")
+        
+        return [
+            RetrievedDocument(
+                text=record.text,
+                score=record.score,
+                chunk_id=record.chunk_id,
+            )
+            for record in records
+        ]
+    
+    @retry_on_stale_layout
+    async def query_by_text (self, collection_name: str, text: str, limit: int):
+        async with self.db_client() as session:
+            async with session.begin():
+                # vectors_only collections have no tsv column, hybrid search keeps the vector leg only
+                _, _, is_vectors_only = await self.get_vector_column(session, collection_name)
+                if is_vectors_only:
+                    return []
+                
                 search_sql = sql_text(
-                    f"SELECT {PgVectorTableSchemeEnums.TEXT.value} as text, 1 - ({PgVectorTableSchemeEnums.VECTOR.value} <=> :vector) as score "
-                    f"FROM {collection_name} "
+                    f"SELECT {PgVectorTableSchemeEnums.TEXT.value} as text, {PgVectorTableSchemeEnums.CHUNK_ID.value} as chunk_id, "
+                    f"ts_rank_cd({PgVectorTableSchemeEnums.TSV.value}, query) as score "
+                    f"FROM {collection_name}, websearch_to_tsquery('{self.text_search_config}', :text) query "
+                    f"WHERE {PgVectorTableSchemeEnums.TSV.value} @@ query "
                     "ORDER BY score DESC "
                     "LIMIT :limit"
                 )
                 
-                results = await session.execute(search_sql, {"vector": vector, "limit": limit})
+                results = await session.execute(search_sql, {"text": text, "limit": limit})
                 records = results.fetchall()
-                
-                retrieved_docs = []
-                for record in records:
-                    retrieved_docs.append(RetrievedDocument(
-                        text=record.text,
-                        score=record.score,
-                    ))
-                
-                self.logger.info(f"Retrieved {len(retrieved_docs)} documents from collection {collection_name}.")
-                return retrieved_docs
+        
+        return [
+            RetrievedDocument(
+                text=record.text,
+                score=record.score,
+                chunk_id=record.chunk_id,
+            )
+            for record in records
+        ]
+    
+    async def hybrid_search (self, collection_name: str, text: str, vector: list, limit: int):
+        is_collection_existed = await self.is_collection_existed(collection_name=collection_name)
+        if not is_collection_existed:
+            self.logger.error(f"Collection {collection_name} does not exist, cannot search..?")
+            return False
+        
+        if not await self.is_text_search_enabled(collection_name=collection_name):
+            self.logger.warning(f"Collection {collection_name} has no text search index yet, falling back to vector search.")
+            return await self.search_by_vector(collection_name=collection_name, vector=vector, limit=limit)
+        
+        candidates_limit = limit * self.hybrid_candidates_multiplier
+        
+        # Both legs use their own session (connection), so the ANN probe and the GIN probe run concurrently
+        vector_docs, text_docs = await asyncio.gather(
+            self.query_by_vector(collection_name=collection_name, vector=vector, limit=candidates_limit),
+            self.query_by_text(collection_name=collection_name, text=text, limit=candidates_limit),
+        )
+        
+        retrieved_docs = reciprocal_rank_fusion(
+            [vector_docs or [], text_docs or []],
+            k=self.hybrid_rrf_k,
+            limit=limit
+        )
+        
+        self.logger.info(
+            f"Hybrid search fused {len(vector_docs or [])} vector and {len(text_docs or [])} text results "
+            f"into {len(retrieved_docs)} documents from collection {collection_name}."
+        )
+        return retrieved_docs
+    
+    async def export_vectors (self, collection_name: str, batch_size: int = 1000):
+        if not await self.is_collection_existed(collection_name):
+            return
+        
+        # A long export reads the layout fresh rather than trusting the cache
+        self.forget_collection_layout(collection_name)
+        
+        last_id = 0
+        while True:
+            async with self.db_client() as session:
+                async with session.begin():
+                    _, _, is_vectors_only = await self.get_vector_column(session, collection_name)
+                    
+                    # vectors_only tables are keyed by chunk_id and read their texts from data_chunks
+                    key_column = PgVectorTableSchemeEnums.CHUNK_ID.value if is_vectors_only else PgVectorTableSchemeEnums.ID.value
+                    text_sql = "d.chunk_text" if is_vectors_only else f"c.{PgVectorTableSchemeEnums.TEXT.value}"
+                    
+                    # Keyset pagination on the primary key, one short transaction per page
+                    export_sql = sql_text(
+                        f"SELECT c.{key_column} as id, {text_sql} as text, "
+                        f"c.{PgVectorTableSchemeEnums.CHUNK_ID.value} as chunk_id, c.{PgVectorTableSchemeEnums.VECTOR.value} as vector, "
+                        "d.chunk_asset_id as asset_id "
+                        f"FROM {collection_name} c "
+                        f"LEFT JOIN data_chunks d ON d.chunk_id = c.{PgVectorTableSchemeEnums.CHUNK_ID.value} "
+                        f"WHERE c.{key_column} > :last_id "
+                        f"ORDER BY c.{key_column} "
+                        "LIMIT :batch_size"
+                    )
+                    
+                    results = await session.execute(export_sql, {"last_id": last_id, "batch_size": batch_size})
+                    records = results.fetchall()
+            
+            if not records:
+                break
+            
+            yield (
+                [ record.chunk_id for record in records ],
+                [ record.text for record in records ],
+                np.stack([ self.from_vector_value(record.vector) for record in records ]),
+                [ record.asset_id for record in records ],
+            )
+            
+            last_id = records[-1].id
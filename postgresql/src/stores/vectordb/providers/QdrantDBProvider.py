@@ -1,19 +1,36 @@
 from ..VectorDBInterface import VectorDBInterface
 from ..VectorDBEnums import DistanceMethodEnums
+from ..sparse_encoder import SparseTextEncoder
 from qdrant_client import models, QdrantClient
+import numpy as np
 import logging
 from typing import List
 from models.db_schemes import RetrievedDocument
 
 
 class QdrantDBProvider(VectorDBInterface):
-    def __init__(self, db_client: str, default_vector_size: int = 768, distance_method: str = None, index_threshold: int = 100):
+    def __init__(
+        self,
+        db_client: str,
+        default_vector_size: int = 768,
+        distance_method: str = None,
+        index_threshold: int = 100,
+        sparse_vectors_enabled: bool = False,
+        hybrid_candidates_multiplier: int = 2,
+    ):
         
         self.client = None
         self.db_client = db_client
         self.distance_method = None
         self.default_vector_size = default_vector_size
         
+        # Optional named sparse vector (local BM25 hashing) next to the default dense vector
+        self.sparse_vectors_enabled = sparse_vectors_enabled
+        self.sparse_vector_name = "text"
+        self.sparse_encoder = SparseTextEncoder()
+        self.hybrid_candidates_multiplier = hybrid_candidates_multiplier
+        self.sparse_collections = {}
+        
         if distance_method == DistanceMethodEnums.COSINE.value:
             self.distance_method = models.Distance.COSINE
         elif distance_method == DistanceMethodEnums.DOT_PRODUCT.value:
@@ -41,8 +58,9 @@ class QdrantDBProvider(VectorDBInterface):
         return self.client.get_collection(collection_name=collection_name)
 
     async def delete_collection(self, collection_name: str):
-        if self.is_collection_existed(collection_name):
+        if await self.is_collection_existed(collection_name):
             self.logger.info(f"Deleting/Resetting QDRANT collection: {collection_name}")
+            self.sparse_collections.pop(collection_name, None)
             return self.client.delete_collection(collection_name=collection_name)
         else:
             self.logger.info(f"Collection not found: {collection_name}", )
@@ -50,16 +68,31 @@ class QdrantDBProvider(VectorDBInterface):
     
     async def create_collection(self, collection_name: str, embedding_size: int, do_reset: bool = False) -> bool:
         if do_reset:
-            self.delete_collection(collection_name=collection_name)
+            await self.delete_collection(collection_name=collection_name)
         
-        if not self.is_collection_existed(collection_name):
+        if not await self.is_collection_existed(collection_name):
+            sparse_vectors_config = None
+            if self.sparse_vectors_enabled:
+                # The IDF half of BM25 is computed server-side from the collection statistics
+                sparse_vectors_config = {
+                    self.sparse_vector_name: models.SparseVectorParams(modifier=models.Modifier.IDF)
+                }
+            
             try:
                 self.client.create_collection(
                     collection_name=collection_name,
                     vectors_config=models.VectorParams(
                         size=embedding_size, 
                         distance=self.distance_method
-                    )
+                    ),
+                    sparse_vectors_config=sparse_vectors_config
+                )
+                
+                # Grouping and per-asset deletes filter on it
+                self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name="asset_id",
+                    field_schema=models.PayloadSchemaType.INTEGER
                 )
                 self.logger.info(f"Qdrant Collection: {collection_name} Created Successfully!!!!")
                 return True
@@ -70,6 +103,31 @@ class QdrantDBProvider(VectorDBInterface):
             self.logger.info(f"Collection: {collection_name} Already Exists!")
             return True
     
+    async def has_sparse_vectors(self, collection_name: str) -> bool:
+        if collection_name not in self.sparse_collections:
+            collection_info = self.client.get_collection(collection_name=collection_name)
+            sparse_vectors = collection_info.config.params.sparse_vectors or {}
+            
+            self.sparse_collections[collection_name] = self.sparse_vector_name in sparse_vectors
+        
+        return self.sparse_collections[collection_name]
+    
+    def to_vector_list(self, vector):
+        # The request models validate plain float lists, float32 rows are converted here only
+        return vector.tolist() if isinstance(vector, np.ndarray) else vector
+    
+    def build_point_vector(self, text: str, vector: list, with_sparse: bool):
+        vector = self.to_vector_list(vector)
+        if not with_sparse:
+            return vector
+        
+        indices, values = self.sparse_encoder.encode_document(text)
+        
+        return {
+            "": vector,
+            self.sparse_vector_name: models.SparseVector(indices=indices, values=values),
+        }
+    
     async def insert_one (
         self, 
         collection_name: str, 
@@ -78,17 +136,19 @@ class QdrantDBProvider(VectorDBInterface):
         metadata: dict = None, 
         record_id: str = None
     ):
-        if not self.is_collection_existed(collection_name):
+        if not await self.is_collection_existed(collection_name):
             self.logger.error(f"Can't Insert New Record To Non-existed Collection: {collection_name}", )
             return False
         
+        with_sparse = await self.has_sparse_vectors(collection_name)
+        
         try:
             _ = self.client.upload_records(
                 collection_name=collection_name,
                 records=[
                     models.Record(
-                        id=[record_id],
-                        vector=vector,
+                        id=record_id,
+                        vector=self.build_point_vector(text, vector, with_sparse),
                         payload={
                             "text": text,
                             "metadata": metadata
@@ -109,7 +169,9 @@ class QdrantDBProvider(VectorDBInterface):
         vectors: List, 
         metadata: List = None, 
         record_ids: List = None, 
-        batch_size: int = 50
+        batch_size: int = 50,
+        asset_ids: List = None,
+        before_commit = None
     ):
         if metadata is None:
             metadata = [None] * len(texts)
@@ -117,10 +179,15 @@ class QdrantDBProvider(VectorDBInterface):
         if record_ids is None:
             record_ids = list(range(0, len(texts)))
         
-        if not self.is_collection_existed(collection_name):
+        if asset_ids is None:
+            asset_ids = [None] * len(texts)
+        
+        if not await self.is_collection_existed(collection_name):
             self.logger.error(f"Can't Insert New Records To Non-existed Collection: {collection_name}")
             return False
         
+        with_sparse = await self.has_sparse_vectors(collection_name)
+        
         for i in range(0, len(texts), batch_size):
             batch_end = i + batch_size
             
@@ -128,14 +195,16 @@ class QdrantDBProvider(VectorDBInterface):
             batch_vectors = vectors[i : batch_end]
             batch_metadata = metadata[i : batch_end]
             batch_record_ids = record_ids[i : batch_end]
+            batch_asset_ids = asset_ids[i : batch_end]
             
             batch_records = [
                 models.Record(
                     id=batch_record_ids[x],
-                    vector=batch_vectors[x],
+                    vector=self.build_point_vector(batch_texts[x], batch_vectors[x], with_sparse),
                     payload={
                         "text": batch_texts[x],
-                        "metadata": batch_metadata[x]
+                        "metadata": batch_metadata[x],
+                        "asset_id": batch_asset_ids[x]
                     }
                 )
                 
@@ -151,14 +220,47 @@ class QdrantDBProvider(VectorDBInterface):
                 self.logger.error(f"Error while inserting records: {e}")
                 return False
         
+        # Not transactional with the application database, upserts by record id make replays harmless
+        if before_commit:
+            await before_commit(None)
+        
         return True
     
-    async def search_by_vector (self, collection_name: str, vector: list, limit: int = 5):
+    async def delete_by_asset_ids (self, collection_name: str, asset_ids: List, record_ids: List = None, before_commit = None):
+        if await self.is_collection_existed(collection_name):
+            # Points are keyed by chunk id, the ones indexed before asset_id was stored have no such payload
+            if record_ids is not None:
+                points_selector = models.PointIdsList(points=list(record_ids))
+            else:
+                points_selector = models.FilterSelector(
+                    filter=models.Filter(must=[
+                        models.FieldCondition(key="asset_id", match=models.MatchAny(any=list(asset_ids)))
+                    ])
+                )
+            
+            try:
+                _ = self.client.delete(
+                    collection_name=collection_name,
+                    points_selector=points_selector
+                )
+            except Exception as e:
+                self.logger.error(f"Error while deleting the records of assets {asset_ids}: {e}")
+                return False
+            
+            self.logger.info(f"Deleted the records of assets {asset_ids} from collection {collection_name}.")
+        
+        if before_commit:
+            await before_commit(None)
+        
+        return True
+    
+    async def search_by_vector (self, collection_name: str, vector: list, limit: int = 5, with_vectors: bool = False):
         
         results = self.client.search(
             collection_name=collection_name,
             query_vector=vector,
             limit=limit,
+            with_vectors=with_vectors,
         )
         
         if not results or len(results) == 0:
@@ -169,7 +271,155 @@ class QdrantDBProvider(VectorDBInterface):
             RetrievedDocument(**{
                 "score": result.score,
                 "text": result.payload["text"],
+                "chunk_id": result.id,
+                "asset_id": result.payload.get("asset_id"),
+                "vector": self.get_dense_vector(result.vector) if with_vectors else None,
+            }) for result in results
+        ]
+    
+    def get_dense_vector(self, point_vector):
+        # Collections with a sparse vector return every vector of the point keyed by name
+        if isinstance(point_vector, dict):
+            return point_vector.get("")
+        return point_vector
+    
+    async def search_grouped_by_vector (self, collection_name: str, vector: list, limit: int = 5, group_size: int = 1, candidates_limit: int = None):
+        
+        groups_result = self.client.search_groups(
+            collection_name=collection_name,
+            query_vector=vector,
+            group_by="asset_id",
+            limit=limit,
+            group_size=group_size,
+            with_payload=True,
+        )
+        
+        if not groups_result or not groups_result.groups:
+            self.logger.error("No grouped results found for the given vector.")
+            return None
+        
+        retrieved_docs = [
+            RetrievedDocument(**{
+                "score": hit.score,
+                "text": hit.payload["text"],
+                "chunk_id": hit.id,
+                "asset_id": group.id,
+            })
+            for group in groups_result.groups
+            for hit in group.hits
+        ]
+        
+        return sorted(retrieved_docs, key=lambda doc: doc.score, reverse=True)[:limit]
+    
+    async def search_by_vectors (self, collection_name: str, vectors: List, limit: int = 5):
+        
+        batch_results = self.client.search_batch(
+            collection_name=collection_name,
+            requests=[
+                models.SearchRequest(vector=self.to_vector_list(vector), limit=limit, with_payload=True)
+                for vector in vectors
+            ]
+        )
+        
+        return [
+            [
+                RetrievedDocument(**{
+                    "score": result.score,
+                    "text": result.payload["text"],
+                    "chunk_id": result.id,
+                }) for result in results
+            ] for results in batch_results
+        ]
+    
+    async def search_by_record_id (self, collection_name: str, record_id: int, limit: int = 5):
+        
+        # Recommend API: the stored vector of the point is used server-side, the point itself is excluded
+        try:
+            results = self.client.recommend(
+                collection_name=collection_name,
+                positive=[record_id],
+                limit=limit,
+                with_payload=True,
+            )
+        except Exception as e:
+            self.logger.error(f"Error while searching similar records to {record_id}: {e}")
+            return None
+        
+        if not results or len(results) == 0:
+            self.logger.error(f"No results found similar to record {record_id}.")
+            return None
+        
+        return [
+            RetrievedDocument(**{
+                "score": result.score,
+                "text": result.payload["text"],
+                "chunk_id": result.id,
             }) for result in results
         ]
+    
+    async def hybrid_search (self, collection_name: str, text: str, vector: list, limit: int = 5):
+        if not await self.has_sparse_vectors(collection_name):
+            self.logger.info(f"QDRANT collection {collection_name} has no sparse vectors, using vector search.")
+            return await self.search_by_vector(collection_name=collection_name, vector=vector, limit=limit)
+        
+        indices, values = self.sparse_encoder.encode_query(text)
+        if not indices:
+            return await self.search_by_vector(collection_name=collection_name, vector=vector, limit=limit)
+        
+        candidates_limit = limit * self.hybrid_candidates_multiplier
         
+        # Dense + sparse candidates are fused (RRF) server-side in a single round trip
+        response = self.client.query_points(
+            collection_name=collection_name,
+            prefetch=[
+                models.Prefetch(
+                    query=self.to_vector_list(vector),
+                    limit=candidates_limit,
+                ),
+                models.Prefetch(
+                    query=models.SparseVector(indices=indices, values=values),
+                    using=self.sparse_vector_name,
+                    limit=candidates_limit,
+                ),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            limit=limit,
+            with_payload=True,
+        )
+        
+        if not response or not response.points:
+            self.logger.error("No results found for the given query.")
+            return None
+        
+        return [
+            RetrievedDocument(**{
+                "score": point.score,
+                "text": point.payload["text"],
+                "chunk_id": point.id,
+            }) for point in response.points
+        ]
     
+    async def export_vectors (self, collection_name: str, batch_size: int = 1000):
+        if not await self.is_collection_existed(collection_name):
+            return
+        
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            
+            if points:
+                yield (
+                    [ point.id for point in points ],
+                    [ point.payload["text"] for point in points ],
+                    [ self.get_dense_vector(point.vector) for point in points ],
+                    [ point.payload.get("asset_id") for point in points ],
+                )
+            
+            if offset is None:
+                break
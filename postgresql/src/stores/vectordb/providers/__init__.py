@@ -1,2 +1,4 @@
 from .QdrantDBProvider import QdrantDBProvider
-from .PGVectorProvider import PGVectorProvider
\ No newline at end of file
+from .PGVectorProvider import PGVectorProvider
+from .NumpyFlatProvider import NumpyFlatProvider
+from .NumpyIVFPQProvider import NumpyIVFPQProvider
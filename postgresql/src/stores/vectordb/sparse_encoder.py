@@ -0,0 +1,65 @@
+from collections import Counter
+from typing import List, Tuple
+import re
+import zlib
+
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens (works for both our en and ar locales), single characters dropped."""
+    if not text:
+        return []
+
+    return [ token for token in TOKEN_PATTERN.findall(text.lower()) if len(token) > 1 ]
+
+
+class SparseTextEncoder:
+    """
+    Local BM25-style sparse encoder based on the hashing trick.
+
+    Terms are hashed into a 31-bit index space, so no vocabulary has to be built or stored,
+    and document weights use the BM25 term-frequency saturation. The IDF part of BM25 is
+    left to the vector store (e.g. Qdrant's IDF modifier), which knows the corpus statistics.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, avg_doc_length: float = 64):
+        """
+        :param k1: BM25 term frequency saturation.
+        :param b: BM25 document length normalization.
+        :param avg_doc_length: Expected average document length in tokens.
+        """
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_length = avg_doc_length
+
+    def term_index(self, token: str) -> int:
+        return zlib.crc32(token.encode("utf-8")) & 0x7FFFFFFF
+
+    def hash_terms(self, tokens: List[str]) -> Counter:
+        # Hash collisions are merged, the store requires unique indices
+        hashed_counts = Counter()
+        for token, count in Counter(tokens).items():
+            hashed_counts[self.term_index(token)] += count
+
+        return hashed_counts
+
+    def encode_document(self, text: str) -> Tuple[List[int], List[float]]:
+        tokens = tokenize(text)
+        if not tokens:
+            return [], []
+
+        length_norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_doc_length)
+
+        indices, values = [], []
+        for index, tf in self.hash_terms(tokens).items():
+            indices.append(index)
+            values.append(tf * (self.k1 + 1) / (tf + length_norm))
+
+        return indices, values
+
+    def encode_query(self, text: str) -> Tuple[List[int], List[float]]:
+        hashed_counts = self.hash_terms(tokenize(text))
+
+        return list(hashed_counts.keys()), [ 1.0 ] * len(hashed_counts)
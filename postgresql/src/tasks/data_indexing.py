@@ -5,6 +5,8 @@ from models.ChunkModel import ChunkModel
 from controllers import NLPController
 from fastapi.responses import JSONResponse
 from models import ResponseSignal
+from utils.index_version_manager import bump_project_index_version
+from utils.idempotency_manager import IdempotencyManager
 from tqdm.auto import tqdm
 import asyncio
 
@@ -19,16 +21,17 @@ logger = logging.getLogger(__name__)
     autoretry_for=(Exception,),
     retry_kwargs={'max_retries': 3, 'countdown': 60}
 )
-def index_data_content(self, project_id: int, do_reset: int):
+def index_data_content(self, project_id: int, do_reset: int, asset_id: int = None):
     return asyncio.run(
-        _index_data_content(self, project_id, do_reset)
+        _index_data_content(self, project_id, do_reset, asset_id)
     )
 
 
 
-async def _index_data_content(task_instance, project_id: int, do_reset: int):
+async def _index_data_content(task_instance, project_id: int, do_reset: int, asset_id: int = None):
     
     db_engine, vector_db_client = None, None
+    idempotency_manager, task_record = None, None
     
     try:
         
@@ -45,6 +48,60 @@ async def _index_data_content(task_instance, project_id: int, do_reset: int):
         
         logger.warning("Setup Utils Were Loaded!!")
         
+        settings = get_settings()
+        
+        # Create idempotency manager
+        idempotency_manager = IdempotencyManager(db_client, db_engine)
+        
+        # Define task arguments for idempotency check
+        task_args = {
+            "project_id": project_id,
+            "do_reset": do_reset,
+            "asset_id": asset_id
+        }
+        
+        task_name = "tasks.data_indexing.index_data_content"
+        
+        should_execute, existing_task = await idempotency_manager.should_execute_task(
+            task_name=task_name,
+            task_args=task_args,
+            celery_task_id=task_instance.request.id,
+            task_time_limit=settings.CELERY_TASK_TIME_LIMIT
+        )
+        
+        if not should_execute:
+            logger.warning(f"Can not handle th task | status: {existing_task.status}")
+            return existing_task.result
+        
+        task_record = None
+        if existing_task:
+            # A retry of this task, keep its checkpoint
+            await idempotency_manager.update_task_status(
+                execution_id=existing_task.execution_id,
+                status='PENDING'
+            )
+            task_record = existing_task
+        else:
+            task_record = await idempotency_manager.create_task_record(
+                task_name=task_name,
+                task_args=task_args,
+                celery_task_id=task_instance.request.id
+            )
+        
+        await idempotency_manager.update_task_status(
+            execution_id=task_record.execution_id,
+            status='STARTED'
+        )
+        
+        # Resume after the last chunk committed together with its checkpoint
+        checkpoint = task_record.checkpoint or {}
+        last_chunk_id = checkpoint.get("last_chunk_id", 0)
+        inserted_items_count = checkpoint.get("inserted_items_count", 0)
+        is_resumed = last_chunk_id > 0
+        
+        if is_resumed:
+            logger.warning(f"Resuming indexing of project {project_id} after chunk {last_chunk_id}.")
+        
         project_model = await ProjectModel.create_instance(db_client=db_client)
         
         chunk_model = await ChunkModel.create_instance(db_client=db_client)
@@ -70,46 +127,75 @@ async def _index_data_content(task_instance, project_id: int, do_reset: int):
             template_parser=template_parser
         )
         
-        has_records = True
-        page_num = 1
-        inserted_items_count = 0
-        idx = 0
+        # Create Collection if Not Exists (a resumed task must not reset what it already indexed)
+        do_reset = do_reset and not is_resumed
+        
+        # A reset also retires the project's projection, the collection name follows its version
+        if do_reset:
+            _ = await nlp_controller.reset_vector_db_collection(project=project)
         
-        # Create Collection if Not Exists
         collection_name = nlp_controller.create_collection_name(project_id=project.project_id)
         
         _ = await vector_db_client.create_collection(
             collection_name=collection_name,
-            embedding_size=embedding_client.embedding_size,
+            embedding_size=nlp_controller.get_embedding_size(),
             do_reset=do_reset
         )
         
-        # Setup Batching
-        total_chunks_count = await chunk_model.get_total_chunks_count(project_id=project.project_id)
+        # Cached answers must not outlive a reset collection
+        if do_reset:
+            await bump_project_index_version(settings, project.project_id)
+        
+        # Fit the projection (pca) on a sample of the whole project, not on its first page
+        if nlp_controller.needs_projection_fit(project=project):
+            sample_chunks = await chunk_model.get_project_chunks_sample(
+                project_id=project.project_id,
+                sample_size=settings.EMBEDDING_PCA_SAMPLE_SIZE
+            )
+            
+            _ = await nlp_controller.fit_embedding_projection(project=project, chunks=sample_chunks)
+        
+        # Setup Batching (a re-processed file only needs its own chunks indexed)
+        total_chunks_count = await chunk_model.get_total_chunks_count(project_id=project.project_id, asset_id=asset_id)
         
         pbar = tqdm(
             total=total_chunks_count,
+            initial=inserted_items_count,
             desc=f"Vector Indexing Project For {project.project_id} Chunks",
             position=0,
         )
         
-        while has_records:
-            page_chunks = await chunk_model.get_poject_chunks(project_id=project.project_id, page_num=page_num)
-            
-            if len(page_chunks):
-                page_num += 1
+        while True:
+            page_chunks = await chunk_model.get_project_chunks_after(
+                project_id=project.project_id,
+                last_chunk_id=last_chunk_id,
+                page_size=settings.INDEXING_PAGE_SIZE,
+                asset_id=asset_id
+            )
             
             if not page_chunks or len(page_chunks) == 0:
-                has_records = False
                 break
             
             chunks_ids = [ c.chunk_id for c in page_chunks ]
-            idx += len(page_chunks)
+            
+            page_checkpoint = {
+                "last_chunk_id": chunks_ids[-1],
+                "inserted_items_count": inserted_items_count + len(page_chunks)
+            }
+            page_progress = {
+                "done": page_checkpoint["inserted_items_count"],
+                "total": total_chunks_count
+            }
             
             is_inserted = await nlp_controller.index_into_vector_db(
                 project=project,
                 chunks=page_chunks,
-                chunks_ids=chunks_ids
+                chunks_ids=chunks_ids,
+                before_commit=idempotency_manager.create_checkpoint_hook(
+                    execution_id=task_record.execution_id,
+                    checkpoint=page_checkpoint,
+                    progress=page_progress
+                )
             )
             
             if not is_inserted:
@@ -124,10 +210,17 @@ async def _index_data_content(task_instance, project_id: int, do_reset: int):
                 
                 raise Exception(f"Can not Insert Into VectorDB | project_id: {project_id}")
             
+            last_chunk_id = page_checkpoint["last_chunk_id"]
+            inserted_items_count = page_checkpoint["inserted_items_count"]
+            
             pbar.update(len(page_chunks))
             
-            inserted_items_count += len(page_chunks)
+            task_instance.update_state(
+                state="PROGRESS",
+                meta=page_progress
+            )
         
+        await bump_project_index_version(settings, project.project_id)
         
         task_instance.update_state(
             state="SUCCESS",
@@ -136,14 +229,33 @@ async def _index_data_content(task_instance, project_id: int, do_reset: int):
             }
         )
         
-        
-        return {
+        task_result = {
             "Signal": ResponseSignal.INSERT_INTO_VECTOR_DB_SUCCESS.value,
             "Inserted_Items_Count": inserted_items_count
         }
+        
+        await idempotency_manager.update_task_status(
+            execution_id=task_record.execution_id,
+            status='SUCCESS',
+            result=task_result
+        )
+        
+        return task_result
     
     except Exception as e:
         logger.error(f"Task failed: {str(e)}")
+        
+        # Lets the retry run again, from the saved checkpoint
+        if idempotency_manager and task_record:
+            try:
+                await idempotency_manager.update_task_status(
+                    execution_id=task_record.execution_id,
+                    status='FAILURE',
+                    result={"error": str(e)}
+                )
+            except Exception as status_error:
+                logger.error(f"Failed to mark the task as failed: {str(status_error)}")
+        
         raise
     
     
@@ -159,4 +271,3 @@ async def _index_data_content(task_instance, project_id: int, do_reset: int):
     
     
 
-
@@ -8,6 +8,7 @@ from models import ResponseSignal
 from models.enums.AssetTypeEnums import AssetTypeEnum
 from controllers import ProcessController, NLPController
 from utils.idempotency_manager import IdempotencyManager
+from utils.index_version_manager import bump_project_index_version
 
 import asyncio
 import logging
@@ -44,6 +45,7 @@ async def _process_project_files(
 ):
     
     db_engine, vector_db_client = None, None
+    idempotency_manager, task_record = None, None
     
     try:
         
@@ -89,7 +91,7 @@ async def _process_project_files(
         
         task_record = None
         if existing_task:
-            # Update existing task with new celery task ID
+            # Update existing task with new celery task ID (a retry keeps its checkpoint)
             await idempotency_manager.update_task_status(
                 execution_id=existing_task.execution_id,
                 status='PENDING'
@@ -124,6 +126,7 @@ async def _process_project_files(
         asset_model = await AssetModel.create_instance(db_client=db_client)
         
         project_files_ids = {}
+        scoped_asset_id = None
         if file_id:
             asset_record = await asset_model.get_asset_record(
                 asset_project_id=project.project_id,
@@ -150,6 +153,7 @@ async def _process_project_files(
             project_files_ids = {
                 asset_record.asset_id: asset_record.asset_name
             }
+            scoped_asset_id = asset_record.asset_id
         else:
             project_files = await asset_model.get_all_project_assets(
                 asset_project_id=project.project_id,
@@ -180,24 +184,33 @@ async def _process_project_files(
         
         process_controller = ProcessController(project_id=project_id)
         
-        no_records = 0
-        no_files = 0
+        # Resume after the last asset committed together with its checkpoint
+        checkpoint = task_record.checkpoint or {}
+        processed_asset_ids = checkpoint.get("processed_asset_ids", [])
+        is_resumed = len(processed_asset_ids) > 0
+        
+        no_records = checkpoint.get("inserted_chunks", 0)
+        no_files = len(processed_asset_ids)
         
         chunk_model = await ChunkModel.create_instance(
             db_client=db_client
         )
         
-        if do_reset == 1:
-            # Reset Or Delete Vector DB Collection
-            collection_name = nlp_controller.create_collection_name(project_id=project.project_id)
+        # A resumed task must not reset the chunks it already inserted
+        if do_reset == 1 and not is_resumed:
+            # Reset Or Delete Vector DB Collection (and its projection, when reduced)
+            _ = await nlp_controller.reset_vector_db_collection(project=project)
             
-            _ = await vector_db_client.delete_collection(collection_name=collection_name)
+            await bump_project_index_version(get_settings(), project.project_id)
             
             # Reset Or Delete Chunks
             _ = await chunk_model.delete_chunks_by_project_id(project_id=project.project_id)
         
         for asset_id, file_id in project_files_ids.items():
             
+            if asset_id in processed_asset_ids:
+                continue
+            
             file_content = process_controller.get_file_content(file_id=file_id)
             
             if file_content is None:
@@ -226,9 +239,47 @@ async def _process_project_files(
                 for i, chunk in enumerate(file_chunks)
             ]
             
-            no_records += await chunk_model.insert_many_chunks(chunks=file_chunks_records)
+            # Re-processing a file replaces its chunks and their vectors, the other files' rows are untouched
+            if do_reset != 1:
+                is_deleted = await nlp_controller.delete_assets_from_vector_db(
+                    project=project,
+                    asset_ids=[ asset_id ],
+                    record_ids=await chunk_model.get_chunk_ids_by_asset_ids(project_id=project.project_id, asset_ids=[ asset_id ]),
+                    before_commit=chunk_model.create_delete_hook(project_id=project.project_id, asset_ids=[ asset_id ])
+                )
+                
+                if not is_deleted:
+                    raise Exception(f"Can not Delete The Previous Chunks Of file_id: {file_id}")
+            
+            file_checkpoint = {
+                "processed_asset_ids": processed_asset_ids + [ asset_id ],
+                "inserted_chunks": no_records + len(file_chunks_records)
+            }
+            file_progress = {
+                "done": len(file_checkpoint["processed_asset_ids"]),
+                "total": len(project_files_ids)
+            }
+            
+            no_records += await chunk_model.insert_many_chunks(
+                chunks=file_chunks_records,
+                before_commit=idempotency_manager.create_checkpoint_hook(
+                    execution_id=task_record.execution_id,
+                    checkpoint=file_checkpoint,
+                    progress=file_progress
+                )
+            )
             
+            processed_asset_ids = file_checkpoint["processed_asset_ids"]
             no_files += 1 
+            
+            task_instance.update_state(
+                state="PROGRESS",
+                meta=file_progress
+            )
+        
+        # Replaced chunks must not be served from cached answers
+        if do_reset != 1 and no_files > 0:
+            await bump_project_index_version(get_settings(), project.project_id)
         
         task_instance.update_state(
             state="SUCCESS",
@@ -251,12 +302,25 @@ async def _process_project_files(
             "inserted_chunks": no_records,
             "processed_files": no_files,
             "project_id": project_id,
+            "asset_id": scoped_asset_id,
             "do_reset": do_reset
         }
     
     
     except Exception as e:
         logger.error(f"Task failed: {str(e)}")
+        
+        # Lets the retry run again, from the saved checkpoint
+        if idempotency_manager and task_record:
+            try:
+                await idempotency_manager.update_task_status(
+                    execution_id=task_record.execution_id,
+                    status='FAILURE',
+                    result={"error": str(e)}
+                )
+            except Exception as status_error:
+                logger.error(f"Failed to mark the task as failed: {str(status_error)}")
+        
         raise
     
     
@@ -20,9 +20,10 @@ def push_after_process_task(self, prev_task_result):
     
     project_id = prev_task_result.get("project_id")
     do_reset = prev_task_result.get("do_reset")
+    asset_id = prev_task_result.get("asset_id")
     
     task_results = asyncio.run(
-        _index_data_content(self, project_id, do_reset)
+        _index_data_content(self, project_id, do_reset, asset_id)
     )
     
     return {
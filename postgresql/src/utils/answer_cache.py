@@ -0,0 +1,143 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+
+logger = logging.getLogger('uvicorn.error')
+
+
+class AnswerCache:
+    """
+    Exact-match cache of RAG answers stored in Redis.
+
+    Keys hash the project, its index version and every parameter that changes the answer, so
+    a re-index or reset makes old entries unreachable (they are also dropped eagerly through
+    ``clear_project``). Entries live ``ttl_seconds`` fresh, then ``stale_ttl_seconds`` more
+    as stale entries that are served while a single background refresh recomputes them.
+    """
+
+    def __init__(
+        self,
+        redis_client,
+        ttl_seconds: int = 3600,
+        stale_ttl_seconds: int = 0,
+        max_entries_per_project: int = 1000,
+        max_entry_bytes: int = 65536,
+        key_prefix: str = "minirag"
+    ):
+        self.redis_client = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds
+        self.max_entries_per_project = max_entries_per_project
+        self.max_entry_bytes = max_entry_bytes
+        self.key_prefix = key_prefix
+
+        # Keeps refresh tasks referenced until they finish
+        self.background_tasks = set()
+
+    @classmethod
+    def from_settings(cls, settings, redis_client):
+        if not settings.ANSWER_CACHE_ENABLED or redis_client is None:
+            return None
+
+        return cls(
+            redis_client=redis_client,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+            stale_ttl_seconds=settings.ANSWER_CACHE_STALE_TTL_SECONDS,
+            max_entries_per_project=settings.ANSWER_CACHE_MAX_ENTRIES_PER_PROJECT,
+            max_entry_bytes=settings.ANSWER_CACHE_MAX_ENTRY_BYTES,
+            key_prefix=settings.CACHE_KEY_PREFIX
+        )
+
+    def create_cache_key(self, project_id: int, index_version: int, **params):
+        key_data = {
+            **params,
+            "project_id": project_id,
+            "index_version": index_version
+        }
+        json_string = json.dumps(key_data, sort_keys=True, default=str)
+        return f"{self.key_prefix}:answer:{project_id}:{hashlib.sha256(json_string.encode()).hexdigest()}"
+
+    def create_project_index_key(self, project_id: int):
+        return f"{self.key_prefix}:answer_keys:{project_id}"
+
+    async def get(self, cache_key: str):
+        """Return (payload, is_stale), or (None, False) on a miss."""
+        try:
+            raw_entry = await self.redis_client.get(cache_key)
+        except Exception as e:
+            logger.error(f"Answer cache read failed: {e}")
+            return None, False
+
+        if not raw_entry:
+            return None, False
+
+        entry = json.loads(raw_entry)
+        return entry["payload"], time.time() > entry["fresh_until"]
+
+    async def set(self, project_id: int, cache_key: str, payload: dict):
+        now = time.time()
+        raw_entry = json.dumps({
+            "payload": payload,
+            "fresh_until": now + self.ttl_seconds
+        })
+
+        if len(raw_entry) > self.max_entry_bytes:
+            logger.info(f"Answer of {len(raw_entry)} bytes is too large to be cached.")
+            return False
+
+        index_key = self.create_project_index_key(project_id)
+
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.set(cache_key, raw_entry, ex=self.ttl_seconds + self.stale_ttl_seconds)
+                pipe.zadd(index_key, {cache_key: now})
+                pipe.expire(index_key, self.ttl_seconds + self.stale_ttl_seconds)
+                pipe.zcard(index_key)
+                *_, entries_count = await pipe.execute()
+
+            # Evict the oldest entries of the project above the size cap
+            overflow = entries_count - self.max_entries_per_project
+            if overflow > 0:
+                evicted = await self.redis_client.zpopmin(index_key, overflow)
+                if evicted:
+                    await self.redis_client.delete(*[ key for key, _ in evicted ])
+        except Exception as e:
+            logger.error(f"Answer cache write failed: {e}")
+            return False
+
+        return True
+
+    async def clear_project(self, project_id: int):
+        index_key = self.create_project_index_key(project_id)
+
+        cache_keys = await self.redis_client.zrange(index_key, 0, -1)
+        await self.redis_client.delete(index_key, *cache_keys)
+
+    async def acquire_refresh_lock(self, cache_key: str, lock_seconds: int = 60) -> bool:
+        # Without the lock the stale entry is still served, only its refresh is skipped
+        try:
+            return bool(await self.redis_client.set(f"{cache_key}:refresh", 1, nx=True, ex=lock_seconds))
+        except Exception as e:
+            logger.error(f"Answer cache refresh lock failed: {e}")
+            return False
+
+    def refresh_in_background(self, project_id: int, cache_key: str, compute_payload):
+        """Recompute a stale entry off the request path; compute_payload returns the payload or None."""
+        async def _refresh():
+            try:
+                payload = await compute_payload()
+                if payload:
+                    await self.set(project_id, cache_key, payload)
+            except Exception as e:
+                logger.error(f"Answer cache refresh failed: {e}")
+            finally:
+                try:
+                    await self.redis_client.delete(f"{cache_key}:refresh")
+                except Exception as e:
+                    logger.error(f"Answer cache refresh unlock failed: {e}")
+
+        task = asyncio.create_task(_refresh())
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
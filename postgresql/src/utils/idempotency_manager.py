@@ -2,7 +2,7 @@ import hashlib
 import json
 from datetime import datetime, timedelta, timezone
 from models.db_schemes.minirag.schemes.celery_task_execution import CeleryTaskExecution
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, update
 
 
 class IdempotencyManager:
@@ -65,6 +65,54 @@ class IdempotencyManager:
             await session.close()
     
     
+    async def save_checkpoint(self, execution_id: int, checkpoint: dict, progress: dict = None, session=None):
+        """
+        Persist the task checkpoint and progress.
+        With the session of the batch being written, both are committed atomically by its transaction.
+        """
+        stmt = update(CeleryTaskExecution).where(
+            CeleryTaskExecution.execution_id == execution_id
+        ).values(checkpoint=checkpoint, progress=progress)
+        
+        if session is not None:
+            await session.execute(stmt)
+            return
+        
+        session = self.db_client()
+        
+        try:
+            await session.execute(stmt)
+            await session.commit()
+        finally:
+            await session.close()
+    
+    
+    def create_checkpoint_hook(self, execution_id: int, checkpoint: dict, progress: dict = None):
+        """
+        Build a before_commit hook saving the checkpoint in the transaction of a batch insert.
+        """
+        async def before_commit(session):
+            await self.save_checkpoint(execution_id, checkpoint, progress, session=session)
+        
+        return before_commit
+    
+    
+    async def get_tasks_by_celery_id(self, celery_task_id: str) -> list:
+        """
+        Get the task execution records of a celery task id.
+        """
+        session = self.db_client()
+        
+        try:
+            stmt = select(CeleryTaskExecution).where(
+                CeleryTaskExecution.celery_task_id == celery_task_id
+            ).order_by(CeleryTaskExecution.execution_id)
+            result = await session.execute(stmt)
+            return result.scalars().all()
+        finally:
+            await session.close()
+    
+    
     async def get_existing_task(self, task_name: str, task_args: dict, celery_task_id: str) -> CeleryTaskExecution:
         """
         Check if task with same name and args already exists.
@@ -0,0 +1,92 @@
+import asyncio
+import json
+import logging
+from redis import asyncio as aioredis
+from .answer_cache import AnswerCache
+
+logger = logging.getLogger('uvicorn.error')
+
+
+class IndexVersionManager:
+    """
+    Keeps a per-project index version counter in Redis.
+
+    The version is bumped whenever a project's collection is reset or (re-)indexed, so
+    anything cached against an older version stops matching. Every bump is also published
+    on ``version_channel`` for in-process caches that need to drop entries eagerly.
+    """
+
+    def __init__(self, redis_client, key_prefix: str = "minirag"):
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.version_channel = f"{key_prefix}:index_version"
+
+    @classmethod
+    def from_settings(cls, settings):
+        if not settings.CACHE_REDIS_URL:
+            return None
+
+        return cls(
+            redis_client=aioredis.from_url(settings.CACHE_REDIS_URL, decode_responses=True),
+            key_prefix=settings.CACHE_KEY_PREFIX
+        )
+
+    def create_version_key(self, project_id: int):
+        return f"{self.key_prefix}:index_version:{project_id}"
+
+    async def get_version(self, project_id: int) -> int:
+        version = await self.redis_client.get(self.create_version_key(project_id))
+        return int(version) if version else 0
+
+    async def bump_version(self, project_id: int) -> int:
+        version = await self.redis_client.incr(self.create_version_key(project_id))
+
+        await self.redis_client.publish(
+            self.version_channel,
+            json.dumps({"project_id": project_id, "version": version})
+        )
+
+        return version
+
+    def start_listener(self, on_bump):
+        """Call on_bump(project_id, version) for every bump published by any worker, reconnecting on errors."""
+        async def _listen():
+            while True:
+                try:
+                    async with self.redis_client.pubsub() as pubsub:
+                        await pubsub.subscribe(self.version_channel)
+                        async for message in pubsub.listen():
+                            if message["type"] == "message":
+                                data = json.loads(message["data"])
+                                on_bump(data["project_id"], data["version"])
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Index version listener failed, reconnecting: {e}")
+                    await asyncio.sleep(5)
+
+        return asyncio.create_task(_listen())
+
+    async def close(self):
+        await self.redis_client.aclose()
+
+
+async def bump_project_index_version(settings, project_id: int):
+    """Bump a project's index version from a worker; failures are logged, indexing must not fail on them."""
+    version_manager = IndexVersionManager.from_settings(settings)
+    if not version_manager:
+        return None
+
+    try:
+        version = await version_manager.bump_version(project_id)
+
+        answer_cache = AnswerCache.from_settings(settings, redis_client=version_manager.redis_client)
+        if answer_cache:
+            await answer_cache.clear_project(project_id)
+
+        return version
+    except Exception as e:
+        logger.error(f"Failed to bump the index version of project {project_id}: {e}")
+        return None
+    finally:
+        await version_manager.close()
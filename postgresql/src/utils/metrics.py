@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
 from fastapi import FastAPI, Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 import time
@@ -7,6 +7,23 @@ import time
 # Define metrics
 REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP Requests', ['method', 'endpoint', 'status'])
 REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'HTTP Request Latency', ['method', 'endpoint'])
+SEMANTIC_CACHE_REQUESTS = Counter('semantic_cache_requests_total', 'Semantic Answer Cache Lookups', ['result'])
+EMBEDDING_BATCH_QUEUE_WAIT = Histogram(
+    'embedding_batch_queue_wait_seconds', 'Time Queries Wait For Their Embedding Batch',
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+LLM_HTTP_REQUESTS = Counter('llm_http_requests_total', 'HTTP Requests Sent To LLM Providers', ['provider'])
+LLM_HTTP_CONNECTIONS_OPENED = Counter('llm_http_connections_opened_total', 'New TCP Connections To LLM Providers', ['provider'])
+LLM_HTTP_POOL_CONNECTIONS = Gauge('llm_http_pool_connections', 'Connections Held In LLM Provider Pools', ['provider'])
+LLM_BACKEND_LATENCY_EWMA = Gauge('llm_backend_latency_ewma_seconds', 'Latency EWMA Of Each LLM Backend', ['backend'])
+LLM_BACKEND_ERROR_EWMA = Gauge('llm_backend_error_ewma', 'Error Rate EWMA Of Each LLM Backend', ['backend'])
+LLM_HEDGED_REQUESTS = Counter('llm_hedged_requests_total', 'Hedged Requests Sent To LLM Backends', ['backend'])
+EMBEDDING_BATCH_SIZE = Histogram(
+    'embedding_batch_size', 'Texts Per Batched Embedding Call',
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+VECTOR_CACHE_REQUESTS = Counter('vector_cache_requests_total', 'Vector Searches Looked Up In The Worker Vector Cache', ['result'])
+VECTOR_CACHE_BYTES = Gauge('vector_cache_bytes', 'Memory Used By The Worker Vector Cache')
 
 class PrometheusMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
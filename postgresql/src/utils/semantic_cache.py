@@ -0,0 +1,142 @@
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import numpy as np
+from .metrics import SEMANTIC_CACHE_REQUESTS
+
+logger = logging.getLogger('uvicorn.error')
+
+
+class SemanticCacheBucket:
+    """Cached query vectors, scopes and answers of one project, kept in a fixed-size ring."""
+
+    def __init__(self, index_version: int, embedding_size: int, max_entries: int):
+        self.index_version = index_version
+        self.vectors = np.zeros((max_entries, embedding_size), dtype=np.float32)
+        self.created_at = np.full(max_entries, -np.inf)
+        self.scopes = np.full(max_entries, None, dtype=object)
+        self.payloads = [ None ] * max_entries
+        self.next_slot = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self.vectors.nbytes + self.created_at.nbytes + self.scopes.nbytes
+
+
+class SemanticCache:
+    """
+    In-process semantic answer cache.
+
+    Answers are stored with the normalized vector of the query that produced them; a new
+    query whose cosine similarity to a cached query reaches ``similarity_threshold`` gets
+    the cached answer, so paraphrases skip retrieval and generation. Entries are grouped
+    per project and only match queries of the same scope (every request parameter other
+    than the query text). A project's bucket is dropped as soon as its index version changes,
+    and least recently used buckets are evicted to stay within ``memory_budget_bytes``.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.95,
+        max_entries_per_project: int = 256,
+        ttl_seconds: int = 3600,
+        memory_budget_bytes: int = 64 * 2**20
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries_per_project = max_entries_per_project
+        self.ttl_seconds = ttl_seconds
+        self.memory_budget_bytes = memory_budget_bytes
+        self.buckets = OrderedDict()
+        self.listener_task = None
+
+    @classmethod
+    def from_settings(cls, settings):
+        if not settings.SEMANTIC_CACHE_ENABLED:
+            return None
+
+        return cls(
+            similarity_threshold=settings.SEMANTIC_CACHE_SIMILARITY_THRESHOLD,
+            max_entries_per_project=settings.SEMANTIC_CACHE_MAX_ENTRIES_PER_PROJECT,
+            ttl_seconds=settings.SEMANTIC_CACHE_TTL_SECONDS,
+            memory_budget_bytes=settings.SEMANTIC_CACHE_MEMORY_BUDGET_MB * 2**20
+        )
+
+    def create_scope(self, **params):
+        json_string = json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(json_string.encode()).hexdigest()
+
+    def normalize(self, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        return vector / (np.linalg.norm(vector) + 1e-12)
+
+    def get_used_bytes(self) -> int:
+        return sum(bucket.nbytes for bucket in self.buckets.values())
+
+    def lookup(self, project_id: int, index_version: int, scope: str, query_vector: list):
+        bucket = self.buckets.get(project_id)
+
+        payload = None
+        if bucket is not None and bucket.index_version == index_version and bucket.vectors.shape[1] == len(query_vector):
+            self.buckets.move_to_end(project_id)
+
+            similarities = bucket.vectors @ self.normalize(query_vector)
+            similarities[(bucket.created_at < time.time() - self.ttl_seconds) | (bucket.scopes != scope)] = -np.inf
+
+            best_idx = int(np.argmax(similarities))
+            if similarities[best_idx] >= self.similarity_threshold:
+                payload = bucket.payloads[best_idx]
+
+        SEMANTIC_CACHE_REQUESTS.labels(result="hit" if payload else "miss").inc()
+
+        return payload
+
+    def store(self, project_id: int, index_version: int, scope: str, query_vector: list, payload: dict):
+        bucket = self.buckets.get(project_id)
+
+        if bucket is None or bucket.index_version != index_version or bucket.vectors.shape[1] != len(query_vector):
+            self.buckets.pop(project_id, None)
+
+            bucket = SemanticCacheBucket(
+                index_version=index_version,
+                embedding_size=len(query_vector),
+                max_entries=self.max_entries_per_project
+            )
+
+            # Least recently used projects make room, a bucket larger than the whole budget is not cached
+            if bucket.nbytes > self.memory_budget_bytes:
+                return
+
+            while self.buckets and self.get_used_bytes() + bucket.nbytes > self.memory_budget_bytes:
+                self.buckets.popitem(last=False)
+
+            self.buckets[project_id] = bucket
+
+        self.buckets.move_to_end(project_id)
+
+        # The oldest entry is overwritten once the ring is full
+        slot = bucket.next_slot
+        bucket.vectors[slot] = self.normalize(query_vector)
+        bucket.created_at[slot] = time.time()
+        bucket.scopes[slot] = scope
+        bucket.payloads[slot] = payload
+        bucket.next_slot = (slot + 1) % self.max_entries_per_project
+
+    def invalidate(self, project_id: int):
+        self.buckets.pop(project_id, None)
+
+    def start_invalidation_listener(self, index_version_manager):
+        """Drop a project's buckets as soon as a worker publishes an index version bump."""
+        self.listener_task = index_version_manager.start_listener(
+            lambda project_id, version: self.invalidate(project_id)
+        )
+
+    async def stop_invalidation_listener(self):
+        if self.listener_task:
+            self.listener_task.cancel()
+            try:
+                await self.listener_task
+            except asyncio.CancelledError:
+                pass
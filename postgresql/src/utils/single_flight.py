@@ -0,0 +1,134 @@
+import asyncio
+import hashlib
+import json
+import logging
+import uuid
+
+logger = logging.getLogger('uvicorn.error')
+
+# Deletes the lock only while it still holds this leader's token, an expired lock may belong to the next leader
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls so only one of them does the work.
+
+    Within a worker, callers of an in-flight key await the leader's future. With a Redis
+    client, the leader also takes a short lock and publishes its serialized result, so
+    leaders of the same key in other workers wait for it instead of recomputing; if the
+    result does not arrive in time (or the leader failed) they compute it themselves.
+    """
+
+    def __init__(self, redis_client=None, key_prefix: str = "minirag", lock_seconds: int = 30):
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.lock_seconds = lock_seconds
+        self.in_flight = {}
+
+    @classmethod
+    def from_settings(cls, settings, redis_client=None):
+        if not settings.SINGLE_FLIGHT_ENABLED:
+            return None
+
+        return cls(
+            redis_client=redis_client if settings.SINGLE_FLIGHT_CROSS_WORKER else None,
+            key_prefix=settings.CACHE_KEY_PREFIX,
+            lock_seconds=settings.SINGLE_FLIGHT_LOCK_SECONDS
+        )
+
+    def create_key(self, *parts):
+        json_string = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(json_string.encode()).hexdigest()
+
+    async def do(self, key: str, compute, serialize=None, deserialize=None):
+        """
+        Run ``compute()`` once for all concurrent callers of ``key``.
+
+        :param serialize: Turns the result into JSON-compatible data for other workers.
+        :param deserialize: Rebuilds a result published by another worker.
+        """
+        future = self.in_flight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+
+        try:
+            if self.redis_client is not None and serialize and deserialize:
+                result = await self.do_across_workers(key, compute, serialize, deserialize)
+            else:
+                result = await compute()
+
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            # Followers get the exception, without them nobody would retrieve it
+            future.exception()
+            raise
+        finally:
+            del self.in_flight[key]
+
+    async def do_across_workers(self, key: str, compute, serialize, deserialize):
+        lock_key = f"{self.key_prefix}:single_flight:{key}:lock"
+        result_key = f"{self.key_prefix}:single_flight:{key}:result"
+        channel = f"{self.key_prefix}:single_flight:{key}"
+
+        lock_token = uuid.uuid4().hex
+        try:
+            is_leader = await self.redis_client.set(lock_key, lock_token, nx=True, ex=self.lock_seconds)
+        except Exception as e:
+            logger.error(f"Single-flight lock failed, computing locally: {e}")
+            return await compute()
+
+        if is_leader:
+            message = {"error": True}
+            try:
+                result = await compute()
+                message = {"result": serialize(result)}
+                return result
+            finally:
+                try:
+                    # The short-lived result key covers followers that subscribe after the publish
+                    raw_message = json.dumps(message, default=str)
+                    await self.redis_client.set(result_key, raw_message, ex=5)
+                    await self.redis_client.publish(channel, raw_message)
+                    await self.redis_client.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, lock_token)
+                except Exception as e:
+                    logger.error(f"Single-flight publish failed: {e}")
+
+        message = await self.wait_for_result(channel, result_key)
+
+        if not message or message.get("error"):
+            return await compute()
+
+        return deserialize(message["result"])
+
+    async def wait_for_result(self, channel: str, result_key: str):
+        try:
+            async with self.redis_client.pubsub() as pubsub:
+                await pubsub.subscribe(channel)
+
+                raw_message = await self.redis_client.get(result_key)
+                if raw_message:
+                    return json.loads(raw_message)
+
+                async def _listen():
+                    async for message in pubsub.listen():
+                        if message["type"] == "message":
+                            return json.loads(message["data"])
+
+                return await asyncio.wait_for(_listen(), timeout=self.lock_seconds)
+        except asyncio.TimeoutError:
+            logger.warning("Timed out waiting for another worker's result, computing locally.")
+        except Exception as e:
+            logger.error(f"Single-flight wait failed, computing locally: {e}")
+
+        return None
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+import numpy as np
+from models.db_schemes import RetrievedDocument
+from stores.vectordb.VectorDBEnums import VectorDBEnums, DistanceMethodEnums
+from .metrics import VECTOR_CACHE_REQUESTS, VECTOR_CACHE_BYTES
+
+logger = logging.getLogger('uvicorn.error')
+
+
+class CachedProjectVectors:
+    """One project's collection held in RAM: the vector matrix plus ids and texts per row."""
+
+    def __init__(self, collection_name: str, record_ids: np.ndarray, asset_ids: np.ndarray, texts: list, matrix: np.ndarray):
+        self.collection_name = collection_name
+        self.record_ids = record_ids
+        self.asset_ids = asset_ids
+        self.texts = texts
+        self.matrix = matrix
+        self.loaded_at = time.time()
+
+        self.nbytes = matrix.nbytes + record_ids.nbytes + asset_ids.nbytes + sum(len(text) for text in texts)
+
+
+class VectorCache:
+    """
+    Read-through cache of hot projects' vectors, per API worker.
+
+    A project searched ``load_after_searches`` times gets its whole collection exported from
+    the vector DB into a NumPy matrix (float32 or float16); later vector searches are served
+    exactly from it. Projects are kept within ``memory_budget_bytes``, least recently searched
+    ones are evicted whole, and a project is dropped as soon as its index version is bumped.
+    """
+
+    def __init__(
+        self,
+        vector_db_client,
+        distance_method: str = DistanceMethodEnums.COSINE.value,
+        memory_budget_bytes: int = 512 * 2**20,
+        load_after_searches: int = 100,
+        dtype: str = "float32",
+        ttl_seconds: int = 3600,
+        chunk_rows: int = 65536,
+    ):
+        self.vector_db_client = vector_db_client
+        self.distance_method = distance_method
+        self.memory_budget_bytes = memory_budget_bytes
+        self.load_after_searches = load_after_searches
+        self.dtype = np.float16 if dtype == "float16" else np.float32
+        self.ttl_seconds = ttl_seconds
+        self.chunk_rows = chunk_rows
+
+        self.projects = OrderedDict()
+        self.search_counts = {}
+        self.loading = {}
+        # Bumped on every invalidation, a load started before it is thrown away
+        self.generations = {}
+        self.listener_task = None
+
+    @classmethod
+    def from_settings(cls, settings, vector_db_client):
+        if not settings.VECTOR_CACHE_ENABLED:
+            return None
+
+        # PGVector always ranks by cosine similarity, whatever the configured distance
+        distance_method = settings.VECTOR_DB_DISTANCE_METHOD
+        if settings.VECTOR_DB_BACKEND == VectorDBEnums.PGVECTOR.value:
+            distance_method = DistanceMethodEnums.COSINE.value
+
+        if distance_method not in (DistanceMethodEnums.COSINE.value, DistanceMethodEnums.DOT_PRODUCT.value):
+            logger.warning(f"Vector cache does not support the {distance_method} distance, disabled.")
+            return None
+
+        return cls(
+            vector_db_client=vector_db_client,
+            distance_method=distance_method,
+            memory_budget_bytes=settings.VECTOR_CACHE_MEMORY_BUDGET_MB * 2**20,
+            load_after_searches=settings.VECTOR_CACHE_LOAD_AFTER_SEARCHES,
+            dtype=settings.VECTOR_CACHE_DTYPE,
+            ttl_seconds=settings.VECTOR_CACHE_TTL_SECONDS,
+        )
+
+    def get_entry(self, project_id: int, collection_name: str):
+        entry = self.projects.get(project_id)
+
+        if entry is not None and (entry.collection_name != collection_name or time.time() - entry.loaded_at > self.ttl_seconds):
+            self.evict(project_id)
+            entry = None
+
+        if entry is None:
+            VECTOR_CACHE_REQUESTS.labels(result="miss").inc()
+            self.record_search(project_id, collection_name)
+            return None
+
+        VECTOR_CACHE_REQUESTS.labels(result="hit").inc()
+        self.projects.move_to_end(project_id)
+        return entry
+
+    def record_search(self, project_id: int, collection_name: str):
+        self.search_counts[project_id] = self.search_counts.get(project_id, 0) + 1
+
+        if self.search_counts[project_id] >= self.load_after_searches and project_id not in self.loading:
+            self.loading[project_id] = asyncio.create_task(self.load(project_id, collection_name))
+
+    async def load(self, project_id: int, collection_name: str):
+        generation = self.generations.get(project_id, 0)
+
+        try:
+            record_ids, asset_ids, texts, pages = [], [], [], []
+            loaded_bytes = 0
+
+            async for page_ids, page_texts, page_vectors, page_asset_ids in self.vector_db_client.export_vectors(collection_name=collection_name):
+                page = np.asarray(page_vectors, dtype=np.float32)
+                if self.distance_method == DistanceMethodEnums.COSINE.value:
+                    page /= np.linalg.norm(page, axis=1, keepdims=True) + 1e-12
+
+                pages.append(page.astype(self.dtype, copy=False))
+                record_ids.extend(page_ids)
+                asset_ids.extend(-1 if asset_id is None else asset_id for asset_id in page_asset_ids)
+                texts.extend(page_texts)
+
+                # Give up early on collections that can never fit
+                loaded_bytes += pages[-1].nbytes + sum(len(text) for text in page_texts)
+                if loaded_bytes > self.memory_budget_bytes:
+                    logger.info(f"Project {project_id} does not fit in the vector cache budget, not cached.")
+                    return
+
+            if not pages or self.generations.get(project_id, 0) != generation:
+                return
+
+            entry = CachedProjectVectors(
+                collection_name=collection_name,
+                record_ids=np.asarray(record_ids, dtype=np.int64),
+                asset_ids=np.asarray(asset_ids, dtype=np.int64),
+                texts=texts,
+                matrix=np.concatenate(pages),
+            )
+
+            while self.projects and self.get_used_bytes() + entry.nbytes > self.memory_budget_bytes:
+                self.evict(next(iter(self.projects)))
+
+            self.projects[project_id] = entry
+            VECTOR_CACHE_BYTES.set(self.get_used_bytes())
+
+            logger.info(f"Cached {len(record_ids)} vectors of project {project_id} ({entry.nbytes / 2**20:.1f} MiB).")
+        except Exception as e:
+            logger.error(f"Failed to cache the vectors of project {project_id}: {e}")
+        finally:
+            self.loading.pop(project_id, None)
+
+    def get_used_bytes(self):
+        return sum(entry.nbytes for entry in self.projects.values())
+
+    def evict(self, project_id: int):
+        self.projects.pop(project_id, None)
+        self.search_counts.pop(project_id, None)
+        VECTOR_CACHE_BYTES.set(self.get_used_bytes())
+
+    def invalidate(self, project_id: int):
+        self.generations[project_id] = self.generations.get(project_id, 0) + 1
+        self.evict(project_id)
+
+    def score(self, entry: CachedProjectVectors, queries: np.ndarray) -> np.ndarray:
+        queries = np.asarray(queries, dtype=np.float32)
+        if self.distance_method == DistanceMethodEnums.COSINE.value:
+            queries = queries / (np.linalg.norm(queries, axis=1, keepdims=True) + 1e-12)
+
+        if entry.matrix.dtype == np.float32:
+            return entry.matrix @ queries.T
+
+        # float16 has no BLAS kernel, upcast a chunk of rows at a time
+        scores = np.empty((len(entry.matrix), len(queries)), dtype=np.float32)
+        for start in range(0, len(entry.matrix), self.chunk_rows):
+            chunk = entry.matrix[start:start + self.chunk_rows].astype(np.float32)
+            scores[start:start + self.chunk_rows] = chunk @ queries.T
+
+        return scores
+
+    def top_rows(self, scores: np.ndarray, limit: int) -> np.ndarray:
+        limit = min(limit, len(scores))
+        rows = np.argpartition(scores, len(scores) - limit)[len(scores) - limit:]
+        return rows[np.argsort(-scores[rows], kind="stable")]
+
+    def to_document(self, entry: CachedProjectVectors, row: int, score: float, with_vectors: bool = False):
+        asset_id = int(entry.asset_ids[row])
+
+        return RetrievedDocument(
+            text=entry.texts[row],
+            score=float(score),
+            chunk_id=int(entry.record_ids[row]),
+            asset_id=asset_id if asset_id >= 0 else None,
+            vector=entry.matrix[row].astype(np.float32).tolist() if with_vectors else None,
+        )
+
+    def search(self, project_id: int, collection_name: str, vector: list, limit: int, with_vectors: bool = False):
+        """Top-k from RAM, or None when the project is not cached (yet)."""
+        entry = self.get_entry(project_id, collection_name)
+        if entry is None:
+            return None
+
+        scores = self.score(entry, [ vector ])[:, 0]
+
+        return [
+            self.to_document(entry, row, scores[row], with_vectors=with_vectors)
+            for row in self.top_rows(scores, limit)
+        ]
+
+    def search_grouped(self, project_id: int, collection_name: str, vector: list, limit: int, group_size: int = 1, candidates_limit: int = None):
+        """Like search, keeping at most group_size records per asset among the candidates."""
+        entry = self.get_entry(project_id, collection_name)
+        if entry is None:
+            return None
+
+        scores = self.score(entry, [ vector ])[:, 0]
+
+        asset_counts = {}
+        documents = []
+        for row in self.top_rows(scores, max(candidates_limit or 0, limit * group_size)):
+            asset_id = int(entry.asset_ids[row])
+            if asset_counts.get(asset_id, 0) >= group_size:
+                continue
+
+            asset_counts[asset_id] = asset_counts.get(asset_id, 0) + 1
+            documents.append(self.to_document(entry, row, scores[row]))
+            if len(documents) >= limit:
+                break
+
+        return documents
+
+    def search_many(self, project_id: int, collection_name: str, vectors: list, limit: int):
+        entry = self.get_entry(project_id, collection_name)
+        if entry is None:
+            return None
+
+        scores = self.score(entry, vectors)
+
+        return [
+            [ self.to_document(entry, row, scores[row, query_idx]) for row in self.top_rows(scores[:, query_idx], limit) ]
+            for query_idx in range(len(vectors))
+        ]
+
+    def start_invalidation_listener(self, index_version_manager):
+        """Drop a project as soon as a worker publishes an index version bump."""
+        self.listener_task = index_version_manager.start_listener(
+            lambda project_id, version: self.invalidate(project_id)
+        )
+
+    async def stop_invalidation_listener(self):
+        if self.listener_task:
+            self.listener_task.cancel()
+            try:
+                await self.listener_task
+            except asyncio.CancelledError:
+                pass